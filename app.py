@@ -1,7 +1,23 @@
 # ui
+import io
+import numpy as np
+import pandas as pd
 import streamlit as st
-import pickle
 from streamlit_option_menu import option_menu
+import audit_log
+import drift
+import instrumentation
+from batching import batcher_metrics, get_batcher
+from features import MODEL_FEATURES, validate
+from instrumentation import stage
+from page_schema import PAGES, PAGE_KEYS, fields
+from model_registry import registry as models
+from prediction_cache import cache as prediction_cache
+from settings import env_flag
+
+# The admin page shows and clears caches, drift and audit data; it is only
+# offered when the deployment opts in with DISEASE_APP_ADMIN=1
+ADMIN = env_flag('DISEASE_APP_ADMIN')
 
 # Page Configuration
 st.set_page_config(
@@ -18,7 +34,8 @@ hide_st_style = """
     header {visibility: hidden;}
 </style>
 """
-st.markdown(hide_st_style, unsafe_allow_html=True)
+with stage('styles'):
+    st.markdown(hide_st_style, unsafe_allow_html=True)
 
 # Background image with overlay
 background_image_url = "https://www.strategyand.pwc.com/m1/en/strategic-foresight/sector-strategies/healthcare/ai-powered-healthcare-solutions/img01-section1.jpg"
@@ -81,40 +98,121 @@ page_bg_img = f"""
 }}
 </style>
 """
-st.markdown(page_bg_img, unsafe_allow_html=True)
-
-# Load models
-try:
-    models = {
-        'diabetes': pickle.load(open('Models/diabetes_model.sav', 'rb')),
-        'heart_disease': pickle.load(open('Models/heart_disease_model.sav', 'rb')),
-        'parkinsons': pickle.load(open('Models/parkinsons_model.sav', 'rb')),
-        'lung_cancer': pickle.load(open('Models/lungs_disease_model.sav', 'rb')),
-        'thyroid': pickle.load(open('Models/Thyroid_model.sav', 'rb'))
-    }
-except Exception as e:
-    st.error(f"Error loading models: {e}")
-    st.stop()
+with stage('styles'):
+    st.markdown(page_bg_img, unsafe_allow_html=True)
+
+# Load models lazily from the shared registry, so a page only unpickles its
+# own model the first time it is visited and reruns reuse the loaded copy
+def load_model(key):
+    try:
+        with stage('load', model=key):
+            return models[key]
+    except Exception as e:
+        st.error(f"Error loading models: {e}")
+        st.stop()
+
+# Predictions go through the shared LRU cache, so resubmitting the same form
+# is answered without calling the model again; every one is audit logged.
+# Uncached rows are scored by the model's micro-batcher, which coalesces
+# forms submitted at the same time by different sessions into one call
+def predict(key, input_data):
+    with stage('input', model=key):
+        block = np.asarray(input_data, dtype=np.float64)
+    with stage('predict', model=key):
+        return prediction_cache.predict(key, block, score=get_batcher(key).predict, audit='app')['prediction']
+
+# One form per prediction page: widgets inside a form do not rerun the script
+# while they are edited, so a prediction costs a single rerun on submit.
+# Returns the submitted row in MODEL_FEATURES order, or None.
+def prediction_form(key, selection):
+    page = PAGES[key]
+    bounds = {feature: (low, high) for feature, _, _, low, high in fields(key)}
+    values = {}
+    with st.form(f"{key}_form"), stage('widget', page=selection):
+        tabs = page['tabs']
+        containers = st.tabs([name for name, _ in tabs]) if tabs[0][0] else [st.container()]
+        for container, (_, columns) in zip(containers, tabs):
+            with container:
+                for column, column_fields in zip(st.columns(len(columns)), columns):
+                    with column:
+                        for feature, label, tooltip in column_fields:
+                            low, high = bounds[feature]
+                            values[feature] = st.number_input(label, min_value=low, max_value=high, step=1.0,
+                                                              key=f"{key}:{feature}", help=tooltip)
+        submitted = st.form_submit_button(page['button'])
+    if not submitted:
+        return None
+    try:
+        with stage('input', model=key):
+            return validate(key, [[values[feature] for feature in MODEL_FEATURES[key]]])
+    except ValueError as e:
+        st.error(f"Invalid input: {e}")
+        return None
+
+# Batch scoring: a CSV upload or pasted CSV with the page's feature columns is
+# validated and scored in one model call
+def batch_upload(key, selection):
+    features = MODEL_FEATURES[key]
+    with st.expander("Score many patients at once"):
+        st.caption("CSV with a header row naming these columns (extra columns are kept): " + ", ".join(features))
+        with st.form(f"{key}_batch"):
+            upload = st.file_uploader("CSV file", type=["csv"], key=f"{key}:upload")
+            pasted = st.text_area("...or paste CSV", key=f"{key}:paste", height=150)
+            submitted = st.form_submit_button("Score patients")
+        if not submitted:
+            return
+        if upload is None and not pasted.strip():
+            st.warning("Upload a file or paste some rows first.")
+            return
+        try:
+            with stage('input', page=selection, model=key):
+                frame = pd.read_csv(upload if upload is not None else io.StringIO(pasted), encoding='utf-8-sig')
+                frame.columns = frame.columns.str.strip()
+                missing = [name for name in features if name not in frame.columns]
+                if missing:
+                    raise ValueError(f"missing columns: {', '.join(missing)}")
+                block = validate(key, frame[features])
+        except (ValueError, pd.errors.ParserError) as e:
+            st.error(f"Could not score this file: {e}")
+            return
+        if not len(block):
+            st.warning("The file has a header row but no patients to score.")
+            return
+        with stage('predict', page=selection, model=key):
+            columns = prediction_cache.predict(key, block, audit='app')
+        with stage('render', page=selection, model=key):
+            for name, values in columns.items():
+                frame[name] = values
+            positive = int((columns['prediction'] == 1).sum())
+            st.success(f"Scored {len(frame)} patients: {positive} likely to have {PAGES[key]['condition']}.")
+            st.dataframe(frame)
+            st.download_button("Download results", frame.to_csv(index=False), f"{key}_predictions.csv", "text/csv")
 
 # App structure
 def main():
+    options = [
+        "Home", 
+        *PAGE_KEYS,
+        "About",
+        "Creater",
+    ]
+    icons = ["house", "activity", "heart", "person", "lungs", "thermometer", "info-circle", "person-circle"]
+    if ADMIN:
+        options.append("Admin")
+        icons.append("speedometer")
+    # The diagnostics page only exists while profiling is on
+    if instrumentation.enabled():
+        options.append("Diagnostics")
+        icons.append("stopwatch")
+
     # Sidebar navigation
-    with st.sidebar:
+    with st.sidebar, stage('menu'):
         st.title("AI - Disease Prediction System")
         
         selection = option_menu(
             menu_title="Main Menu",
-            options=[
-                "Home", 
-                "Diabetes Prediction", 
-                "Heart Disease Prediction", 
-                "Parkinson's Prediction", 
-                "Lung Cancer Prediction", 
-                "Hypo-Thyroid Prediction",
-                "About",
-                "Creater"
-            ],
-            icons=["house", "activity", "heart", "person", "lungs", "thermometer", "info-circle"],
+            options=options,
+            icons=icons,
             menu_icon="hospital",
             default_index=0,
             styles={
@@ -128,20 +226,6 @@ def main():
         st.markdown(" ")
         st.info("Created by Pranay Dhore")
     
-    # Helper function for input fields - FIXED to use consistent types
-    def display_input(label, tooltip, key, min_value=None, max_value=None, type="text"):
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            if type == "text":
-                return st.text_input(label, key=key, help=tooltip)
-            elif type == "number":
-                # Convert all numeric values to float to avoid type mismatch
-                if min_value is not None:
-                    min_value = float(min_value)
-                if max_value is not None:
-                    max_value = float(max_value)
-                return st.number_input(label, min_value=min_value, max_value=max_value, key=key, help=tooltip, step=float(1))
-        
     # Home Page
     if selection == "Home":
         st.title("Welcome to Disease Prediction System")
@@ -165,209 +249,32 @@ def main():
         ⚠️ **Disclaimer**: This tool provides predictions based on statistical models and should not replace professional medical diagnosis. Always consult healthcare professionals for medical advice.
         """)
     
-    # Diabetes Prediction Page
-    elif selection == "Diabetes Prediction":
-        st.title("Diabetes Prediction")
-        st.markdown("### Enter patient health indicators:")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            Pregnancies = display_input('Number of Pregnancies', 'Enter number of times pregnant', 'Pregnancies', 0.0, 20.0, 'number')
-            Glucose = display_input('Glucose Level (mg/dL)', 'Enter glucose level', 'Glucose', 0.0, 500.0, 'number')
-            BloodPressure = display_input('Blood Pressure (mmHg)', 'Enter blood pressure value', 'BloodPressure', 0.0, 200.0, 'number')
-            SkinThickness = display_input('Skin Thickness (mm)', 'Enter skin thickness value', 'SkinThickness', 0.0, 100.0, 'number')
-        
-        with col2:
-            Insulin = display_input('Insulin Level (μU/mL)', 'Enter insulin level', 'Insulin', 0.0, 1000.0, 'number')
-            BMI = display_input('BMI (kg/m²)', 'Enter Body Mass Index value', 'BMI', 0.0, 70.0, 'number')
-            DiabetesPedigreeFunction = display_input('Diabetes Pedigree Function', 'Enter diabetes pedigree function value', 'DiabetesPedigreeFunction', 0.0, 3.0, 'number')
-            Age = display_input('Age (years)', 'Enter age of the person', 'Age', 0.0, 120.0, 'number')
-        
-        diab_diagnosis = ''
-        if st.button('Predict Diabetes Status'):
-            input_data = [[Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age]]
-            diab_prediction = models['diabetes'].predict(input_data)
-            
-            if diab_prediction[0] == 1:
-                diab_diagnosis = "Result: The patient is likely to have diabetes."
-                st.error(diab_diagnosis)
-            else:
-                diab_diagnosis = "Result: The patient is unlikely to have diabetes."
-                st.success(diab_diagnosis)
-            
-            # Show input data summary
-            st.subheader("Patient Data Summary:")
-            data_df = {
-                "Parameter": ["Pregnancies", "Glucose", "Blood Pressure", "Skin Thickness", "Insulin", "BMI", "Diabetes Pedigree", "Age"],
-                "Value": [Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age]
-            }
-            st.dataframe(data_df)
-    
-    # Heart Disease Prediction Page
-    elif selection == "Heart Disease Prediction":
-        st.title("Heart Disease Prediction")
-        st.markdown("### Enter cardiac assessment data:")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            age = display_input('Age (years)', 'Enter age of the person', 'age', 0.0, 120.0, 'number')
-            sex = display_input('Gender (1=male; 0=female)', 'Enter Gender of the person', 'sex', 0.0, 1.0, 'number')
-            cp = display_input('Chest Pain Type (0-3)', 'Enter chest pain type', 'cp', 0.0, 3.0, 'number')
-            trestbps = display_input('Resting Blood Pressure (mmHg)', 'Enter resting blood pressure', 'trestbps', 0.0, 250.0, 'number')
-            chol = display_input('Serum Cholesterol (mg/dL)', 'Enter serum cholesterol', 'chol', 0.0, 600.0, 'number')
-        
-        with col2:
-            fbs = display_input('Fasting Blood Sugar > 120 mg/dL (1=true; 0=false)', 'Enter fasting blood sugar status', 'fbs', 0.0, 1.0, 'number')
-            restecg = display_input('Resting ECG Results (0-2)', 'Enter resting ECG results', 'restecg', 0.0, 2.0, 'number')
-            thalach = display_input('Maximum Heart Rate (bpm)', 'Enter maximum heart rate achieved', 'thalach', 0.0, 250.0, 'number')
-            exang = display_input('Exercise Induced Angina (1=yes; 0=no)', 'Enter exercise induced angina status', 'exang', 0.0, 1.0, 'number')
-        
-        with col3:
-            oldpeak = display_input('ST Depression by Exercise', 'Enter ST depression value', 'oldpeak', 0.0, 10.0, 'number')
-            slope = display_input('Slope of Peak Exercise ST Segment (0-2)', 'Enter slope value', 'slope', 0.0, 2.0, 'number')
-            ca = display_input('Number of Major Vessels (0-3)', 'Enter number of major vessels', 'ca', 0.0, 3.0, 'number')
-            thal = display_input('Thalassemia (0-2)', 'Enter thal value', 'thal', 0.0, 2.0, 'number')
-        
-        heart_diagnosis = ''
-        if st.button('Predict Heart Disease Status'):
-            input_data = [[age, sex, cp, trestbps, chol, fbs, restecg, thalach, exang, oldpeak, slope, ca, thal]]
-            heart_prediction = models['heart_disease'].predict(input_data)
-            
-            if heart_prediction[0] == 1:
-                heart_diagnosis = "Result: The patient is likely to have heart disease."
-                st.error(heart_diagnosis)
-            else:
-                heart_diagnosis = "Result: The patient is unlikely to have heart disease."
-                st.success(heart_diagnosis)
-    
-    # Parkinson's Prediction Page
-    elif selection == "Parkinson's Prediction":
-        st.title("Parkinson's Disease Prediction")
-        st.markdown("### Enter voice recording metrics:")
-        
-        tab1, tab2 = st.tabs(["Basic Metrics", "Advanced Metrics"])
-        
-        with tab1:
-            col1, col2 = st.columns(2)
-            with col1:
-                fo = display_input('MDVP:Fo(Hz)', 'Average vocal fundamental frequency', 'fo', 0.0, 500.0, 'number')
-                fhi = display_input('MDVP:Fhi(Hz)', 'Maximum vocal fundamental frequency', 'fhi', 0.0, 500.0, 'number')
-                flo = display_input('MDVP:Flo(Hz)', 'Minimum vocal fundamental frequency', 'flo', 0.0, 500.0, 'number')
-                Jitter_percent = display_input('MDVP:Jitter(%)', 'Percentage variation in fundamental frequency', 'Jitter_percent', 0.0, 5.0, 'number')
-                Jitter_Abs = display_input('MDVP:Jitter(Abs)', 'Absolute jitter in microseconds', 'Jitter_Abs', 0.0, 1.0, 'number')
-            
-            with col2:
-                RAP = display_input('MDVP:RAP', 'Relative amplitude perturbation', 'RAP', 0.0, 1.0, 'number')
-                PPQ = display_input('MDVP:PPQ', 'Five-point period perturbation quotient', 'PPQ', 0.0, 1.0, 'number')
-                DDP = display_input('Jitter:DDP', 'Average absolute difference of differences', 'DDP', 0.0, 1.0, 'number')
-                Shimmer = display_input('MDVP:Shimmer', 'Local shimmer', 'Shimmer', 0.0, 1.0, 'number')
-                Shimmer_dB = display_input('MDVP:Shimmer(dB)', 'Local shimmer in decibels', 'Shimmer_dB', 0.0, 5.0, 'number')
-        
-        with tab2:
-            col1, col2 = st.columns(2)
-            with col1:
-                APQ3 = display_input('Shimmer:APQ3', 'Three-point amplitude perturbation quotient', 'APQ3', 0.0, 1.0, 'number')
-                APQ5 = display_input('Shimmer:APQ5', 'Five-point amplitude perturbation quotient', 'APQ5', 0.0, 1.0, 'number')
-                APQ = display_input('MDVP:APQ', 'Amplitude perturbation quotient', 'APQ', 0.0, 1.0, 'number')
-                DDA = display_input('Shimmer:DDA', 'Average absolute differences between consecutive differences', 'DDA', 0.0, 1.0, 'number')
-                NHR = display_input('NHR', 'Noise to harmonic ratio', 'NHR', 0.0, 1.0, 'number')
-            
-            with col2:
-                HNR = display_input('HNR', 'Harmonic to noise ratio', 'HNR', 0.0, 50.0, 'number')
-                RPDE = display_input('RPDE', 'Recurrence period density entropy', 'RPDE', 0.0, 1.0, 'number')
-                DFA = display_input('DFA', 'Detrended fluctuation analysis', 'DFA', 0.0, 1.0, 'number')
-                spread1 = display_input('Spread1', 'Nonlinear measure of fundamental frequency variation', 'spread1', -10.0, 10.0, 'number')
-                spread2 = display_input('Spread2', 'Nonlinear measure of fundamental frequency variation', 'spread2', 0.0, 10.0, 'number')
-                D2 = display_input('D2', 'Correlation dimension', 'D2', 0.0, 10.0, 'number')
-                PPE = display_input('PPE', 'Pitch period entropy', 'PPE', 0.0, 1.0, 'number')
-        
-        parkinsons_diagnosis = ''
-        if st.button("Predict Parkinson's Status"):
-            input_data = [[fo, fhi, flo, Jitter_percent, Jitter_Abs, RAP, PPQ, DDP, 
-                          Shimmer, Shimmer_dB, APQ3, APQ5, APQ, DDA, NHR, HNR, 
-                          RPDE, DFA, spread1, spread2, D2, PPE]]
-            parkinsons_prediction = models['parkinsons'].predict(input_data)
-            
-            if parkinsons_prediction[0] == 1:
-                parkinsons_diagnosis = "Result: The patient is likely to have Parkinson's disease."
-                st.error(parkinsons_diagnosis)
-            else:
-                parkinsons_diagnosis = "Result: The patient is unlikely to have Parkinson's disease."
-                st.success(parkinsons_diagnosis)
-    
-    # Lung Cancer Prediction Page
-    elif selection == "Lung Cancer Prediction":
-        st.title("Lung Cancer Prediction")
-        st.markdown("### Enter patient symptoms and risk factors:")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            GENDER = display_input('Gender (1=Male; 0=Female)', 'Enter gender of the person', 'GENDER', 0.0, 1.0, 'number')
-            AGE = display_input('Age (years)', 'Enter age of the person', 'AGE', 0.0, 120.0, 'number')
-            SMOKING = display_input('Smoking (1=Yes; 0=No)', 'Enter if the person smokes', 'SMOKING', 0.0, 1.0, 'number')
-            YELLOW_FINGERS = display_input('Yellow Fingers (1=Yes; 0=No)', 'Enter if the person has yellow fingers', 'YELLOW_FINGERS', 0.0, 1.0, 'number')
-            ANXIETY = display_input('Anxiety (1=Yes; 0=No)', 'Enter if the person has anxiety', 'ANXIETY', 0.0, 1.0, 'number')
-        
-        with col2:
-            PEER_PRESSURE = display_input('Peer Pressure (1=Yes; 0=No)', 'Enter if the person is under peer pressure', 'PEER_PRESSURE', 0.0, 1.0, 'number')
-            CHRONIC_DISEASE = display_input('Chronic Disease (1=Yes; 0=No)', 'Enter if the person has a chronic disease', 'CHRONIC_DISEASE', 0.0, 1.0, 'number')
-            FATIGUE = display_input('Fatigue (1=Yes; 0=No)', 'Enter if the person experiences fatigue', 'FATIGUE', 0.0, 1.0, 'number')
-            ALLERGY = display_input('Allergy (1=Yes; 0=No)', 'Enter if the person has allergies', 'ALLERGY', 0.0, 1.0, 'number')
-            WHEEZING = display_input('Wheezing (1=Yes; 0=No)', 'Enter if the person experiences wheezing', 'WHEEZING', 0.0, 1.0, 'number')
-        
-        with col3:
-            ALCOHOL_CONSUMING = display_input('Alcohol Consuming (1=Yes; 0=No)', 'Enter if the person consumes alcohol', 'ALCOHOL_CONSUMING', 0.0, 1.0, 'number')
-            COUGHING = display_input('Coughing (1=Yes; 0=No)', 'Enter if the person experiences coughing', 'COUGHING', 0.0, 1.0, 'number')
-            SHORTNESS_OF_BREATH = display_input('Shortness Of Breath (1=Yes; 0=No)', 'Enter if the person experiences shortness of breath', 'SHORTNESS_OF_BREATH', 0.0, 1.0, 'number')
-            SWALLOWING_DIFFICULTY = display_input('Swallowing Difficulty (1=Yes; 0=No)', 'Enter if the person has difficulty swallowing', 'SWALLOWING_DIFFICULTY', 0.0, 1.0, 'number')
-            CHEST_PAIN = display_input('Chest Pain (1=Yes; 0=No)', 'Enter if the person experiences chest pain', 'CHEST_PAIN', 0.0, 1.0, 'number')
-        
-        lungs_diagnosis = ''
-        if st.button("Predict Lung Cancer Status"):
-            input_data = [[GENDER, AGE, SMOKING, YELLOW_FINGERS, ANXIETY, PEER_PRESSURE, CHRONIC_DISEASE, 
-                          FATIGUE, ALLERGY, WHEEZING, ALCOHOL_CONSUMING, COUGHING, SHORTNESS_OF_BREATH, 
-                          SWALLOWING_DIFFICULTY, CHEST_PAIN]]
-            lungs_prediction = models['lung_cancer'].predict(input_data)
-            
-            if lungs_prediction[0] == 1:
-                lungs_diagnosis = "Result: The patient is likely to have lung cancer."
-                st.error(lungs_diagnosis)
-            else:
-                lungs_diagnosis = "Result: The patient is unlikely to have lung cancer."
-                st.success(lungs_diagnosis)
-    
-    # Hypo-Thyroid Prediction Page
-    elif selection == "Hypo-Thyroid Prediction":
-        st.title("Hypo-Thyroid Prediction")
-        st.markdown("### Enter thyroid function test results:")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            age = display_input('Age (years)', 'Enter age of the person', 'age', 0.0, 120.0, 'number')
-            sex = display_input('Sex (1=Male; 0=Female)', 'Enter sex of the person', 'sex', 0.0, 1.0, 'number')
-            on_thyroxine = display_input('On Thyroxine (1=Yes; 0=No)', 'Enter if the person is on thyroxine', 'on_thyroxine', 0.0, 1.0, 'number')
-        
-        with col2:
-            tsh = display_input('TSH Level (mU/L)', 'Enter TSH level', 'tsh', 0.0, 100.0, 'number')
-            t3_measured = display_input('T3 Measured (1=Yes; 0=No)', 'Enter if T3 was measured', 't3_measured', 0.0, 1.0, 'number')
-            t3 = display_input('T3 Level (nmol/L)', 'Enter T3 level', 't3', 0.0, 10.0, 'number')
-            tt4 = display_input('TT4 Level (nmol/L)', 'Enter TT4 level', 'tt4', 0.0, 300.0, 'number')
-        
-        thyroid_diagnosis = ''
-        if st.button("Predict Thyroid Status"):
-            input_data = [[age, sex, on_thyroxine, tsh, t3_measured, t3, tt4]]
-            thyroid_prediction = models['thyroid'].predict(input_data)
-            
-            if thyroid_prediction[0] == 1:
-                thyroid_diagnosis = "Result: The patient is likely to have Hypo-Thyroid disease."
-                st.error(thyroid_diagnosis)
-            else:
-                thyroid_diagnosis = "Result: The patient is unlikely to have Hypo-Thyroid disease."
-                st.success(thyroid_diagnosis)
+    # Prediction pages, generated from page_schema.PAGES
+    elif selection in PAGE_KEYS:
+        key = PAGE_KEYS[selection]
+        load_model(key)
+        page = PAGES[key]
+        st.title(page['title'])
+        st.markdown(f"### {page['heading']}")
+
+        row = prediction_form(key, selection)
+        if row is not None:
+            prediction = predict(key, row)
+            with stage('render', page=selection, model=key):
+                if prediction[0] == 1:
+                    st.error(f"Result: The patient is likely to have {page['condition']}.")
+                else:
+                    st.success(f"Result: The patient is unlikely to have {page['condition']}.")
+
+                if page.get('summary'):
+                    # Show input data summary
+                    st.subheader("Patient Data Summary:")
+                    st.dataframe({
+                        "Parameter": [label for _, label, *_ in fields(key)],
+                        "Value": [row[0][MODEL_FEATURES[key].index(feature)] for feature, *_ in fields(key)],
+                    })
+
+        batch_upload(key, selection)
     
     # About Page
     elif selection == "About":
@@ -424,5 +331,123 @@ def main():
 
         st.write("📌 Feel free to reach out for collaborations and projects! 🚀")
 
+    # Admin Page
+    elif selection == "Admin" and ADMIN:
+        st.title("Admin")
+        st.markdown("### Prediction cache")
+
+        stats = prediction_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Hits", stats['hits'])
+        col2.metric("Misses", stats['misses'])
+        col3.metric("Hit rate", f"{stats['hit_rate']:.1%}")
+        col4.metric("Entries", f"{stats['entries']} / {stats['max_entries']}")
+        st.dataframe({"Counter": list(stats), "Value": [str(value) for value in stats.values()]})
+
+        st.markdown("### Micro-batching")
+        batchers = batcher_metrics()
+        if batchers:
+            st.dataframe({
+                "Model": list(batchers),
+                "Queued": [m['queue_depth'] for m in batchers.values()],
+                "Requests": [m['requests'] for m in batchers.values()],
+                "Batches": [m['batches'] for m in batchers.values()],
+                "Mean rows": [round(m['mean_batch_rows'], 2) for m in batchers.values()],
+                "Max rows": [m['max_batch_rows'] for m in batchers.values()],
+                "Mean wait ms": [round(m['mean_wait_ms'], 3) for m in batchers.values()],
+                "Max wait ms": [round(m['max_wait_ms_observed'], 3) for m in batchers.values()],
+                "Mean score ms": [round(m['mean_score_ms'], 3) for m in batchers.values()],
+            })
+        else:
+            st.info("No form predictions scored yet.")
+
+        st.markdown("### Audit log")
+        audit = audit_log.audit.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Records written", audit['records'])
+        col2.metric("Queued", audit['pending'])
+        col3.metric("Written", f"{audit['bytes'] / 2**20:.1f} MB")
+        col4.metric("Write errors", audit['errors'])
+        st.caption(f"Segments in {audit['directory']}, fsync policy: {audit['fsync']}")
+        if audit['last_error']:
+            st.error(f"Last audit write error: {audit['last_error']}")
+        if audit['dropped']:
+            st.warning(f"{audit['dropped']} audit records dropped after repeated write errors.")
+
+        st.markdown("### Loaded models")
+        st.write(", ".join(models.loaded()) or "None yet")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Clear cache"):
+                prediction_cache.clear()
+                st.success("Prediction cache cleared.")
+        with col2:
+            if st.button("Reset counters"):
+                prediction_cache.reset_stats()
+                st.success("Cache counters reset.")
+
+        st.markdown("### Input drift")
+        st.caption("Live model inputs compared with the training datasets: PSI over the training deciles "
+                   "(above 0.1 worth a look, above 0.25 shifted) and the largest gap between the distributions (KS).")
+        rows = drift.monitor.report()
+        for key, error in drift.monitor.errors().items():
+            st.warning(f"No training reference for {key}, its inputs are not being compared: {error}")
+        if rows:
+            st.dataframe({
+                "Model": [row['model'] for row in rows],
+                "Feature": [row['feature'] for row in rows],
+                "Status": [row['status'] for row in rows],
+                "PSI": [round(row['psi'], 3) for row in rows],
+                "KS": [round(row['ks'], 3) for row in rows],
+                "Mean": [round(row['mean'], 3) for row in rows],
+                "Training mean": [round(row['reference_mean'], 3) for row in rows],
+                "Median": [row['p50'] for row in rows],
+                "Training median": [row['reference_p50'] for row in rows],
+                "Range": [f"{row['min']:g} – {row['max']:g}" for row in rows],
+                "Rows": [row['rows'] for row in rows],
+            })
+        else:
+            st.info("No predictions observed yet.")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Drift metrics (Prometheus)", drift.prometheus_text(rows), "drift.prom", "text/plain")
+        with col2:
+            if st.button("Reset drift window"):
+                drift.monitor.reset()
+                st.success("Drift sketches reset.")
+
+    # Diagnostics Page (only listed when DISEASE_APP_PROFILE is set)
+    elif selection == "Diagnostics":
+        st.title("Diagnostics")
+        st.markdown("### Time per stage")
+
+        rows = instrumentation.snapshot()
+        if rows:
+            st.dataframe({
+                "Stage": [row['stage'] for row in rows],
+                "Page": [row['page'] for row in rows],
+                "Model": [row['model'] for row in rows],
+                "Count": [row['count'] for row in rows],
+                "Mean (ms)": [round(row['mean_ms'], 3) for row in rows],
+                "p50 ≤ (ms)": [row['p50_ms_le'] for row in rows],
+                "p99 ≤ (ms)": [row['p99_ms_le'] for row in rows],
+                "Total (ms)": [round(row['total_ms'], 1) for row in rows],
+            })
+        else:
+            st.info("No timings recorded yet.")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("Prometheus text", instrumentation.prometheus_text(), "metrics.prom", "text/plain")
+        with col2:
+            st.download_button("JSON", instrumentation.to_json(), "metrics.json", "application/json")
+        with col3:
+            if st.button("Reset timings"):
+                instrumentation.reset()
+                st.success("Timings reset.")
+
 if __name__ == '__main__':
-    main()
+    with stage('rerun'):
+        main()
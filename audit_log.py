@@ -0,0 +1,446 @@
+# Append-only audit log of every prediction
+#
+# app.py and serve.py hand each scored block to record(), which only puts a
+# tuple on a queue. A background thread drains the queue and writes the
+# records in batches to segment files in audit/ (DISEASE_APP_AUDIT_DIR):
+#
+#   segment  SEGMENT_MAGIC, then frames, appended and never rewritten
+#   frame    FRAME header (magic, payload bytes, CRC32 of the payload, rows,
+#            features, metadata bytes, first and last timestamp), then the
+#            payload: JSON metadata {model, version, mtime_ns, source}, and
+#            the columns time_ns int64[rows], features float64[rows, features],
+#            prediction int64[rows], probability float64[rows] (NaN when the
+#            model has none)
+#
+# One frame holds the records of one model, version and source from one
+# flush, so inputs are stored as a plain float64 matrix. A reader can skip a
+# frame by its header alone, without touching the payload, and a frame torn
+# by a crash fails its length or CRC check and ends the segment.
+#
+# Segments rotate at segment_bytes or after segment_seconds. fsync policy:
+#   always    after every flush (nothing acknowledged is lost on power failure)
+#   interval  at most every fsync_interval seconds (default)
+#   never     leave it to the OS
+#
+# A batch that cannot be written (disk full, directory gone) is kept and
+# retried on the next flush; beyond max_pending_rows the oldest records are
+# dropped and counted. flush() only returns True once its records are on disk.
+#
+# Environment:
+#   DISEASE_APP_AUDIT=0                  switch recording off
+#   DISEASE_APP_AUDIT_DIR                segment directory (default audit/)
+#   DISEASE_APP_AUDIT_FSYNC              always, interval or never
+#   DISEASE_APP_AUDIT_SEGMENT_MB         rotate segments at this size (default 64)
+#   DISEASE_APP_AUDIT_SEGMENT_SECONDS    and after this age (default one day)
+#
+# Usage:
+#   python audit_log.py                                  # summary of audit/
+#   python audit_log.py --model thyroid --since 2026-01-01T00:00 -o thyroid.csv
+import argparse
+import atexit
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from model_registry import BASE_DIR
+from settings import env_flag
+
+AUDIT_DIR = os.environ.get('DISEASE_APP_AUDIT_DIR') or os.path.join(BASE_DIR, 'audit')
+
+SEGMENT_MAGIC = b'DAPAUD01'
+FRAME_MAGIC = b'AUDF'
+# magic, payload bytes, payload crc32, rows, features, metadata bytes, first time_ns, last time_ns
+FRAME = struct.Struct('<4sIIIHHqq')
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+FSYNC = os.environ.get('DISEASE_APP_AUDIT_FSYNC') or 'interval'
+SEGMENT_BYTES = int(float(os.environ.get('DISEASE_APP_AUDIT_SEGMENT_MB') or 64) * 2**20)
+SEGMENT_SECONDS = float(os.environ.get('DISEASE_APP_AUDIT_SEGMENT_SECONDS') or 24 * 3600)
+
+_enabled = env_flag('DISEASE_APP_AUDIT', True)
+_STOP = object()
+
+
+def segment_name(started_ns, sequence):
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(started_ns / 1e9))
+    return f"audit-{stamp}-{os.getpid()}-{sequence:06d}.seg"
+
+
+def encode_frame(meta, times, X, prediction, probability):
+    meta = json.dumps(meta, separators=(',', ':')).encode()
+    payload = b''.join([
+        meta,
+        np.ascontiguousarray(times, dtype='<i8').tobytes(),
+        np.ascontiguousarray(X, dtype='<f8').tobytes(),
+        np.ascontiguousarray(prediction, dtype='<i8').tobytes(),
+        np.ascontiguousarray(probability, dtype='<f8').tobytes(),
+    ])
+    header = FRAME.pack(FRAME_MAGIC, len(payload), zlib.crc32(payload), len(times), X.shape[1], len(meta),
+                        int(times[0]), int(times[-1]))
+    return header + payload
+
+
+class AuditLog:
+    """Write-behind audit log: record() enqueues, a background thread writes."""
+
+    def __init__(self, directory=AUDIT_DIR, flush_rows=1024, flush_interval=0.2, fsync=FSYNC,
+                 fsync_interval=1.0, segment_bytes=SEGMENT_BYTES, segment_seconds=SEGMENT_SECONDS,
+                 max_pending_rows=100_000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}, not {fsync!r}")
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_pending_rows = max_pending_rows
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._segment_started = 0.0
+        self._sequence = 0
+        self._last_fsync = 0.0
+        self.records = 0
+        self.frames = 0
+        self.bytes = 0
+        self.segments = 0
+        self.fsyncs = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def record(self, key, version, block, result, source):
+        """Queue one scored block: `version` is the registry's (path, mtime_ns),
+        `result` the score_block columns. Neither may be modified afterwards."""
+        if not len(block):
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put((time.time_ns(), key, version, source, block, result))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                thread.start()
+                self._thread = thread
+                atexit.register(self.close)
+
+    def close(self):
+        """Write everything queued so far and stop the writer thread."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued before the call is written (for tests and tools);
+        False if it is not on disk within `timeout` seconds."""
+        done = threading.Event()
+        self._queue.put(done)
+        if self._thread is None:
+            self._start()
+        return done.wait(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            'directory': self.directory,
+            'records': self.records,
+            'pending': self.pending(),
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'segments': self.segments,
+            'fsync': self.fsync,
+            'fsyncs': self.fsyncs,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'last_error': self.last_error,
+        }
+
+    def _run(self):
+        batch = []
+        rows = 0
+        waiters = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+                rows += len(item[4])
+                if rows < self.flush_rows and time.monotonic() < deadline:
+                    continue
+            elif time.monotonic() < deadline:
+                continue
+
+            try:
+                if batch and self._write(batch):
+                    batch = []
+                    rows = 0
+                if stopping:
+                    self._close_segment()
+            except Exception as e:
+                # The thread must outlive any bad record: drop the batch
+                self._error(e)
+                batch = []
+                rows = 0
+            if batch and stopping:
+                self.dropped += rows
+            elif rows > self.max_pending_rows:
+                # The write keeps failing: keep only the newest records
+                while rows > self.max_pending_rows:
+                    rows -= len(batch[0][4])
+                    self.dropped += len(batch[0][4])
+                    del batch[0]
+            if not batch or stopping:
+                # Flushes waiting on a failed batch wait for its retry
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+            deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch):
+        groups = {}
+        for item in batch:
+            # (model, version, source)
+            groups.setdefault(item[1:4], []).append(item)
+        frames = []
+        written = 0
+        for group_key, items in groups.items():
+            try:
+                frames.append(self._frame(group_key, items))
+            except Exception as e:
+                # Records that cannot be encoded would fail every retry; drop them
+                self._error(e)
+                continue
+            written += sum(len(item[4]) for item in items)
+        data = b''.join(frames)
+        if not data:
+            return True
+        try:
+            self._segment(len(data)).write(data)
+            self._file.flush()
+            now = time.monotonic()
+            due = self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval
+            if self.fsync == 'always' or due:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+                self.fsyncs += 1
+        except OSError as e:
+            # Keep the batch and retry on the next flush
+            self._error(e)
+            self._close_segment()
+            return False
+        self.records += written
+        self.frames += len(frames)
+        self.bytes += len(data)
+        return True
+
+    def _error(self, e):
+        self.errors += 1
+        self.last_error = f"{type(e).__name__}: {e}"
+        print(f"audit log: {self.last_error}", file=sys.stderr)
+
+    def _frame(self, group_key, items):
+        key, (path, mtime_ns), source = group_key
+        blocks = [item[4] for item in items]
+        counts = [len(block) for block in blocks]
+        X = np.concatenate(blocks).reshape(sum(counts), -1)
+        times = np.repeat(np.fromiter((item[0] for item in items), dtype=np.int64, count=len(items)), counts)
+        prediction = np.concatenate([item[5]['prediction'] for item in items])
+        probability = np.concatenate([item[5]['probability'] if 'probability' in item[5] else np.full(n, np.nan)
+                                      for item, n in zip(items, counts)])
+        meta = {'model': key, 'version': os.path.relpath(path, BASE_DIR), 'mtime_ns': mtime_ns, 'source': source}
+        return encode_frame(meta, times, X, prediction, probability)
+
+    def _segment(self, incoming):
+        # Called from the writer thread only
+        if self._file is not None:
+            full = self._file.tell() + incoming > self.segment_bytes and self._file.tell() > len(SEGMENT_MAGIC)
+            if full or time.monotonic() - self._segment_started >= self.segment_seconds:
+                self._close_segment()
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._sequence += 1
+            path = os.path.join(self.directory, segment_name(time.time_ns(), self._sequence))
+            self._file = open(path, 'ab')
+            if self._file.tell() == 0:
+                self._file.write(SEGMENT_MAGIC)
+            self._segment_started = time.monotonic()
+            self.segments += 1
+        return self._file
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            if self.fsync != 'never':
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+            self._file.close()
+        except OSError as e:
+            self._error(e)
+        self._file = None
+
+
+audit = AuditLog()
+
+
+def record(key, version, block, result, source):
+    if _enabled:
+        audit.record(key, version, block, result, source)
+
+
+# Reading
+
+def segments(directory=AUDIT_DIR):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names)
+            if name.startswith('audit-') and name.endswith('.seg')]
+
+
+def read_segment(path, model=None, source=None, since_ns=None, until_ns=None, verify=True):
+    """Yield (meta, columns) for every frame of the segment at `path` with
+    matching records; columns are read-only arrays into the memory-mapped file,
+    and frames excluded by their header are never paged in."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < len(SEGMENT_MAGIC):
+            return
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+        raise ValueError(f"{path} is not an audit segment")
+    offset = len(SEGMENT_MAGIC)
+    while offset + FRAME.size <= len(data):
+        magic, size, crc, rows, width, meta_size, first, last = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        end = start + size
+        if magic != FRAME_MAGIC or end > len(data):
+            # A frame cut short by a crash mid-write ends the segment
+            return
+        offset = end
+        if (since_ns is not None and last < since_ns) or (until_ns is not None and first >= until_ns):
+            continue
+        payload = memoryview(data)[start:end]
+        if verify and zlib.crc32(payload) != crc:
+            return
+        meta = json.loads(bytes(payload[:meta_size]))
+        if (model is not None and meta['model'] != model) or (source is not None and meta['source'] != source):
+            continue
+        at = meta_size
+        columns = {}
+        for name, dtype, count in (('time_ns', '<i8', rows), ('features', '<f8', rows * width),
+                                   ('prediction', '<i8', rows), ('probability', '<f8', rows)):
+            columns[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=at)
+            at += count * 8
+        columns['features'] = columns['features'].reshape(rows, width)
+        if since_ns is not None or until_ns is not None:
+            keep = np.ones(rows, dtype=bool)
+            if since_ns is not None:
+                keep &= columns['time_ns'] >= since_ns
+            if until_ns is not None:
+                keep &= columns['time_ns'] < until_ns
+            if not keep.all():
+                columns = {name: values[keep] for name, values in columns.items()}
+        yield meta, columns
+
+
+def scan(directory=AUDIT_DIR, model=None, source=None, since_ns=None, until_ns=None, verify=True):
+    """Yield (meta, columns) for every matching frame of every segment, oldest segment first."""
+    for path in segments(directory):
+        yield from read_segment(path, model, source, since_ns, until_ns, verify)
+
+
+def load(model, directory=AUDIT_DIR, source=None, since_ns=None, until_ns=None):
+    """The audit records of `model` as one DataFrame, one column per feature."""
+    import pandas as pd
+
+    from features import MODEL_FEATURES
+
+    frames = []
+    for meta, columns in scan(directory, model, source, since_ns, until_ns):
+        frame = pd.DataFrame(columns['features'], columns=MODEL_FEATURES[model])
+        frame.insert(0, 'time', pd.to_datetime(columns['time_ns'], unit='ns', utc=True))
+        frame.insert(1, 'version', meta['version'])
+        frame.insert(2, 'mtime_ns', meta['mtime_ns'])
+        frame.insert(3, 'source', meta['source'])
+        frame['prediction'] = columns['prediction']
+        frame['probability'] = columns['probability']
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['time', 'version', 'mtime_ns', 'source', *MODEL_FEATURES[model],
+                                     'prediction', 'probability'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _time_ns(text):
+    stamp = datetime.fromisoformat(text)
+    if stamp.tzinfo is None:
+        stamp = stamp.astimezone()
+    return int(stamp.timestamp() * 1e9)
+
+
+def main(argv=None):
+    from features import MODEL_FEATURES
+
+    parser = argparse.ArgumentParser(description='Summarise or export the prediction audit log.')
+    parser.add_argument('--dir', default=AUDIT_DIR)
+    parser.add_argument('--model', choices=list(MODEL_FEATURES))
+    parser.add_argument('--source', help='app or serve')
+    parser.add_argument('--since', help='ISO time, local unless it has an offset')
+    parser.add_argument('--until', help='ISO time, local unless it has an offset')
+    parser.add_argument('-o', '--output', help='write the matching records of --model to this CSV')
+    args = parser.parse_args(argv)
+    since = _time_ns(args.since) if args.since else None
+    until = _time_ns(args.until) if args.until else None
+
+    if args.output:
+        if args.model is None:
+            parser.error('--output needs --model')
+        records = load(args.model, args.dir, args.source, since, until)
+        records.to_csv(args.output, index=False)
+        print(f"{len(records)} records -> {args.output}")
+        return
+
+    start = time.perf_counter()
+    totals = {}
+    for meta, columns in scan(args.dir, args.model, args.source, since, until):
+        entry = totals.setdefault((meta['model'], meta['version'], meta['source']), [0, 0])
+        entry[0] += len(columns['prediction'])
+        entry[1] += int((columns['prediction'] == 1).sum())
+    seconds = time.perf_counter() - start
+    paths = segments(args.dir)
+    print(f"{args.dir}: {len(paths)} segment(s), {sum(os.path.getsize(p) for p in paths) / 2**20:.1f} MB, "
+          f"{sum(count for count, _ in totals.values())} matching records scanned in {seconds:.3f}s")
+    for (model, version, source), (count, positive) in sorted(totals.items()):
+        print(f"  {model:<15}{source:<7}{count:>10} records, {positive:>8} positive  {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+# Headless batch scoring
+#
+# Streams a CSV laid out like the files in Datasets/ through one of the models
+# in fixed-size chunks. Each chunk becomes one contiguous float64 block in the
+# model's feature order and is scored with a single predict/predict_proba
+# call, so memory stays flat however large the input is.
+#
+# Usage:
+#   python batch_score.py diabetes Datasets/diabetes_data.csv -o scores.csv
+#   python batch_score.py thyroid patients.csv -o scores.parquet --keep patient_id
+#   python batch_score.py all combined.csv -o scores.csv --workers 8 --chunksize 50000
+#
+# A combined file scored by several models holds each model's features once.
+# Feature names used by more than one of the selected models (age and sex
+# for heart_disease and thyroid, which encode sex differently) must be given
+# per model, as <model>.<feature> columns, e.g. heart_disease.sex and
+# thyroid.sex.
+import argparse
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import MODEL_FEATURES
+from model_registry import registry
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def read_chunks(path, columns, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield (offset, chunk) with only `columns` read and header names stripped."""
+    wanted = set(columns)
+    reader = pd.read_csv(
+        path,
+        chunksize=chunksize,
+        encoding='utf-8-sig',
+        usecols=lambda column: column.strip() in wanted,
+    )
+    offset = 0
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        missing = [name for name in columns if name not in chunk.columns]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def feature_block(chunk, features, offset=0, path='input'):
+    """Build a C-contiguous float64 array with the columns in `features` order."""
+    frame = chunk[features]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes):
+        # Text that is not a number becomes NaN and is reported below
+        frame = frame.apply(pd.to_numeric, errors='coerce')
+    block = np.ascontiguousarray(frame.to_numpy(dtype=np.float64))
+    bad = np.isnan(block).any(axis=1)
+    if bad.any():
+        row = offset + int(np.argmax(bad))
+        raise ValueError(f"{path}: row {row} has missing or non-numeric features")
+    return block
+
+
+def input_columns(keys):
+    """{model key: input column of each of its features} for a file scored by `keys`.
+
+    Features shared by several of the models are read from <model>.<feature>
+    columns, never from one column feeding them all.
+    """
+    users = {}
+    for key in keys:
+        for name in MODEL_FEATURES[key]:
+            users[name] = users.get(name, 0) + 1
+    return {key: [f"{key}.{name}" if users[name] > 1 else name for name in MODEL_FEATURES[key]] for key in keys}
+
+
+def read_model_blocks(path, keys, chunksize=DEFAULT_CHUNKSIZE, keep=()):
+    """Yield (kept_columns, {model key: block}) per chunk of `path`.
+
+    Each block is a C-contiguous float64 array in that model's feature order;
+    `kept_columns` holds the requested passthrough columns untouched.
+    """
+    features = input_columns(keys)
+    columns = list(dict.fromkeys([name for key in keys for name in features[key]] + list(keep)))
+    for offset, chunk in read_chunks(path, columns, chunksize):
+        blocks = {key: feature_block(chunk, features[key], offset, path) for key in keys}
+        yield chunk[list(keep)].reset_index(drop=True), blocks
+
+
+def score_block(model, block):
+    """Score a whole block with one vectorized call and return output columns."""
+    if hasattr(model, 'predict_proba'):
+        # One predict_proba call gives both columns; predict would redo the work
+        proba = model.predict_proba(block)
+        return {'prediction': model.classes_[proba.argmax(axis=1)], 'probability': proba[:, 1]}
+    return {'prediction': model.predict(block)}
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            # Empty input still produces a valid (empty) file
+            open(self.path, 'w').close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.path = path
+        self.writer = None
+
+    def write(self, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_writer(path):
+    if path.endswith('.parquet') or path.endswith('.pq'):
+        return ParquetWriter(path)
+    return CsvWriter(path)
+
+
+def output_frame(kept, result):
+    frame = kept.copy()
+    for name, values in result.items():
+        frame[name] = values
+    return frame
+
+
+def score_blocks(models, blocks):
+    """Score {key: block} with every model; column names are prefixed by model key."""
+    result = {}
+    for key, block in blocks.items():
+        for name, values in score_block(models[key], block).items():
+            result[f"{key}_{name}"] = values
+    return result
+
+
+# Worker processes load the models once in the pool initializer; tasks only
+# carry the feature blocks, never the pickled estimators.
+_worker_models = {}
+
+
+def _init_worker(keys):
+    warnings.filterwarnings('ignore')
+    for key in keys:
+        _worker_models[key] = registry[key]
+
+
+def _score_task(blocks):
+    return score_blocks(_worker_models, blocks)
+
+
+def ordered_map(executor, fn, items, window):
+    """Map `fn` over `items` in `executor`, keeping at most `window` tasks in flight.
+
+    Results come back in input order, and the bounded window keeps the reader
+    from racing ahead of the workers and buffering the whole file.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def score_file(key, input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, keep=(), workers=1):
+    """Score every row of `input_path` with model `key`; return the row count.
+
+    `key` may also be a list of model keys, in which case every model scores
+    every row of a combined patient file and output columns are prefixed with
+    the model key. With `workers` > 1 chunks are scored in a process pool.
+    """
+    keys = [key] if isinstance(key, str) else list(key)
+    writer = open_writer(output_path)
+    rows = 0
+    try:
+        chunks = read_model_blocks(input_path, keys, chunksize, keep)
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(keys,))
+            with executor:
+                kept_columns = deque()
+
+                def blocks_only():
+                    for kept, blocks in chunks:
+                        kept_columns.append(kept)
+                        yield blocks
+
+                results = ordered_map(executor, _score_task, blocks_only(), window=workers * 2)
+                for result in results:
+                    rows += _write(writer, kept_columns.popleft(), result, keys)
+        else:
+            models = {k: registry[k] for k in keys}
+            for kept, blocks in chunks:
+                rows += _write(writer, kept, score_blocks(models, blocks), keys)
+    finally:
+        writer.close()
+    return rows
+
+
+def _write(writer, kept, result, keys):
+    if len(keys) == 1:
+        # A single model keeps the plain prediction/probability column names
+        prefix = f"{keys[0]}_"
+        result = {name[len(prefix):]: values for name, values in result.items()}
+    writer.write(output_frame(kept, result))
+    return len(kept)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV of patients with one of the disease models.')
+    parser.add_argument('model', help=f"model key, comma-separated keys or 'all' ({', '.join(MODEL_FEATURES)})")
+    parser.add_argument('input', help='CSV with the model feature columns (see features.py)')
+    parser.add_argument('-o', '--output', required=True, help='output .csv or .parquet file')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='rows per chunk')
+    parser.add_argument('--keep', default='', help='comma-separated input columns to copy to the output')
+    parser.add_argument('--workers', type=int, default=1, help='processes to score chunks in (default: 1, in-process)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    keep = [name.strip() for name in args.keep.split(',') if name.strip()]
+    keys = list(MODEL_FEATURES) if args.model == 'all' else [k.strip() for k in args.model.split(',')]
+    unknown = [k for k in keys if k not in MODEL_FEATURES]
+    if unknown:
+        raise SystemExit(f"Unknown model(s): {', '.join(unknown)}")
+
+    # The models were fitted on DataFrames; blocks are plain arrays on purpose
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    start = time.perf_counter()
+    try:
+        rows = score_file(keys, args.input, args.output, args.chunksize, keep, args.workers)
+    except ValueError as e:
+        # Bad input: no traceback, and no partial output that looks like a result
+        if os.path.exists(args.output):
+            os.remove(args.output)
+        raise SystemExit(f"batch_score: {e}")
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed * 60 if elapsed else float('inf')
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/min) -> {os.path.abspath(args.output)}",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
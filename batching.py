@@ -0,0 +1,159 @@
+# Micro-batching request coalescer
+#
+# A single-row sklearn call is mostly fixed overhead (input validation, array
+# conversion, per-call setup). A MicroBatcher sits in front of one model and
+# gathers concurrent requests for up to `max_wait_ms` or `max_batch` rows,
+# scores the stacked matrix with one vectorized call and hands each caller
+# its own slice of the result.
+#
+# submit() returns a concurrent.futures.Future, so it works from threads
+# (Streamlit sessions) and from asyncio via asyncio.wrap_future().
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from batch_score import score_block
+from model_registry import registry
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class MicroBatcher:
+    def __init__(self, key, max_batch=64, max_wait_ms=2.0):
+        self.key = key
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._batches = 0
+        self._rows = 0
+        self._requests = 0
+        self._max_rows = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._score_total = 0.0
+        self._histogram = [0] * (len(BATCH_BUCKETS) + 1)
+
+    def submit(self, block):
+        """Queue a (rows, features) block; the future resolves to its result columns."""
+        future = Future()
+        self._queue.put((np.asarray(block, dtype=np.float64), future, time.perf_counter()))
+        if self._thread is None:
+            self._start()
+        return future
+
+    def predict(self, block):
+        return self.submit(block).result()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.key}", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            rows = len(first[0])
+            deadline = first[2] + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            # Drop requests whose caller gave up (asyncio.wrap_future cancels
+            # the future with the awaiting task); the rest can no longer be
+            # cancelled, so setting their results below cannot fail
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._score(batch, sum(len(item[0]) for item in batch))
+            except Exception as e:
+                # Never let the thread die: every later submit() would hang
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _score(self, batch, rows):
+        started = time.perf_counter()
+        try:
+            stacked = batch[0][0] if len(batch) == 1 else np.concatenate([item[0] for item in batch])
+            result = score_block(registry[self.key], stacked)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        offset = 0
+        for block, future, _ in batch:
+            end = offset + len(block)
+            future.set_result({name: values[offset:end] for name, values in result.items()})
+            offset = end
+
+        with self._lock:
+            self._batches += 1
+            self._rows += rows
+            self._requests += len(batch)
+            self._max_rows = max(self._max_rows, rows)
+            for _, _, queued in batch:
+                self._wait_total += started - queued
+            self._wait_max = max(self._wait_max, started - batch[0][2])
+            self._score_total += finished - started
+            self._histogram[np.searchsorted(BATCH_BUCKETS, rows)] += 1
+
+    def metrics(self):
+        with self._lock:
+            batches = self._batches or 1
+            requests = self._requests or 1
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'requests': self._requests,
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_rows': self._rows / batches,
+                'max_batch_rows': self._max_rows,
+                'mean_wait_ms': self._wait_total / requests * 1000,
+                'max_wait_ms_observed': self._wait_max * 1000,
+                'mean_score_ms': self._score_total / batches * 1000,
+                'batch_rows_histogram': {
+                    **{f"le_{bound}": count for bound, count in zip(BATCH_BUCKETS, self._histogram)},
+                    'gt_max': self._histogram[-1],
+                },
+            }
+
+    def reset_metrics(self):
+        with self._lock:
+            self._reset_metrics()
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(key, max_batch=64, max_wait_ms=2.0):
+    """The process-wide batcher for model `key`, created on first use."""
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.setdefault(key, MicroBatcher(key, max_batch, max_wait_ms))
+    return batcher
+
+
+def batcher_metrics():
+    return {key: batcher.metrics() for key, batcher in _batchers.items()}
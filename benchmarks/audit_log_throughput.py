@@ -0,0 +1,67 @@
+# Cost of the prediction audit log
+#
+# Records --records single-row thyroid predictions through an AuditLog in a
+# temporary directory, as app.py and serve.py do, and reports:
+#   record us     time per record() call on the request path
+#   drain s       time for the writer thread to write everything queued
+#   bytes/record  segment bytes per record
+#   scan          records per second for a full scan, and for a scan that
+#                 filters on another model and so skips every frame by header
+#
+# Usage: python benchmarks/audit_log_throughput.py [--records 1000000] [--fsync interval]
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from audit_log import FSYNC_POLICIES, AuditLog, scan, segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure audit log write and scan throughput')
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='interval')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix='audit_log_')
+    try:
+        log = AuditLog(work, fsync=args.fsync)
+        version = (os.path.join(ROOT, 'Models', 'Thyroid_model.sav'), 0)
+        rows = np.random.default_rng(0).uniform(0, 100, (1000, 1, 7))
+        results = [{'prediction': np.array([i % 2]), 'probability': np.array([0.5])} for i in range(1000)]
+
+        start = time.perf_counter()
+        for i in range(args.records):
+            log.record('thyroid', version, rows[i % 1000], results[i % 1000], 'app')
+        record = (time.perf_counter() - start) / args.records
+        start = time.perf_counter()
+        log.close()
+        drain = time.perf_counter() - start
+        size = sum(os.path.getsize(path) for path in segments(work))
+
+        start = time.perf_counter()
+        found = sum(len(columns['prediction']) for _, columns in scan(work))
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        sum(len(columns['prediction']) for _, columns in scan(work, model='diabetes'))
+        skipped = time.perf_counter() - start
+
+        print(f"records          {found:,} of {args.records:,} written, fsync {args.fsync}")
+        print(f"record us        {record * 1e6:.2f}")
+        print(f"drain s          {drain:.2f} after the last record() call")
+        print(f"bytes/record     {size / found:.1f} ({size / 2**20:.1f} MB in {len(segments(work))} segment(s))")
+        print(f"scan             {found / full:,.0f} records/s")
+        print(f"filtered scan    {found / skipped:,.0f} records/s")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
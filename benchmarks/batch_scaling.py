@@ -0,0 +1,66 @@
+# Scaling of batch_score.py's process-pool mode across worker counts
+#
+# Builds a combined patient file by resampling rows from Datasets/ (one set of
+# columns per model) and scores it with all five models at 1, 2, 4 and 8
+# workers, checking that every run produces identical output.
+#
+# Usage: python benchmarks/batch_scaling.py [--rows 400000] [--chunksize 20000]
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_score import input_columns, score_file
+from column_store import open_store
+from features import MODEL_DATASETS, MODEL_FEATURES
+
+def combined_patients(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {'patient_id': np.arange(rows)}
+    names = input_columns(list(MODEL_DATASETS))
+    for key, (path, _) in MODEL_DATASETS.items():
+        store = open_store(os.path.join(ROOT, path))
+        sample = rng.integers(0, store.rows, rows)
+        for feature, name in zip(MODEL_FEATURES[key], names[key]):
+            columns[name] = store.values(feature)[sample]
+    return pd.DataFrame(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel batch scoring')
+    parser.add_argument('--rows', type=int, default=400_000)
+    parser.add_argument('--chunksize', type=int, default=20_000)
+    parser.add_argument('--workers', default='1,2,4,8')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'combined.csv')
+        combined_patients(args.rows).to_csv(source, index=False)
+
+        print(f"{args.rows} rows x {len(MODEL_DATASETS)} models, chunksize {args.chunksize}, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8}{'seconds':>10}{'rows/min':>14}{'speedup':>9}")
+        baseline = reference = None
+        for workers in [int(w) for w in args.workers.split(',')]:
+            output = os.path.join(tmp, f"scores_{workers}.csv")
+            start = time.perf_counter()
+            score_file(list(MODEL_DATASETS), source, output, args.chunksize, ['patient_id'], workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            reference = reference or output
+            same = filecmp.cmp(reference, output, shallow=False)
+            print(f"{workers:>8}{elapsed:>10.2f}{args.rows / elapsed * 60:>14,.0f}{baseline / elapsed:>8.2f}x"
+                  + ('' if same else '  OUTPUT DIFFERS'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# Load time and memory of the column store against pandas.read_csv
+#
+# Scales Datasets/hypothyroid.csv (30 mixed columns with '?' and t/f values)
+# up to --size-mb by repeating its rows, then loads it every way the tools do,
+# each in a fresh interpreter so peak RSS is not polluted by earlier cases:
+#   read_csv all          pandas.read_csv of every column
+#   read_csv 7 features   pandas.read_csv(usecols=) of the thyroid features
+#   store convert         one-time CSV -> column store conversion
+#   store frame all       open the store, DataFrame of every column
+#   store matrix 7        open the store, float64 matrix of the thyroid features
+#   store scan TSH        open the store, sum one memory-mapped column
+#
+# Peak RSS includes the interpreter and imports; the "imports only" row is
+# that floor. Store reads come from the page cache after the conversion.
+#
+# Usage: python benchmarks/column_store_load.py [--size-mb 1024] [--keep]
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import MODEL_FEATURES
+
+SOURCE = os.path.join(ROOT, 'Datasets', 'hypothyroid.csv')
+
+CASE = """
+import json, resource, sys, time, warnings
+warnings.simplefilter('ignore')
+sys.path.insert(0, {root!r})
+import numpy as np
+import pandas as pd
+from column_store import convert, open_store, store_dir
+path, cache = {path!r}, {cache!r}
+features = {features!r}
+start = time.perf_counter()
+{body}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}}))
+"""
+
+CASES = [
+    ('imports only', "pass"),
+    ('read_csv all', "data = pd.read_csv(path, na_values='?')"),
+    ('read_csv 7 features', "data = pd.read_csv(path, na_values='?', usecols=features)"),
+    ('store convert', "convert(path, store_dir(path, cache))"),
+    ('store frame all', "data = open_store(path, cache).frame()"),
+    ('store matrix 7', "X = open_store(path, cache).matrix(features, encodings={'sex': {'F': 1, 'M': 0}})"),
+    ('store scan TSH', "total = np.nansum(open_store(path, cache).column('TSH'))"),
+]
+
+
+def scaled_csv(path, size_mb):
+    with open(SOURCE, 'rb') as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    repeats = max(1, size_mb * 2**20 // len(body))
+    with open(path, 'wb') as f:
+        f.write(header)
+        for _ in range(repeats):
+            f.write(body)
+    return repeats * body.count(b'\n')
+
+
+def run_case(body, path, cache):
+    code = CASE.format(root=ROOT, path=path, cache=cache, features=MODEL_FEATURES['thyroid'], body=body)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1:] or [f"exit {out.returncode}"]
+    return json.loads(out.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare column store loads with pandas.read_csv')
+    parser.add_argument('--size-mb', type=int, default=1024, help='size of the synthetic CSV')
+    parser.add_argument('--dir', help='work directory (default: a temporary one)')
+    parser.add_argument('--keep', action='store_true', help='keep the CSV and store afterwards')
+    args = parser.parse_args()
+
+    work = args.dir or tempfile.mkdtemp(prefix='column_store_')
+    os.makedirs(work, exist_ok=True)
+    path = os.path.join(work, 'hypothyroid_scaled.csv')
+    cache = os.path.join(work, 'columns')
+    try:
+        rows = scaled_csv(path, args.size_mb)
+        print(f"{path}: {os.path.getsize(path) / 2**20:.0f} MB, {rows} rows, 30 columns")
+        print(f"{'case':<22}{'seconds':>10}{'peak RSS MB':>14}")
+        for name, body in CASES:
+            result, error = run_case(body, path, cache)
+            if result is None:
+                print(f"{name:<22}  failed: {error[0] if error else ''}")
+                continue
+            print(f"{name:<22}{result['seconds']:>10.3f}{result['peak_rss'] / 2**20:>14.0f}", flush=True)
+        store_mb = sum(os.path.getsize(os.path.join(root, name))
+                       for root, _, files in os.walk(cache) for name in files) / 2**20
+        print(f"store size on disk: {store_mb:.0f} MB")
+    finally:
+        if not args.keep and not args.dir:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Cost of the input drift monitor on the prediction path
+#
+# For each model, feeds rows resampled from its dataset to a fresh
+# DriftMonitor one at a time (as the app and serve.py see them) and in blocks
+# of 100, and reports the mean cost per row including the periodic flushes
+# into the sketches. Also times report() and a cached single-row
+# prediction_cache.predict with the monitor switched on and off.
+#
+# Usage: python benchmarks/drift_overhead.py [--rows 100000]
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import drift
+from column_store import dataset_features
+from features import MODEL_FEATURES
+from prediction_cache import PredictionCache
+
+
+def per_row(monitor, key, X, block):
+    start = time.perf_counter()
+    for i in range(0, len(X), block):
+        monitor.observe(key, X[i:i + block])
+    return (time.perf_counter() - start) / len(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the drift monitor overhead')
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', UserWarning)
+    rng = np.random.default_rng(0)
+
+    print(f"{'model':<15}{'features':>9}{'us/row single':>15}{'us/row x100':>13}{'report ms':>11}"
+          f"{'predict us off':>16}{'predict us on':>15}")
+    for key in MODEL_FEATURES:
+        data, _ = dataset_features(key)
+        X = np.ascontiguousarray(data[rng.integers(0, len(data), args.rows)])
+        monitor = drift.DriftMonitor()
+        monitor.observe(key, X[:1])  # builds the reference sketch
+        single = per_row(monitor, key, X, 1)
+        blocks = per_row(monitor, key, X, 100)
+        start = time.perf_counter()
+        monitor.report()
+        report = time.perf_counter() - start
+
+        cache = PredictionCache()
+        row = X[:1]
+        cache.predict(key, row)
+        timings = []
+        for on in (False, True):
+            drift.enable(on)
+            start = time.perf_counter()
+            for _ in range(10_000):
+                cache.predict(key, row)
+            timings.append((time.perf_counter() - start) / 10_000)
+        print(f"{key:<15}{X.shape[1]:>9}{single * 1e6:>15.2f}{blocks * 1e6:>13.3f}{report * 1e3:>11.2f}"
+              f"{timings[0] * 1e6:>16.1f}{timings[1] * 1e6:>15.1f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
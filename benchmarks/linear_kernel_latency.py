@@ -0,0 +1,69 @@
+# Compiled NumPy scorer vs the pickled sklearn LogisticRegression
+#
+# Measures, for each linear model: cold start in a fresh interpreter (imports
+# plus load), single-row predict_proba latency and 100k-row batch time.
+#
+# Usage: python benchmarks/linear_kernel_latency.py [--repeat 2000]
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import MODEL_BOUNDS
+from linear_kernel import LINEAR_MODELS, load_compiled
+from model_registry import registry
+
+COLD_SKLEARN = "import pickle, warnings; warnings.simplefilter('ignore'); pickle.load(open({path!r}, 'rb'))"
+COLD_COMPILED = "from linear_kernel import load_compiled; load_compiled({path!r})"
+
+
+def cold_start(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compiled linear scorer')
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    rng = np.random.default_rng(0)
+    print(f"{'model':<15}{'':<10}{'cold start':>12}{'1 row':>12}{'100k rows':>12}")
+    for key in LINEAR_MODELS:
+        path = registry.path(key)
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+        scorer = load_compiled(path)
+        if scorer is None:
+            raise SystemExit(f"{key}: run `python linear_kernel.py export` first")
+
+        bounds = np.asarray(MODEL_BOUNDS[key])
+        batch = rng.uniform(bounds[:, 0], bounds[:, 1], size=(100_000, len(bounds)))
+        row = [batch[0].tolist()]  # the list-of-lists shape main() passes
+
+        for label, impl, code in (('sklearn', model, COLD_SKLEARN), ('compiled', scorer, COLD_COMPILED)):
+            cold = cold_start(code.format(path=path))
+            single = per_call(lambda: impl.predict_proba(row), args.repeat)
+            bulk = per_call(lambda: impl.predict_proba(batch), 10)
+            print(f"{key:<15}{label:<10}{cold * 1000:>10.0f}ms{single * 1e6:>10.1f}us{bulk * 1000:>10.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Load test for serve.py
+#
+# Opens --concurrency keep-alive connections to a running server and sends
+# single-row prediction requests round-robin across the five models, with
+# feature values drawn uniformly inside each model's bounds. Reports p50/p90/
+# p99 latency and requests/sec.
+#
+# Usage:
+#   python serve.py --port 8000 &
+#   python benchmarks/load_test.py --port 8000 --requests 20000 --concurrency 32
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import MODEL_BOUNDS, MODEL_FEATURES
+
+
+def request_bodies(count, seed=0):
+    rng = random.Random(seed)
+    keys = list(MODEL_FEATURES)
+    bodies = []
+    for i in range(count):
+        key = keys[i % len(keys)]
+        row = [round(rng.uniform(low, high), 3) for low, high in MODEL_BOUNDS[key]]
+        bodies.append((key, json.dumps({'features': row}).encode()))
+    return bodies
+
+
+async def connection(host, port, queue, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                key, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            request = (f"POST /predict/{key} HTTP/1.1\r\nHost: {host}\r\n"
+                       f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b'HTTP/1.1 200'):
+                errors.append(head.split(b'\r\n', 1)[0].decode())
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests, concurrency):
+    queue = asyncio.Queue()
+    for item in request_bodies(requests):
+        queue.put_nowait(item)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(host, port, queue, latencies, errors) for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the JSON/HTTP inference service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    elapsed, latencies, errors = asyncio.run(run(args.host, args.port, args.requests, args.concurrency))
+    latencies.sort()
+    print(f"{len(latencies)} requests, concurrency {args.concurrency}, {len(errors)} errors")
+    print(f"requests/sec {len(latencies) / elapsed:,.0f}")
+    for label, q in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99)):
+        print(f"{label} {percentile(latencies, q) * 1000:.2f} ms")
+    if errors:
+        print(f"first error: {errors[0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Throughput and accuracy of online_update.py
+#
+# For each logistic model, writes --rows labelled records resampled (with
+# feature noise) from the training split of its dataset, then runs the
+# updater over them at several mini-batch sizes into a temporary snapshot
+# directory. Reports update throughput, the held-out accuracy of the result
+# against the original model's, and how long a running registry takes to
+# serve the new snapshot. Updates the accuracy gate rejects are reported as such.
+#
+# Usage: python benchmarks/online_update_speed.py [--rows 200000] [--batch 32 256 2048]
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import MODEL_DATASETS, MODEL_FEATURES
+from model_registry import ModelRegistry
+from online_update import ONLINE_MODELS, UpdateRejected, update
+from train import dataset_split
+
+
+def write_records(key, path, rows, seed=0):
+    X_train, _, y_train, _ = dataset_split(key)
+    rng = np.random.default_rng(seed)
+    index = rng.integers(0, len(X_train), rows)
+    X = X_train[index] + rng.normal(0, 0.05, (rows, X_train.shape[1])) * X_train.std(axis=0)
+    records = pd.DataFrame(X, columns=MODEL_FEATURES[key])
+    records[MODEL_DATASETS[key][1]] = y_train[index]
+    records.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure online update throughput and accuracy')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[32, 256, 2048])
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', UserWarning)
+
+    work = tempfile.mkdtemp(prefix='online_update_')
+    try:
+        print(f"{'model':<15}{'batch':>7}{'rows/s':>12}{'original':>10}{'updated':>10}{'pickup ms':>11}")
+        for key in ONLINE_MODELS:
+            path = os.path.join(work, f"{key}.csv")
+            write_records(key, path, args.rows)
+            for batch in args.batch:
+                # Every batch size starts from the original model
+                shutil.rmtree(os.path.join(work, key), ignore_errors=True)
+                registry = ModelRegistry(snapshot_dir=work)
+                served = registry[key]
+                try:
+                    summary = update(key, path, batch, snapshot_dir=work, keep=1)
+                except UpdateRejected as e:
+                    print(f"{key:<15}{batch:>7}  rejected by the accuracy gate: {e}", flush=True)
+                    continue
+                start = time.perf_counter()
+                while registry[key] is served:
+                    pass
+                pickup = (time.perf_counter() - start) * 1000
+                print(f"{key:<15}{batch:>7}{summary['rows_per_second']:>12,.0f}"
+                      f"{summary['baseline_accuracy']:>10.3f}{summary['holdout_accuracy']:>10.3f}{pickup:>11.3f}",
+                      flush=True)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Rerun latency: eager unpickling on every rerun vs the shared model registry
+#
+# Usage: python benchmarks/rerun_latency.py [--reruns 200]
+import argparse
+import os
+import pickle
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_registry import MODEL_FILES, MODELS_DIR, ModelRegistry
+
+
+def eager_rerun():
+    # What app.py used to do at the top of every rerun
+    return {key: pickle.load(open(os.path.join(MODELS_DIR, name), 'rb'))
+            for key, name in MODEL_FILES.items()}
+
+
+def registry_rerun(registry, key):
+    # A rerun of a prediction page only touches that page's model
+    return registry[key]
+
+
+def timed(fn, reruns):
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-rerun model loading cost')
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    eager_rerun()  # warm the sklearn import so both sides pay it equally
+
+    print(f"{'strategy':<28}{'p50 ms':>10}{'p99 ms':>10}")
+    p50, p99 = timed(eager_rerun, args.reruns)
+    print(f"{'eager pickle.load (before)':<28}{p50:>10.4f}{p99:>10.4f}")
+
+    registry = ModelRegistry()
+    start = time.perf_counter()
+    registry_rerun(registry, 'parkinsons')
+    print(f"{'registry first visit':<28}{(time.perf_counter() - start) * 1000:>10.4f}")
+    p50, p99 = timed(lambda: registry_rerun(registry, 'parkinsons'), args.reruns)
+    print(f"{'registry rerun (after)':<28}{p50:>10.4f}{p99:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# Reproducible benchmark suite for every model in Models/
+#
+# For each model, as served by the registry (compiled .npz when up to date,
+# otherwise the pickle):
+#   cold_load       fresh interpreter: imports plus first registry load
+#   single_row      predict on the [[...]] list main() builds
+#   batch_<n>       score_block on n rows resampled from the model's dataset,
+#                   for n in 1, 100, 10k and 1M; reported as rows/s
+#   peak_mem_<n>    peak traced allocation while scoring n rows
+#
+# Results are written as JSON. With --baseline, every metric is compared to a
+# stored run and the suite exits 1 if any is worse by more than --threshold.
+#
+# Usage:
+#   python benchmarks/suite.py                      # run, compare with baseline.json
+#   python benchmarks/suite.py --save-baseline      # record a new baseline
+#   python benchmarks/suite.py --quick -o run.json  # smaller sizes and repeats
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_score import score_block
+from column_store import dataset_features
+from features import MODEL_FEATURES
+from model_registry import ModelRegistry
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+BATCH_SIZES = (1, 100, 10_000, 1_000_000)
+QUICK_BATCH_SIZES = (1, 100, 10_000)
+
+COLD_LOAD = """
+import time, warnings
+warnings.simplefilter('ignore')
+start = time.perf_counter()
+from model_registry import ModelRegistry
+ModelRegistry()[{key!r}]
+print(time.perf_counter() - start)
+"""
+
+
+def dataset_rows(key, n, seed):
+    X, _ = dataset_features(key)
+    return X[np.random.default_rng(seed).integers(0, len(X), n)]
+
+
+def best_time(fn, rounds, min_round=0.05):
+    """Best per-call time over `rounds` rounds of at least `min_round` seconds.
+
+    Fast calls are looped inside a round so timer resolution and scheduler
+    noise do not dominate; the minimum is the most repeatable statistic.
+    """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round:
+            break
+        calls = max(calls * 2, int(calls * min_round / max(elapsed, 1e-9) * 1.2))
+    best = elapsed / calls
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def metric(value, unit, higher_is_better=False):
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def bench_model(key, sizes, repeat, seed):
+    results = {}
+
+    cold = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', COLD_LOAD.format(key=key)],
+                             cwd=ROOT, check=True, capture_output=True, text=True)
+        cold.append(float(out.stdout.strip().splitlines()[-1]))
+    results['cold_load'] = metric(min(cold), 's')
+
+    model = ModelRegistry()[key]
+    largest = dataset_rows(key, max(sizes), seed)
+
+    input_data = [largest[0].tolist()]
+    model.predict(input_data)
+    results['single_row'] = metric(best_time(lambda: model.predict(input_data), repeat), 's')
+
+    for n in sizes:
+        block = np.ascontiguousarray(largest[:n])
+        seconds = best_time(lambda: score_block(model, block), repeat)
+        results[f"batch_{n}"] = metric(n / seconds, 'rows/s', higher_is_better=True)
+
+        tracemalloc.start()
+        score_block(model, block)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"peak_mem_{n}"] = metric(peak, 'bytes')
+
+    return type(model).__name__, results
+
+
+def environment():
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return (report lines, regressions) comparing two result documents."""
+    lines, regressions = [], []
+    for key, model in current['models'].items():
+        base_model = baseline.get('models', {}).get(key)
+        if base_model is None:
+            lines.append(f"{key}: not in baseline")
+            continue
+        for name, entry in model['metrics'].items():
+            base = base_model['metrics'].get(name)
+            if base is None or not base['value']:
+                continue
+            change = entry['value'] / base['value'] - 1
+            worse = -change if entry['higher_is_better'] else change
+            flag = ''
+            if worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append(f"{key}.{name}")
+            lines.append(f"{key:<14}{name:<20}{base['value']:>14.4g}{entry['value']:>14.4g}{change:>+9.1%}{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark model load, single-row and batch inference')
+    parser.add_argument('models', nargs='*', help='default: all models')
+    parser.add_argument('-o', '--output', help='write results JSON here')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='fail when a metric is this much worse than the baseline (default 0.5 = 50%%)')
+    parser.add_argument('--repeat', type=int, default=5, help='rounds per measurement (best is kept)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help=f"batch sizes {QUICK_BATCH_SIZES} and fewer repeats")
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+    repeat = min(args.repeat, 3) if args.quick else args.repeat
+
+    document = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'settings': {'sizes': list(sizes), 'repeat': repeat, 'seed': args.seed},
+        'models': {},
+    }
+    for key in args.models or list(MODEL_FEATURES):
+        implementation, metrics = bench_model(key, sizes, repeat, args.seed)
+        document['models'][key] = {'implementation': implementation, 'metrics': metrics}
+        summary = ', '.join(f"{name} {entry['value']:.4g} {entry['unit']}" for name, entry in metrics.items())
+        print(f"{key} ({implementation}): {summary}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    lines, regressions = compare(document, baseline, args.threshold)
+    print(f"\n{'model':<14}{'metric':<20}{'baseline':>14}{'current':>14}{'change':>9}")
+    print('\n'.join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Agreement and speed of the compiled SVC scorers against libsvm
+#
+# The bundled SVCs use a linear kernel (see `python svm_kernel.py verify`), so
+# to exercise the kernel paths this trains an RBF SVC on parkinson_data.csv
+# and diabetes_data.csv and compares libsvm with the exact BLAS KernelScorer
+# (float64 and float32) and the random Fourier feature approximation.
+# Timings are on 100k rows resampled from each dataset.
+#
+# Usage: python benchmarks/svm_kernel_speed.py [--tolerance 0.01] [--rows 100000]
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from column_store import dataset_features
+from svm_kernel import SVC_MODELS, approximate_rbf, compile_svc
+
+
+def timed(fn, X, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    from sklearn.svm import SVC
+
+    parser = argparse.ArgumentParser(description='Benchmark compiled SVC scoring')
+    parser.add_argument('--tolerance', type=float, default=0.01)
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    rng = np.random.default_rng(0)
+    print(f"{'dataset':<12}{'scorer':<34}{'agreement':>10}{'seconds':>10}{'speedup':>9}")
+    for key in SVC_MODELS:
+        X, y = dataset_features(key)
+        model = SVC(kernel='rbf', gamma='scale').fit(X, y)
+
+        big = X[rng.integers(0, len(X), args.rows)]
+        expected = model.predict(big)
+        baseline = timed(model.predict, big)
+        print(f"{key:<12}{f'libsvm rbf, {len(model.support_vectors_)} SV':<34}{'':>10}{baseline:>10.3f}{'1.0x':>9}")
+
+        exact = compile_svc(model)
+        scorers = [('KernelScorer float64', exact), ('KernelScorer float32', compile_svc(model, np.float32))]
+        try:
+            approx, _ = approximate_rbf(exact, X, args.tolerance)
+            scorers.append((f"RFF {approx.n_components} components", approx))
+        except ValueError as e:
+            print(f"{'':<12}RFF skipped: {e}")
+        for name, scorer in scorers:
+            agreement = (scorer.predict(big) == expected).mean()
+            seconds = timed(scorer.predict, big)
+            print(f"{'':<12}{name:<34}{agreement:>10.2%}{seconds:>10.3f}{baseline / seconds:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Per-worker memory and startup with and without the shared model store
+#
+# Starts N worker processes at once (for N in --workers), each of which loads
+# all five models the way a registry configured for the case would, scores
+# one row with each and reports, once ready:
+#   startup    seconds from spawn to ready (interpreter, imports, model load)
+#   RSS        resident set, counting shared pages in full
+#   PSS        resident set with shared pages divided among their sharers;
+#              summed over workers it is the memory the workers really use
+#   USS        private pages only
+# Workers stay alive until all have reported, so shared pages are shared.
+#
+# Cases:
+#   pickle     unpickle every .sav (imports sklearn)
+#   npz        compiled .npz, a private copy per worker (the previous default)
+#   store      shared model store, float64
+# and, because the bundled models' weights are only a few hundred bytes, the
+# same with an extra kernel SVC of --support-vectors x 22 support vectors:
+#   npz + SVC, store + SVC, store f32 + SVC
+#
+# Usage: python benchmarks/worker_memory.py [--workers 1 8 32] [--support-vectors 200000]
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model_store import write_store
+
+WORKER = """
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+sys.path.insert(0, {root!r})
+import numpy as np
+from model_registry import ModelRegistry
+models, big, store = {models!r}, {big!r}, {store!r}
+if models == 'pickle':
+    registry = ModelRegistry(use_compiled=False, snapshot_dir=None, store_dir=None)
+elif models == 'npz':
+    registry = ModelRegistry(snapshot_dir=None, store_dir=None)
+else:
+    registry = ModelRegistry(snapshot_dir=None, store_dir=store, store_dtype=np.float32 if models == 'store32' else np.float64)
+for key in registry.keys():
+    model = registry[key]
+    model.predict(np.zeros((1, model.n_features_in_)))
+if big:
+    from svm_kernel import KernelScorer
+    if big == 'npz':
+        with np.load({big_npz!r}) as data:
+            scorer = KernelScorer(data['support_vectors'], data['dual_coef'], data['intercept'], data['classes'],
+                                  'rbf', 0.05)
+    else:
+        from model_store import open_store, scorer_from_store
+        scorer = scorer_from_store(*open_store({big_npz!r}[:-4] + ('-float32.bin' if big == 'store32' else '-float64.bin')))
+    scorer.decision_function(np.zeros((1, scorer.n_features_in_)))
+ready = time.time()
+memory = {{}}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        name, _, rest = line.partition(':')
+        if rest.strip().endswith('kB'):
+            memory[name] = int(rest.split()[0]) * 1024
+print(json.dumps({{'ready': ready, 'rss': memory['Rss'], 'pss': memory['Pss'],
+                  'uss': memory['Private_Clean'] + memory['Private_Dirty']}}), flush=True)
+sys.stdin.read()
+"""
+
+CASES = [
+    ('pickle', 'pickle', None),
+    ('npz', 'npz', None),
+    ('store', 'store', None),
+    ('npz + SVC', 'npz', 'npz'),
+    ('store + SVC', 'store', 'store'),
+    ('store f32 + SVC', 'store32', 'store32'),
+]
+
+
+def synthetic_svc(work, rows, features=22, seed=0):
+    rng = np.random.default_rng(seed)
+    arrays = {
+        'support_vectors': rng.normal(size=(rows, features)),
+        'dual_coef': rng.normal(size=rows),
+        'intercept': np.array([0.0]),
+        'classes': np.array([0, 1]),
+    }
+    path = os.path.join(work, 'svc.npz')
+    np.savez(path, **arrays)
+    meta = {'kind': 'kernel', 'intercept': 0.0, 'kernel': 'rbf', 'gamma': 0.05, 'coef0': 0.0, 'degree': 3}
+    for dtype in (np.float64, np.float32):
+        stored = dict(arrays, support_vectors=arrays['support_vectors'].astype(dtype),
+                      dual_coef=arrays['dual_coef'].astype(dtype))
+        del stored['intercept']
+        write_store(os.path.join(work, f"svc-{np.dtype(dtype).name}.bin"), stored, dict(meta, dtype=np.dtype(dtype).name))
+    return path
+
+
+def run(count, models, big, store, big_npz):
+    code = WORKER.format(root=ROOT, models=models, big=big, store=store, big_npz=big_npz)
+    started = time.time()
+    workers = [subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                text=True) for _ in range(count)]
+    try:
+        reports = [json.loads(worker.stdout.readline()) for worker in workers]
+    finally:
+        for worker in workers:
+            worker.stdin.close()
+        for worker in workers:
+            worker.wait()
+    return started, reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-worker memory and startup with the model store')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--support-vectors', type=int, default=200_000)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix='worker_memory_')
+    try:
+        store = os.path.join(work, 'store')
+        big_npz = synthetic_svc(work, args.support_vectors)
+        # Write the store once up front, as the first worker ever would
+        for models in ('store', 'store32'):
+            run(1, models, None, store, big_npz)
+
+        print(f"synthetic SVC: {args.support_vectors} x 22 support vectors, "
+              f"{os.path.getsize(big_npz) / 2**20:.0f} MB as float64")
+        print(f"{'case':<18}{'workers':>8}{'startup s':>11}{'all ready s':>13}"
+              f"{'RSS MB':>9}{'PSS MB':>9}{'USS MB':>9}{'total PSS MB':>14}")
+        for count in args.workers:
+            for name, models, big in CASES:
+                started, reports = run(count, models, big, store, big_npz)
+                startup = statistics.median(report['ready'] - started for report in reports)
+                ready = max(report['ready'] for report in reports) - started
+                mean = {field: statistics.mean(report[field] for report in reports) / 2**20
+                        for field in ('rss', 'pss', 'uss')}
+                total = sum(report['pss'] for report in reports) / 2**20
+                print(f"{name:<18}{count:>8}{startup:>11.2f}{ready:>13.2f}{mean['rss']:>9.1f}{mean['pss']:>9.1f}"
+                      f"{mean['uss']:>9.1f}{total:>14.0f}", flush=True)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+# Columnar binary cache of the CSV datasets
+#
+# Parsing text CSVs is the slowest part of every tool that reads Datasets/
+# (training, verification, the benchmarks). open_store() converts a CSV once
+# into one raw binary file per column plus a schema.json describing it, in
+# .cache/columns/, and afterwards opens the columns memory-mapped: nothing is
+# parsed and only the columns actually used are paged in. The cache is
+# rebuilt automatically when the source CSV's size or mtime changes.
+# Processes opening the same CSV at once (serve.py workers, parallel
+# training) take a lock file, so one converts while the others wait for it.
+#
+# Column types, inferred from the first chunk of the CSV:
+#   float64   numbers; missing values ('?', empty, NA) are NaN
+#   flag      t/f (or True/False) stored as int8 1/0, missing is -1
+#   category  anything else, stored as int32 codes into a list of
+#             categories in the schema, missing is -1
+#
+# Usage:
+#   store = open_store('Datasets/hypothyroid.csv')
+#   X = store.matrix(MODEL_FEATURES['thyroid'])    # only these 7 columns are read
+#   data = store.frame()                           # everything, as a DataFrame
+#   python column_store.py Datasets/*.csv          # convert ahead of time
+import argparse
+import contextlib
+import errno
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; convert() still survives losing the race
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from model_registry import BASE_DIR
+
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'columns')
+
+# Bump when the on-disk layout or the conversion changes
+STORE_FORMAT = 1
+
+NA_VALUES = ['?']
+CONVERT_CHUNKSIZE = 200_000
+
+DTYPES = {'float64': '<f8', 'flag': 'i1', 'category': '<i4'}
+FLAG_VALUES = {'t': 1, 'f': 0, True: 1, False: 0}
+
+
+def store_dir(path, cache_dir=CACHE_DIR):
+    """Cache directory of the CSV at `path`: its name plus a hash of its absolute path."""
+    path = os.path.abspath(path)
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', os.path.splitext(os.path.basename(path))[0])
+    return os.path.join(cache_dir, f"{name}-{hashlib.blake2b(path.encode(), digest_size=4).hexdigest()}")
+
+
+def source_version(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _column_type(series):
+    # The parser already turns all-t/f columns into bool; with missing values
+    # they come through as objects holding True/False/NaN
+    if pd.api.types.is_bool_dtype(series):
+        return 'flag'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'float64'
+    values = set(series.dropna().unique())
+    if values and values <= {True, False}:
+        return 'flag'
+    return 'category'
+
+
+class _ColumnWriter:
+    """Appends one chunk of a column at a time to its binary file."""
+
+    def __init__(self, name, kind, path):
+        self.name = name
+        self.kind = kind
+        self.file = open(path, 'wb')
+        self.categories = {}
+
+    def write(self, series, offset):
+        if self.kind == 'float64':
+            try:
+                values = pd.to_numeric(series, errors='raise').to_numpy(dtype=np.float64)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"column {self.name!r} near row {offset}: {e}") from None
+        elif self.kind == 'flag' and pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy(dtype=np.int8)
+        elif self.kind == 'flag':
+            mapped = series.map(FLAG_VALUES)
+            if (mapped.isna() & series.notna()).any():
+                bad = series[mapped.isna() & series.notna()].iloc[0]
+                raise ValueError(f"column {self.name!r} near row {offset}: {bad!r} is not a t/f flag")
+            values = mapped.fillna(-1).to_numpy(dtype=np.int8)
+        else:
+            codes, uniques = pd.factorize(series)
+            lookup = np.array([self.categories.setdefault(str(value), len(self.categories)) for value in uniques],
+                              dtype=np.int32)
+            values = np.where(codes < 0, -1, lookup[codes] if len(lookup) else -1).astype(np.int32)
+        values.astype(DTYPES[self.kind], copy=False).tofile(self.file)
+
+    def close(self):
+        self.file.close()
+
+
+def convert(path, directory, chunksize=CONVERT_CHUNKSIZE, replace_current=False):
+    """Convert the CSV at `path` into a column store in `directory`; returns the schema.
+
+    A store of the same source version that appears in `directory` meanwhile
+    is kept unless `replace_current` is set.
+    """
+    version = source_version(path)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        return _convert(path, directory, tmp, version, chunksize, replace_current)
+    finally:
+        # Gone already once swapped in; left over after any failure
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _convert(path, directory, tmp, version, chunksize, replace_current):
+    writers = None
+    rows = 0
+    try:
+        reader = pd.read_csv(path, chunksize=chunksize, encoding='utf-8-sig', na_values=NA_VALUES,
+                             true_values=['t'], false_values=['f'], low_memory=False)
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            if writers is None:
+                writers = [_ColumnWriter(name, _column_type(chunk[name]), os.path.join(tmp, f"{i}.bin"))
+                           for i, name in enumerate(chunk.columns)]
+            for i, writer in enumerate(writers):
+                writer.write(chunk.iloc[:, i], rows)
+            rows += len(chunk)
+    finally:
+        for writer in writers or ():
+            writer.close()
+
+    schema = {
+        'format': STORE_FORMAT,
+        'source': os.path.abspath(path),
+        'source_size': version[0],
+        'source_mtime_ns': version[1],
+        'rows': rows,
+        'columns': [],
+    }
+    for i, writer in enumerate(writers or ()):
+        column = {'name': writer.name, 'type': writer.kind, 'dtype': DTYPES[writer.kind], 'file': f"{i}.bin"}
+        if writer.kind == 'category':
+            column['categories'] = list(writer.categories)
+        schema['columns'].append(column)
+    with open(os.path.join(tmp, 'schema.json'), 'w') as f:
+        json.dump(schema, f, indent=2)
+
+    if not replace_current and is_current(directory, path):
+        # Another process converted the same version meanwhile: keep theirs
+        # rather than pulling it from under its readers
+        with open(os.path.join(directory, 'schema.json')) as f:
+            return json.load(f)
+
+    # Swap the finished store in; readers holding the old files keep their maps
+    old = f"{directory}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.replace(directory, old)
+    try:
+        os.replace(tmp, directory)
+    except OSError as e:
+        # Another process swapped its store in between the two replaces
+        if e.errno not in (errno.ENOTEMPTY, errno.EEXIST) or not is_current(directory, path):
+            raise
+        with open(os.path.join(directory, 'schema.json')) as f:
+            schema = json.load(f)
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+    return schema
+
+
+class ColumnStore:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'schema.json')) as f:
+            self.schema = json.load(f)
+        self.rows = self.schema['rows']
+        self._specs = {column['name']: column for column in self.schema['columns']}
+        self._maps = {}
+
+    @property
+    def columns(self):
+        return [column['name'] for column in self.schema['columns']]
+
+    def _spec(self, name):
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise KeyError(f"{self.schema['source']} has no column {name!r}") from None
+
+    def column(self, name):
+        """The raw column as a read-only memory map (codes for flag/category columns)."""
+        values = self._maps.get(name)
+        if values is None:
+            spec = self._spec(name)
+            if self.rows:
+                values = np.memmap(os.path.join(self.directory, spec['file']), dtype=spec['dtype'],
+                                   mode='r', shape=(self.rows,))
+            else:
+                values = np.empty(0, dtype=spec['dtype'])
+            self._maps[name] = values
+        return values
+
+    def type(self, name):
+        return self._spec(name)['type']
+
+    def categories(self, name):
+        return self._spec(name).get('categories', [])
+
+    def values(self, name):
+        """Column as pandas would read it: float64 with NaN for numbers and flags, Categorical otherwise."""
+        spec = self._spec(name)
+        raw = self.column(name)
+        if spec['type'] == 'float64':
+            return raw
+        if spec['type'] == 'flag':
+            return np.where(raw < 0, np.nan, raw.astype(np.float64))
+        return pd.Categorical.from_codes(raw, categories=spec['categories'])
+
+    def frame(self, columns=None):
+        """DataFrame of `columns` (default all); float64 columns stay memory-mapped."""
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame({name: self.values(name) for name in columns}, columns=columns, copy=False)
+
+    def matrix(self, columns, dtype=np.float64, encodings=None):
+        """C-contiguous (rows, len(columns)) array of `columns`, in that order.
+
+        Category columns need an entry in `encodings`, {column: {category:
+        number}}; missing or unlisted categories become NaN.
+        """
+        encodings = encodings or {}
+        out = np.empty((self.rows, len(columns)), dtype=dtype)
+        for j, name in enumerate(columns):
+            if self.type(name) != 'category':
+                out[:, j] = self.values(name)
+                continue
+            if name not in encodings:
+                raise ValueError(f"column {name!r} is categorical; pass encodings={{{name!r}: {{...}}}}")
+            # One slot per category plus a trailing NaN that code -1 indexes
+            lookup = np.array([encodings[name].get(category, np.nan) for category in self.categories(name)]
+                              + [np.nan], dtype=np.float64)
+            out[:, j] = lookup[self.column(name)]
+        return out
+
+
+def is_current(directory, path):
+    try:
+        with open(os.path.join(directory, 'schema.json')) as f:
+            schema = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (schema.get('format') == STORE_FORMAT
+            and [schema.get('source_size'), schema.get('source_mtime_ns')] == source_version(path))
+
+
+@contextlib.contextmanager
+def _locked(directory):
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    with open(f"{directory}.lock", 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def open_store(path, cache_dir=CACHE_DIR, rebuild=False):
+    """Open the column store of the CSV at `path`, converting it first if missing or stale."""
+    directory = store_dir(path, cache_dir)
+    if rebuild or not is_current(directory, path):
+        with _locked(directory):
+            # Someone else may have converted it while we waited
+            if rebuild or not is_current(directory, path):
+                convert(path, directory, replace_current=rebuild)
+    return ColumnStore(directory)
+
+
+def dataset_features(key):
+    """(X, y) of model `key` from its bundled dataset, X in MODEL_FEATURES[key] order."""
+    from features import MODEL_DATASETS, MODEL_FEATURES
+
+    path, label = MODEL_DATASETS[key]
+    store = open_store(os.path.join(BASE_DIR, path))
+    return store.matrix(MODEL_FEATURES[key]), np.asarray(store.values(label))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert CSVs into memory-mapped column stores.')
+    parser.add_argument('csv', nargs='+')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    for path in args.csv:
+        store = open_store(path, args.cache_dir, rebuild=True)
+        types = ', '.join(f"{name}:{store.type(name)}" for name in store.columns)
+        print(f"{path}: {store.rows} rows -> {store.directory}\n  {types}")
+
+
+if __name__ == '__main__':
+    main()
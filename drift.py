@@ -0,0 +1,362 @@
+# Input drift monitor
+#
+# Every feature vector scored by app.py and serve.py is observed here and
+# compared with the data the model was trained on (features.MODEL_DATASETS).
+# Per model, fixed-size sketches of every feature are kept:
+#   - count, mean, variance, min and max, merged a block at a time (Chan et
+#     al.'s parallel form of Welford's update)
+#   - counts in bins whose edges are the reference data's 1st..99th
+#     percentiles. The bins are the quantile sketch: live CDF values are exact
+#     at every edge, so quantiles are known to within one percentile. They give
+#       KS   largest gap between the live and reference CDFs at the edges
+#       PSI  population stability index over the reference deciles
+# so memory per model depends only on the number of features.
+#
+# observe() only appends the block to a buffer under a lock; the buffer is
+# folded into the sketches with vectorised NumPy once it holds FLUSH_ROWS
+# rows, which keeps the cost per prediction in the low microseconds. Live
+# sketches cover WINDOW_ROWS rows at a time: a full window is kept as the
+# previous one, which report() uses until the new window has MIN_ROWS rows;
+# with fewer rows than that the statistics are shown but no status is given.
+#
+# A model's reference is built from its dataset on first use, or up front by
+# preload() (serve.py does this at startup), never under the monitor lock.
+# If it cannot be built (dataset missing or unreadable) its rows are dropped
+# and counted, report() shows the model as 'no reference' with the error,
+# and the build is retried after REFERENCE_RETRY_SECONDS.
+#
+# Set DISEASE_APP_DRIFT=0 to switch observation off.
+import os
+import threading
+import time
+
+import numpy as np
+
+from features import MODEL_DATASETS, MODEL_FEATURES
+from model_registry import BASE_DIR
+from settings import env_flag
+
+FLUSH_ROWS = 256
+WINDOW_ROWS = 10_000
+MIN_ROWS = 100
+REFERENCE_RETRY_SECONDS = 60.0
+
+PERCENTILES = np.arange(1, 100)
+DECILES = np.arange(10, 100, 10)
+
+# Conventional PSI bands: below 0.1 stable, 0.1-0.25 worth a look, above 0.25 shifted
+PSI_WATCH = 0.1
+PSI_DRIFT = 0.25
+PSI_FLOOR = 1e-4
+
+_enabled = env_flag('DISEASE_APP_DRIFT', True)
+
+
+class Reference:
+    """Sketch layout and reference statistics of one model's training data."""
+
+    def __init__(self, X):
+        rows, width = X.shape
+        ordered = np.sort(X, axis=0)
+        self.rows = rows
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0)
+        # Unique percentile edges per feature, padded with +inf to a common
+        # width; an inf edge never has a value below it, so its bins stay empty
+        self.edges = np.full((width, len(PERCENTILES)), np.inf)
+        self.n_edges = np.zeros(width, dtype=np.int64)
+        self.cdf = np.ones((width, len(PERCENTILES)))
+        self.deciles = []
+        self.expected = []
+        for j in range(width):
+            edges = np.unique(np.percentile(X[:, j], PERCENTILES))
+            k = len(edges)
+            self.edges[j, :k] = edges
+            self.n_edges[j] = k
+            self.cdf[j, :k] = np.searchsorted(ordered[:, j], edges, side='right') / rows
+            # Decile edges are percentile edges too; keep their positions so
+            # decile counts can be read off the cumulative bin counts
+            positions = np.searchsorted(edges, np.unique(np.percentile(X[:, j], DECILES)))
+            self.deciles.append(positions)
+            self.expected.append(_fractions(self.cdf[j, positions]))
+        self.p50 = _quantile(self, self.cdf, 0.5, ordered[-1])
+
+    @classmethod
+    def from_dataset(cls, key, base_dir=BASE_DIR):
+        from column_store import open_store
+
+        path = os.path.join(base_dir, MODEL_DATASETS[key][0])
+        return cls(open_store(path).matrix(MODEL_FEATURES[key]))
+
+
+class Sketch:
+    """Streaming sketches of the features of one model over one window."""
+
+    def __init__(self, reference):
+        width, edges = reference.edges.shape
+        self.reference = reference
+        self.count = 0
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.low = np.full(width, np.inf)
+        self.high = np.full(width, -np.inf)
+        self.bins = np.zeros((width, edges + 1), dtype=np.int64)
+        self._offsets = np.arange(width) * (edges + 1)
+
+    def update(self, X):
+        n = len(X)
+        if not n:
+            return
+        batch_mean = X.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.m2 += ((X - batch_mean) ** 2).sum(axis=0) + delta ** 2 * (self.count * n / total)
+        self.mean += delta * (n / total)
+        self.count = total
+        np.minimum(self.low, X.min(axis=0), out=self.low)
+        np.maximum(self.high, X.max(axis=0), out=self.high)
+
+        # Bin j holds edges[j-1] < x <= edges[j]: the number of edges below x
+        index = np.empty(X.shape, dtype=np.int64)
+        for j, edges in enumerate(self.reference.edges):
+            index[:, j] = np.searchsorted(edges, X[:, j], side='left')
+        index += self._offsets
+        self.bins += np.bincount(index.ravel(), minlength=self.bins.size).reshape(self.bins.shape)
+
+    def cdf(self):
+        """Live CDF at every reference edge, (features, edges)."""
+        return np.cumsum(self.bins, axis=1)[:, :-1] / max(self.count, 1)
+
+    def quantile(self, q):
+        """Per-feature q-quantile, to the resolution of the reference percentiles."""
+        return _quantile(self.reference, self.cdf(), q, self.high)
+
+    def compare(self):
+        """(psi, ks) per feature against the reference."""
+        reference = self.reference
+        cdf = self.cdf()
+        psi = np.empty(len(cdf))
+        ks = np.empty(len(cdf))
+        for j, k in enumerate(reference.n_edges):
+            ks[j] = np.abs(cdf[j, :k] - reference.cdf[j, :k]).max() if k else 0.0
+            actual = _fractions(cdf[j, reference.deciles[j]])
+            expected = reference.expected[j]
+            actual = np.maximum(actual, PSI_FLOOR)
+            expected = np.maximum(expected, PSI_FLOOR)
+            psi[j] = float(((actual - expected) * np.log(actual / expected)).sum())
+        return psi, ks
+
+
+def _quantile(reference, cdf, q, high):
+    # Smallest edge whose CDF reaches q (the maximum past the last edge). Exact
+    # for discrete features, within one percentile bin for continuous ones
+    out = np.empty(len(cdf))
+    for j, k in enumerate(reference.n_edges):
+        i = np.searchsorted(cdf[j, :k], q, side='left')
+        out[j] = reference.edges[j, i] if i < k else high[j]
+    return out
+
+
+def _fractions(cdf_at_edges):
+    # Bin fractions from the CDF at the inner edges of the bins
+    return np.diff(np.concatenate(([0.0], cdf_at_edges, [1.0])))
+
+
+def status(psi):
+    if psi >= PSI_DRIFT:
+        return 'drift'
+    if psi >= PSI_WATCH:
+        return 'watch'
+    return 'ok'
+
+
+class DriftMonitor:
+    def __init__(self, window=WINDOW_ROWS, flush_rows=FLUSH_ROWS, base_dir=BASE_DIR,
+                 retry_seconds=REFERENCE_RETRY_SECONDS):
+        self.window = window
+        self.flush_rows = flush_rows
+        self.base_dir = base_dir
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._reference_lock = threading.Lock()
+        self._pending = {}
+        self._pending_rows = {}
+        self._references = {}
+        self._failures = {}
+        self._dropped = {}
+        self._current = {}
+        self._previous = {}
+
+    def observe(self, key, block):
+        """Record the rows of `block`, a float64 array in MODEL_FEATURES[key] order."""
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = []
+                self._pending_rows[key] = 0
+            pending.append(block)
+            self._pending_rows[key] += len(block)
+            if self._pending_rows[key] < self.flush_rows:
+                return
+        self._flush(key)
+
+    def reference(self, key):
+        """Reference of model `key`, built on first use; None while it cannot be built."""
+        reference = self._references.get(key)
+        if reference is not None:
+            return reference
+        with self._reference_lock:
+            reference = self._references.get(key)
+            if reference is not None:
+                return reference
+            failure = self._failures.get(key)
+            if failure is not None and time.monotonic() < failure[1]:
+                return None
+            try:
+                reference = Reference.from_dataset(key, self.base_dir)
+            except (OSError, ValueError, KeyError) as e:
+                self._failures[key] = (f"{type(e).__name__}: {e}", time.monotonic() + self.retry_seconds)
+                return None
+            self._failures.pop(key, None)
+            self._references[key] = reference
+            return reference
+
+    def preload(self, keys=MODEL_FEATURES):
+        """Build the references of `keys` now; returns {model: error} for those that failed."""
+        for key in keys:
+            self.reference(key)
+        return self.errors()
+
+    def errors(self):
+        """{model: error} for models whose reference could not be built."""
+        return {key: failure[0] for key, failure in list(self._failures.items())}
+
+    def _flush(self, key):
+        # Called without the lock: building the reference may convert a CSV
+        reference = self.reference(key)
+        with self._lock:
+            blocks = self._pending.pop(key, None)
+            self._pending_rows[key] = 0
+            if not blocks:
+                return
+            if reference is None:
+                self._dropped[key] = self._dropped.get(key, 0) + sum(len(block) for block in blocks)
+                return
+            sketch = self._current.get(key)
+            if sketch is None:
+                sketch = self._current[key] = Sketch(reference)
+            sketch.update(np.concatenate(blocks) if len(blocks) > 1 else blocks[0])
+            if sketch.count >= self.window:
+                self._previous[key] = sketch
+                del self._current[key]
+
+    def report(self):
+        """One dict per (model, feature) with rows observed, PSI, KS and summary statistics.
+
+        Models without a reference get rows with status 'no reference', the
+        error in 'error' and NaN statistics.
+        """
+        rows = []
+        for key in list(self._pending):
+            self._flush(key)
+        errors = self.errors()
+        with self._lock:
+            for key in MODEL_FEATURES:
+                sketch = self._current.get(key)
+                previous = self._previous.get(key)
+                if sketch is None or (sketch.count < MIN_ROWS and previous is not None):
+                    sketch = previous
+                if sketch is None:
+                    if key in errors:
+                        rows += [dict(_MISSING, model=key, feature=feature, rows=self._dropped.get(key, 0),
+                                      error=errors[key]) for feature in MODEL_FEATURES[key]]
+                    continue
+                reference = sketch.reference
+                psi, ks = sketch.compare()
+                std = np.sqrt(sketch.m2 / sketch.count)
+                shift = (sketch.mean - reference.mean) / np.where(reference.std > 0, reference.std, 1.0)
+                p50 = sketch.quantile(0.5)
+                for j, feature in enumerate(MODEL_FEATURES[key]):
+                    rows.append({
+                        'model': key,
+                        'feature': feature,
+                        'rows': int(sketch.count),
+                        'psi': float(psi[j]),
+                        'ks': float(ks[j]),
+                        'status': status(psi[j]) if sketch.count >= MIN_ROWS else 'too few rows',
+                        'mean': float(sketch.mean[j]),
+                        'reference_mean': float(reference.mean[j]),
+                        'mean_shift_sd': float(shift[j]),
+                        'std': float(std[j]),
+                        'reference_std': float(reference.std[j]),
+                        'min': float(sketch.low[j]),
+                        'max': float(sketch.high[j]),
+                        'p50': float(p50[j]),
+                        'reference_p50': float(reference.p50[j]),
+                        'error': errors.get(key),
+                    })
+        return rows
+
+    def reset(self):
+        """Drop the live sketches, and retry failed references on the next flush."""
+        with self._lock:
+            self._pending.clear()
+            self._pending_rows.clear()
+            self._dropped.clear()
+            self._current.clear()
+            self._previous.clear()
+        with self._reference_lock:
+            self._failures.clear()
+
+
+# Statistics of a report() row for a model without a reference; 'rows' there
+# counts the rows dropped for lack of one
+_MISSING = dict.fromkeys(['psi', 'ks', 'mean', 'reference_mean', 'mean_shift_sd', 'std', 'reference_std', 'min',
+                          'max', 'p50', 'reference_p50'], float('nan'))
+_MISSING['status'] = 'no reference'
+
+
+monitor = DriftMonitor()
+
+
+def observe(key, block):
+    if _enabled:
+        monitor.observe(key, block)
+
+
+def preload():
+    if _enabled:
+        monitor.preload()
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(rows=None):
+    """PSI, KS and mean shift per model feature as Prometheus gauges."""
+    rows = monitor.report() if rows is None else rows
+    lines = []
+    for metric, field, help_text in (
+            ('disease_app_input_psi', 'psi', 'Population stability index of a model input against its training data.'),
+            ('disease_app_input_ks', 'ks', 'Kolmogorov-Smirnov distance of a model input from its training data.'),
+            ('disease_app_input_mean_shift_sd', 'mean_shift_sd',
+             'Shift of the mean of a model input, in training standard deviations.')):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        for row in rows:
+            if row['status'] == 'no reference':
+                continue
+            labels = f'model="{_escape(row["model"])}",feature="{_escape(row["feature"])}"'
+            lines.append(f"{metric}{{{labels}}} {row[field]}")
+    failed = sorted({row['model'] for row in rows if row['status'] == 'no reference'})
+    if failed:
+        metric = 'disease_app_drift_reference_error'
+        lines += [f"# HELP {metric} 1 when the training reference of a model could not be built.",
+                  f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{model="{_escape(key)}"}} 1' for key in failed]
+    return '\n'.join(lines) + '\n'
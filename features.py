@@ -0,0 +1,95 @@
+# Feature order of every model, named after the columns in Datasets/
+#
+# These are the same orders main() in app.py builds `input_data` from. Input
+# files for the batch tools use these column names; surrounding whitespace and
+# a UTF-8 BOM on the header (as in some of the bundled CSVs) are tolerated.
+import numpy as np
+
+MODEL_FEATURES = {
+    'diabetes': [
+        'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin',
+        'BMI', 'DiabetesPedigreeFunction', 'Age',
+    ],
+    'heart_disease': [
+        'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach',
+        'exang', 'oldpeak', 'slope', 'ca', 'thal',
+    ],
+    'parkinsons': [
+        'MDVP:Fo(Hz)', 'MDVP:Fhi(Hz)', 'MDVP:Flo(Hz)', 'MDVP:Jitter(%)',
+        'MDVP:Jitter(Abs)', 'MDVP:RAP', 'MDVP:PPQ', 'Jitter:DDP', 'MDVP:Shimmer',
+        'MDVP:Shimmer(dB)', 'Shimmer:APQ3', 'Shimmer:APQ5', 'MDVP:APQ',
+        'Shimmer:DDA', 'NHR', 'HNR', 'RPDE', 'DFA', 'spread1', 'spread2', 'D2',
+        'PPE',
+    ],
+    'lung_cancer': [
+        'GENDER', 'AGE', 'SMOKING', 'YELLOW_FINGERS', 'ANXIETY', 'PEER_PRESSURE',
+        'CHRONIC DISEASE', 'FATIGUE', 'ALLERGY', 'WHEEZING', 'ALCOHOL CONSUMING',
+        'COUGHING', 'SHORTNESS OF BREATH', 'SWALLOWING DIFFICULTY', 'CHEST PAIN',
+    ],
+    'thyroid': [
+        'age', 'sex', 'on thyroxine', 'TSH', 'T3 measured', 'T3', 'TT4',
+    ],
+}
+
+# (min, max) of every feature, in MODEL_FEATURES order. These are the bounds
+# display_input() enforces on the prediction pages in app.py.
+MODEL_BOUNDS = {
+    'diabetes': [
+        (0.0, 20.0), (0.0, 500.0), (0.0, 200.0), (0.0, 100.0), (0.0, 1000.0),
+        (0.0, 70.0), (0.0, 3.0), (0.0, 120.0),
+    ],
+    'heart_disease': [
+        (0.0, 120.0), (0.0, 1.0), (0.0, 3.0), (0.0, 250.0), (0.0, 600.0),
+        (0.0, 1.0), (0.0, 2.0), (0.0, 250.0), (0.0, 1.0), (0.0, 10.0),
+        (0.0, 2.0), (0.0, 3.0), (0.0, 2.0),
+    ],
+    'parkinsons': [
+        (0.0, 500.0), (0.0, 500.0), (0.0, 500.0), (0.0, 5.0), (0.0, 1.0),
+        (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 5.0),
+        (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0),
+        (0.0, 50.0), (0.0, 1.0), (0.0, 1.0), (-10.0, 10.0), (0.0, 10.0),
+        (0.0, 10.0), (0.0, 1.0),
+    ],
+    'lung_cancer': [
+        (0.0, 1.0), (0.0, 120.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0),
+        (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0),
+        (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0), (0.0, 1.0),
+    ],
+    'thyroid': [
+        (0.0, 120.0), (0.0, 1.0), (0.0, 1.0), (0.0, 100.0), (0.0, 1.0),
+        (0.0, 10.0), (0.0, 300.0),
+    ],
+}
+
+
+def validate(key, rows):
+    """Check rows of features against MODEL_BOUNDS[key] in one vectorized pass.
+
+    `rows` is a sequence of rows in MODEL_FEATURES[key] order. Returns them as
+    a C-contiguous float64 array, or raises ValueError naming the first bad
+    feature.
+    """
+    features = MODEL_FEATURES[key]
+    try:
+        block = np.ascontiguousarray(rows, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError('features must be numbers')
+    if block.ndim != 2 or block.shape[1] != len(features):
+        raise ValueError(f"expected {len(features)} features per row for {key}")
+
+    bounds = np.asarray(MODEL_BOUNDS[key], dtype=np.float64)
+    bad = ~((block >= bounds[:, 0]) & (block <= bounds[:, 1]))  # also catches NaN
+    if bad.any():
+        row, col = np.argwhere(bad)[0]
+        low, high = MODEL_BOUNDS[key][col]
+        raise ValueError(f"row {row}: {features[col]}={block[row, col]} is outside [{low}, {high}]")
+    return block
+
+# Bundled dataset each model was trained from, and its label column
+MODEL_DATASETS = {
+    'diabetes': ('Datasets/diabetes_data.csv', 'Outcome'),
+    'heart_disease': ('Datasets/heart_disease_data.csv', 'target'),
+    'parkinsons': ('Datasets/parkinson_data.csv', 'status'),
+    'lung_cancer': ('Datasets/prepocessed_lungs_data.csv', 'LUNG_CANCER'),
+    'thyroid': ('Datasets/prepocessed_hypothyroid.csv', 'binaryClass'),
+}
@@ -0,0 +1,147 @@
+# Opt-in stage timing for the app
+#
+# Set DISEASE_APP_PROFILE=1 to record how long each stage of a rerun takes
+# (styles, menu, widgets, model load, input conversion, predict, the whole
+# rerun), labelled by page and model. Timings go into fixed-bucket histograms
+# that can be exported as Prometheus text or JSON and are shown on the
+# Diagnostics page of app.py.
+#
+# When profiling is off, stage() returns one shared no-op context manager, so
+# an instrumented block costs a function call and a flag check.
+import json
+import threading
+import time
+from bisect import bisect_left
+
+from settings import env_flag
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC = 'disease_app_stage_seconds'
+
+_enabled = env_flag('DISEASE_APP_PROFILE')
+_histograms = {}
+_lock = threading.Lock()
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _Timer:
+    __slots__ = ('key', 'start')
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def stage(name, page='', model=''):
+    """Context manager timing one stage; a shared no-op when profiling is off."""
+    if not _enabled:
+        return _NOOP
+    return _Timer((name, page, model))
+
+
+def observe(key, seconds):
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """One summary dict per (stage, page, model), slowest total first."""
+    with _lock:
+        items = [(key, h.count, h.sum, h.quantile(0.5), h.quantile(0.99), list(h.counts))
+                 for key, h in _histograms.items()]
+    rows = [{
+        'stage': stage_name,
+        'page': page,
+        'model': model,
+        'count': count,
+        'total_ms': total * 1000,
+        'mean_ms': total / count * 1000 if count else 0.0,
+        'p50_ms_le': p50 * 1000,
+        'p99_ms_le': p99 * 1000,
+        'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], counts)),
+    } for (stage_name, page, model), count, total, p50, p99, counts in items]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = [f"# HELP {METRIC} Time spent per app stage.", f"# TYPE {METRIC} histogram"]
+    with _lock:
+        items = sorted((key, list(h.counts), h.sum, h.count) for key, h in _histograms.items())
+    for (stage_name, page, model), counts, total, count in items:
+        labels = f'stage="{_escape(stage_name)}",page="{_escape(page)}",model="{_escape(model)}"'
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC}_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f'{METRIC}_sum{{{labels}}} {total}')
+        lines.append(f'{METRIC}_count{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def to_json():
+    return json.dumps({'buckets_seconds': BUCKETS, 'stages': snapshot()}, indent=2)
@@ -0,0 +1,217 @@
+# Compiled NumPy scoring kernel for the linear models
+#
+# heart_disease, lung_cancer and thyroid are plain LogisticRegressions, so
+# scoring one is a dot product and a sigmoid. `export` pulls coef_,
+# intercept_, classes_ and any StandardScaler in front of the model out of the
+# .sav pickle into a .npz next to it. LinearScorer scores from those arrays
+# with NumPy alone, so serving a compiled model never imports sklearn.
+#
+# SVCs are compiled by svm_kernel.py into the same .npz layout, tagged with a
+# `kind`; load_compiled hands anything that is not 'linear' over to it.
+#
+# Compiled scoring is on by default; DISEASE_APP_COMPILED=0 makes the
+# registry (and the model store) serve the original sklearn estimators.
+#
+# Usage:
+#   python linear_kernel.py export [model ...]   # write Models/*.npz
+#   python linear_kernel.py verify [model ...]   # compare with the .sav on Datasets/
+import argparse
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+from settings import env_flag
+
+COMPILED_FORMAT = 1
+COMPILED = env_flag('DISEASE_APP_COMPILED', True)
+
+# Models whose .sav can be compiled into a LinearScorer
+LINEAR_MODELS = ('heart_disease', 'lung_cancer', 'thyroid')
+
+
+def compiled_path(model_path):
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class LinearScorer:
+    """predict / predict_proba / decision_function for a binary linear model.
+
+    A scaler in front of the model is folded into the weights at construction,
+    so scoring is one matrix-vector product however the model was trained.
+    """
+
+    def __init__(self, coef, intercept, classes, mean=None, scale=None, probability=True):
+        coef = np.asarray(coef, dtype=np.float64).ravel()
+        intercept = float(np.asarray(intercept).ravel()[0])
+        if scale is not None:
+            coef = coef / scale
+        if mean is not None:
+            intercept -= float(coef @ mean)
+        self.coef_ = np.ascontiguousarray(coef)
+        self.intercept_ = intercept
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = len(coef)
+        self.probability = probability
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has shape {X.shape}, expected (n, {self.n_features_in_})")
+        return X @ self.coef_ + self.intercept_
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+    @property
+    def predict_proba(self):
+        # Like sklearn, margin-only models make hasattr(model, 'predict_proba') False
+        if not self.probability:
+            raise AttributeError('predict_proba is not available for this model')
+        return self._predict_proba
+
+    def _predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+
+def _linear_parts(model):
+    """(coef, intercept, classes, mean, scale) of a LogisticRegression, or of a
+    Pipeline of an optional StandardScaler followed by one."""
+    mean = scale = None
+    steps = getattr(model, 'steps', None)
+    if steps is not None:
+        if len(steps) > 2:
+            raise ValueError(f"cannot compile a pipeline with {len(steps)} steps")
+        if len(steps) == 2:
+            scaler = steps[0][1]
+            if type(scaler).__name__ != 'StandardScaler':
+                raise ValueError(f"cannot compile a pipeline starting with {type(scaler).__name__}")
+            mean = scaler.mean_ if scaler.with_mean else None
+            scale = scaler.scale_ if scaler.with_std else None
+        model = steps[-1][1]
+
+    if type(model).__name__ != 'LogisticRegression':
+        raise ValueError(f"cannot compile {type(model).__name__}")
+    if len(model.classes_) != 2:
+        raise ValueError('only binary models can be compiled')
+    return model.coef_, model.intercept_, model.classes_, mean, scale
+
+
+def export(model_path):
+    """Compile the pickled model at `model_path` into a .npz next to it."""
+    import pickle
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    coef, intercept, classes, mean, scale = _linear_parts(model)
+    arrays = {
+        'format': np.int64(COMPILED_FORMAT),
+        'kind': np.str_('linear'),
+        'source_sha256': np.str_(file_sha256(model_path)),
+        'probability': np.bool_(True),
+        'coef': np.asarray(coef, dtype=np.float64).ravel(),
+        'intercept': np.asarray(intercept, dtype=np.float64).ravel(),
+        'classes': np.asarray(classes),
+    }
+    if mean is not None:
+        arrays['mean'] = np.asarray(mean, dtype=np.float64)
+    if scale is not None:
+        arrays['scale'] = np.asarray(scale, dtype=np.float64)
+
+    return save_compiled(model_path, arrays)
+
+
+def save_compiled(model_path, arrays):
+    """Atomically write `arrays` as the compiled .npz of `model_path`."""
+    target = compiled_path(model_path)
+    tmp = target + '.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, target)
+    return target
+
+
+def load_compiled(model_path):
+    """Compiled scorer for `model_path`, or None if there is no up-to-date .npz.
+
+    The .npz records the sha256 of the pickle it was compiled from, so a
+    retrained .sav is never scored with stale weights.
+    """
+    path = compiled_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['format']) != COMPILED_FORMAT or str(data['source_sha256']) != file_sha256(model_path):
+            return None
+        kind = str(data['kind']) if 'kind' in data else 'linear'
+        if kind != 'linear':
+            from svm_kernel import scorer_from_arrays
+            return scorer_from_arrays(kind, data)
+        return LinearScorer(
+            data['coef'],
+            data['intercept'],
+            data['classes'],
+            data['mean'] if 'mean' in data else None,
+            data['scale'] if 'scale' in data else None,
+            probability=bool(data['probability']),
+        )
+
+
+def verify(key):
+    """Compare the compiled scorer with the pickled model on every dataset row.
+
+    Returns (rows, prediction mismatches, max |probability difference|).
+    """
+    import pickle
+    import warnings
+
+    from column_store import dataset_features
+    from model_registry import registry
+
+    scorer = load_compiled(registry.path(key))
+    if scorer is None:
+        raise SystemExit(f"{key}: no up-to-date compiled model, run `python linear_kernel.py export {key}`")
+    with open(registry.path(key), 'rb') as f:
+        model = pickle.load(f)
+
+    X, _ = dataset_features(key)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        mismatches = int((scorer.predict(X) != model.predict(X)).sum())
+        proba_diff = 0.0
+        if hasattr(model, 'predict_proba'):
+            proba_diff = float(np.abs(scorer.predict_proba(X) - model.predict_proba(X)).max())
+    return len(X), mismatches, proba_diff
+
+
+def main(argv=None):
+    from model_registry import registry
+
+    parser = argparse.ArgumentParser(description='Compile linear models to NumPy and check them.')
+    parser.add_argument('command', choices=['export', 'verify'])
+    parser.add_argument('models', nargs='*', help=f"default: {', '.join(LINEAR_MODELS)}")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for key in args.models or LINEAR_MODELS:
+        if args.command == 'export':
+            print(f"{key}: wrote {export(registry.path(key))}")
+        else:
+            rows, mismatches, proba_diff = verify(key)
+            ok = mismatches == 0 and proba_diff < 1e-9
+            failed |= not ok
+            print(f"{key}: {rows} rows, {mismatches} prediction mismatches, "
+                  f"max |proba diff| {proba_diff:.2e} {'OK' if ok else 'FAILED'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Process-wide model registry
+#
+# Streamlit re-executes app.py on every widget change, but imported modules
+# stay in sys.modules, so a registry living here is shared by every rerun and
+# every session of the server process. Each model is loaded the first time
+# it is requested and reloaded only when its .sav file changes on disk.
+#
+# When a linear model has an up-to-date compiled .npz next to its .sav (see
+# linear_kernel.py), the registry serves the NumPy scorer instead of
+# unpickling the sklearn estimator. Compilable models are served from the
+# shared, memory-mapped model store (model_store.py) when it is enabled, so
+# worker processes share one copy of the weights. DISEASE_APP_COMPILED=0
+# turns both off and serves the unpickled sklearn estimators.
+#
+# A model with an online-updated snapshot published (see snapshots.py and
+# online_update.py) is served from the snapshot CURRENT points at instead;
+# publishing a new one changes the version, so it is picked up on the next
+# lookup without a restart.
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from linear_kernel import COMPILED, load_compiled
+from model_store import ENABLED as STORE_ENABLED, FLOAT32 as STORE_FLOAT32, STORE_DIR, attach
+from snapshots import SNAPSHOT_DIR, current_snapshot, load_snapshot
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, 'Models')
+
+MODEL_FILES = {
+    'diabetes': 'diabetes_model.sav',
+    'heart_disease': 'heart_disease_model.sav',
+    'parkinsons': 'parkinsons_model.sav',
+    'lung_cancer': 'lungs_disease_model.sav',
+    'thyroid': 'Thyroid_model.sav',
+}
+
+
+class ModelRegistry:
+    """Lazily loads models and keys each cached copy by file path and mtime."""
+
+    def __init__(self, files=MODEL_FILES, models_dir=MODELS_DIR, use_compiled=COMPILED, snapshot_dir=SNAPSHOT_DIR,
+                 store_dir=STORE_DIR if STORE_ENABLED else None,
+                 store_dtype=np.float32 if STORE_FLOAT32 else np.float64):
+        self._paths = {key: os.path.join(models_dir, name) for key, name in files.items()}
+        self.use_compiled = use_compiled
+        self.snapshot_dir = snapshot_dir
+        self.store_dir = store_dir
+        self.store_dtype = store_dtype
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __contains__(self, key):
+        return key in self._paths
+
+    def keys(self):
+        return self._paths.keys()
+
+    def path(self, key):
+        return self._paths[key]
+
+    def version(self, key):
+        """Return the (path, mtime_ns) pair that identifies the model on disk.
+
+        `path` is the published online snapshot when there is one, else the .sav.
+        """
+        path = self._paths[key]
+        if self.snapshot_dir:
+            # Twice, in case CURRENT moved on and the snapshot it named was
+            # pruned in between; a snapshot deleted by hand falls back to the .sav
+            for _ in range(2):
+                snapshot = current_snapshot(key, self.snapshot_dir)
+                if snapshot is None:
+                    break
+                try:
+                    return snapshot, os.stat(snapshot).st_mtime_ns
+                except FileNotFoundError:
+                    pass
+        return path, os.stat(path).st_mtime_ns
+
+    def get(self, key):
+        version = self.version(key)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with self._lock:
+            # Another session may have loaded it while we waited for the lock
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            model = self._load(version[0])
+            self._cache[key] = (version, model)
+            return model
+
+    def _load(self, path):
+        if path.endswith('.npz'):
+            return load_snapshot(path)
+        if self.use_compiled and self.store_dir:
+            try:
+                model = attach(path, self.store_dtype, self.store_dir)
+            except (OSError, ValueError):
+                # An unwritable or damaged store only costs the sharing
+                model = None
+            if model is not None:
+                return model
+        if self.use_compiled:
+            model = load_compiled(path)
+            if model is not None:
+                return model
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def loaded(self):
+        """Keys of the models currently held in memory."""
+        return list(self._cache)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+registry = ModelRegistry()
@@ -0,0 +1,253 @@
+# Shared, memory-mapped store of the models' numeric arrays
+#
+# With many app or serve.py workers, every process used to load its own copy
+# of every model. On first load the registry now compiles each model (see
+# linear_kernel.py and svm_kernel.py) and writes its arrays - coefficients,
+# intercepts, support vectors, dual coefficients - into one read-only file:
+#
+#   STORE_MAGIC, header length (uint64), JSON header {format, meta, arrays:
+#   {name: {dtype, shape, offset}}}, then every array at a 64-byte aligned
+#   offset
+#
+# in STORE_DIR, a per-user directory on /dev/shm (shared memory) where
+# available. The directory is created private (0700) and only used while it
+# belongs to the current user and nobody else can write to it, so another
+# local account cannot plant weights for the app to serve. Later
+# loads memory-map the file and build the scorers around read-only views of
+# it, so all workers share one physical copy of the weights and none of
+# them unpickles anything or imports sklearn. Files are named after the
+# sha256 of the .sav and of its compiled .npz, so a retrained model or a
+# re-export (svm_kernel.py export --approximate/--float32, linear_kernel.py
+# export) gets a new file; older files of the same model are removed when it
+# is written.
+#
+# With float32 (DISEASE_APP_MODEL_FLOAT32=1) support vectors, dual and random
+# feature coefficients are stored and scored in float32, halving them; the
+# small linear weight vectors always stay float64.
+#
+# DISEASE_APP_MODEL_STORE=0 switches the store off, and so does
+# DISEASE_APP_COMPILED=0, as the store only holds compiled models;
+# DISEASE_APP_MODEL_STORE_DIR moves it.
+#
+# Usage:
+#   python model_store.py [--float32]      # write the store for every model
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from linear_kernel import COMPILED, LinearScorer, _linear_parts, compiled_path, file_sha256, load_compiled
+from settings import env_flag
+
+STORE_FORMAT = 1
+STORE_MAGIC = b'DAMODEL1'
+ALIGN = 64
+
+_SHM = '/dev/shm'
+if os.environ.get('DISEASE_APP_MODEL_STORE_DIR'):
+    STORE_DIR = os.environ['DISEASE_APP_MODEL_STORE_DIR']
+elif os.path.isdir(_SHM) and os.access(_SHM, os.W_OK):
+    STORE_DIR = os.path.join(_SHM, f"disease-app-models-{os.getuid()}")
+else:
+    STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'models')
+
+ENABLED = COMPILED and env_flag('DISEASE_APP_MODEL_STORE', True)
+FLOAT32 = env_flag('DISEASE_APP_MODEL_FLOAT32')
+
+
+def trusted_dir(store_dir=STORE_DIR):
+    """Create `store_dir` private if needed; raise OSError unless it belongs to
+    this user and is not writable by anyone else."""
+    os.makedirs(store_dir, mode=0o700, exist_ok=True)
+    info = os.stat(store_dir)
+    if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+        raise OSError(f"{store_dir} is not a private directory of this user; not using the model store")
+    return store_dir
+
+
+def model_digest(model_path):
+    """sha256 of the .sav and, when there is one, its compiled .npz: what the
+    stored arrays are derived from."""
+    digest = hashlib.sha256(bytes.fromhex(file_sha256(model_path)))
+    try:
+        digest.update(bytes.fromhex(file_sha256(compiled_path(model_path))))
+    except FileNotFoundError:
+        pass
+    return digest.hexdigest()
+
+
+def store_path(model_path, dtype=np.float64, store_dir=STORE_DIR, digest=None):
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    digest = digest or model_digest(model_path)
+    return os.path.join(store_dir, f"{name}-{digest[:16]}-{np.dtype(dtype).name}.bin")
+
+
+def compile_model(model_path):
+    """Compiled scorer of the model at `model_path`, or None if it cannot be compiled."""
+    scorer = load_compiled(model_path)
+    if scorer is not None:
+        return scorer
+    import pickle
+
+    from svm_kernel import compile_svc
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    try:
+        if type(model).__name__ == 'SVC':
+            return compile_svc(model)
+        return LinearScorer(*_linear_parts(model))
+    except ValueError:
+        return None
+
+
+def scorer_arrays(scorer, dtype=np.float64):
+    """(arrays, meta) describing `scorer`; arrays are what the store shares."""
+    from svm_kernel import KernelScorer, RandomFeatureScorer
+
+    arrays = {'classes': np.asarray(scorer.classes_)}
+    meta = {'intercept': float(scorer.intercept_)}
+    if isinstance(scorer, LinearScorer):
+        arrays['coef'] = np.asarray(scorer.coef_, dtype=np.float64)
+        meta.update(kind='linear', probability=bool(scorer.probability))
+    elif isinstance(scorer, KernelScorer):
+        arrays['support_vectors'] = scorer.support_vectors_.astype(dtype)
+        arrays['dual_coef'] = scorer.dual_coef_.astype(dtype)
+        meta.update(kind='kernel', kernel=scorer.kernel, gamma=scorer.gamma, coef0=scorer.coef0,
+                    degree=scorer.degree, dtype=np.dtype(dtype).name)
+    elif isinstance(scorer, RandomFeatureScorer):
+        arrays['weights'] = scorer.weights_.astype(dtype)
+        arrays['offsets'] = scorer.offsets_.astype(dtype)
+        arrays['coef'] = scorer.coef_.astype(dtype)
+        meta.update(kind='rff', dtype=np.dtype(dtype).name)
+    else:
+        raise ValueError(f"cannot store {type(scorer).__name__}")
+    return arrays, meta
+
+
+def write_store(path, arrays, meta):
+    """Atomically write `arrays` and `meta` as a store file at `path`."""
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        layout[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+    header = json.dumps({'format': STORE_FORMAT, 'meta': meta, 'arrays': layout}).encode()
+    start = -(-(len(STORE_MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    trusted_dir(os.path.dirname(path))
+    tmp = f"{path}.tmp-{os.getpid()}"
+    # Left behind by a crashed writer with the same pid
+    try:
+        os.remove(tmp)
+    except FileNotFoundError:
+        pass
+    # O_EXCL: never write through a file or link that is already there
+    with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+        f.write(STORE_MAGIC + struct.pack('<Q', len(header)) + header)
+        for name, values in arrays.items():
+            f.seek(start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(values).tobytes())
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def open_store(path):
+    """(views, meta) of the store file at `path`: read-only arrays over one shared map."""
+    with open(path, 'rb') as f:
+        magic = f.read(len(STORE_MAGIC))
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{path} is not a model store file")
+        size, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(size))
+    if header['format'] != STORE_FORMAT:
+        raise ValueError(f"{path}: unsupported store format {header['format']}")
+    start = -(-(len(STORE_MAGIC) + 8 + size) // ALIGN) * ALIGN
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    views = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        at = start + spec['offset']
+        views[name] = data[at:at + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+    return views, header['meta']
+
+
+def scorer_from_store(views, meta):
+    """Scorer over the store views; no array is copied."""
+    kind = meta['kind']
+    if kind == 'linear':
+        return LinearScorer(views['coef'], meta['intercept'], views['classes'], probability=meta['probability'])
+
+    from svm_kernel import KernelScorer, RandomFeatureScorer
+
+    if kind == 'kernel':
+        return KernelScorer(views['support_vectors'], views['dual_coef'], meta['intercept'], views['classes'],
+                            meta['kernel'], meta['gamma'], meta['coef0'], meta['degree'], meta['dtype'])
+    if kind == 'rff':
+        return RandomFeatureScorer(views['weights'], views['offsets'], views['coef'], meta['intercept'],
+                                   views['classes'], meta['dtype'])
+    raise ValueError(f"unknown stored model kind {kind!r}")
+
+
+def build(model_path, dtype=np.float64, store_dir=STORE_DIR):
+    """Write the store file of the model at `model_path`; returns its path, or None
+    if the model cannot be compiled."""
+    digest = model_digest(model_path)
+    scorer = compile_model(model_path)
+    if scorer is None:
+        return None
+    path = store_path(model_path, dtype, store_dir, digest)
+    write_store(path, *scorer_arrays(scorer, dtype))
+
+    prefix = os.path.splitext(os.path.basename(model_path))[0] + '-'
+    suffix = f"-{np.dtype(dtype).name}.bin"
+    for name in os.listdir(store_dir):
+        old = os.path.join(store_dir, name)
+        if name.startswith(prefix) and name.endswith(suffix) and old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+    return path
+
+
+def attach(model_path, dtype=np.float64, store_dir=STORE_DIR):
+    """Scorer of the model at `model_path` backed by the shared store, writing the
+    store file first if needed; None if the model cannot be compiled."""
+    path = store_path(model_path, dtype, trusted_dir(store_dir))
+    if not os.path.exists(path) and build(model_path, dtype, store_dir) is None:
+        return None
+    return scorer_from_store(*open_store(path))
+
+
+def main(argv=None):
+    from model_registry import registry
+
+    parser = argparse.ArgumentParser(description='Write the shared model store.')
+    parser.add_argument('models', nargs='*', help='default: all')
+    parser.add_argument('--float32', action='store_true', help='store support vectors and dual coefficients as float32')
+    parser.add_argument('--dir', default=STORE_DIR)
+    args = parser.parse_args(argv)
+    unknown = [key for key in args.models if key not in registry.keys()]
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+
+    dtype = np.float32 if args.float32 else np.float64
+    for key in args.models or registry.keys():
+        path = build(registry.path(key), dtype, args.dir)
+        if path is None:
+            print(f"{key}: cannot be compiled, served from its pickle")
+            continue
+        views, meta = open_store(path)
+        arrays = ', '.join(f"{name} {values.dtype.name}{list(values.shape)}" for name, values in views.items())
+        print(f"{key}: {path} ({os.path.getsize(path)} bytes, {meta['kind']}) {arrays}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# Online updates of the logistic models from streamed, labelled outcomes
+#
+# When confirmed diagnoses come back they are appended to a CSV laid out like
+# the preprocessed datasets (the model's MODEL_FEATURES columns plus its label
+# column from MODEL_DATASETS, encoded 0/1). Each run of this script reads the
+# records appended since the last run and updates the model in mini-batches
+# with SGDClassifier.partial_fit, without retraining from scratch:
+#
+#   - features are standardised with running mean/variance statistics that are
+#     merged with every mini-batch (Chan et al.'s parallel Welford update);
+#     when they move, the weights are re-expressed so the model's decision
+#     function on raw features is unchanged before the SGD step
+#   - the first run starts from the model in Models/, so the first snapshot
+#     predicts exactly like the .sav it replaces
+#   - the result is checked on the notebook's held-out split of Datasets/ and
+#     only published if accuracy is no more than --tolerance below the
+#     original model's; otherwise nothing is published, the record range is
+#     logged as rejected (see snapshots.py) and skipped by later runs, and the
+#     script exits 1 (with --follow it logs the rejection and keeps polling)
+#   - published snapshots go to Models/online/<key>/ (see snapshots.py); the
+#     registry serves the new one on its next lookup, without a restart
+#
+# Usage:
+#   python online_update.py update heart_disease outcomes.csv
+#   python online_update.py update thyroid outcomes.csv --follow --interval 60
+#   python online_update.py status
+#   python online_update.py reset heart_disease      # serve the .sav again
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from batch_score import feature_block
+from features import MODEL_DATASETS, MODEL_FEATURES
+from linear_kernel import LINEAR_MODELS, LinearScorer, _linear_parts
+from model_registry import ModelRegistry
+from snapshots import SNAPSHOT_DIR, current_snapshot, publish, read_arrays, record_rejected, rejected, reset
+
+ONLINE_MODELS = LINEAR_MODELS
+CLASSES = np.array([0, 1])
+DEFAULT_BATCH = 256
+READ_BLOCK = 16 * 2**20
+
+
+class UpdateRejected(Exception):
+    """An update made held-out accuracy drop by more than the tolerance."""
+
+    def __init__(self, message, summary):
+        super().__init__(message)
+        self.summary = summary
+
+
+class OnlineLogistic:
+    """A logistic model on running-standardised features, updated by SGD."""
+
+    def __init__(self, count, mean, m2, coef, intercept, alpha=1e-4, eta0=0.01):
+        from sklearn.linear_model import SGDClassifier
+
+        self.count = float(count)
+        self.mean = np.array(mean, dtype=np.float64)
+        self.m2 = np.array(m2, dtype=np.float64)
+        self.sgd = SGDClassifier(loss='log_loss', alpha=alpha, learning_rate='constant', eta0=eta0,
+                                 random_state=0)
+        # partial_fit keeps coef_/intercept_ that are already set, so the
+        # first step starts from these weights rather than from zeros
+        self.sgd.coef_ = np.asarray(coef, dtype=np.float64).reshape(1, -1).copy()
+        self.sgd.intercept_ = np.asarray(intercept, dtype=np.float64).reshape(1).copy()
+
+    @classmethod
+    def from_model(cls, model, X, **kwargs):
+        """Start from a fitted linear model, with scaler statistics taken from X."""
+        if not isinstance(model, LinearScorer):
+            model = LinearScorer(*_linear_parts(model))
+        mean = X.mean(axis=0)
+        m2 = ((X - mean) ** 2).sum(axis=0)
+        scale = _scale(len(X), m2)
+        return cls(len(X), mean, m2, model.coef_ * scale, model.intercept_ + model.coef_ @ mean, **kwargs)
+
+    @classmethod
+    def from_arrays(cls, arrays, **kwargs):
+        return cls(arrays['count'], arrays['mean'], arrays['m2'], arrays['coef'], arrays['intercept'], **kwargs)
+
+    @property
+    def scale(self):
+        return _scale(self.count, self.m2)
+
+    def raw_weights(self):
+        """(coef, intercept) of the decision function on unscaled features."""
+        coef = self.sgd.coef_.ravel() / self.scale
+        return coef, float(self.sgd.intercept_[0]) - float(coef @ self.mean)
+
+    def update(self, X, y):
+        coef, intercept = self.raw_weights()
+
+        n = len(X)
+        batch_mean = X.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.m2 += ((X - batch_mean) ** 2).sum(axis=0) + delta ** 2 * (self.count * n / total)
+        self.mean += delta * (n / total)
+        self.count = total
+
+        scale = self.scale
+        self.sgd.coef_ = (coef * scale).reshape(1, -1)
+        self.sgd.intercept_ = np.array([intercept + coef @ self.mean])
+        self.sgd.partial_fit((X - self.mean) / scale, y, classes=CLASSES)
+
+    def scorer(self):
+        return LinearScorer(self.sgd.coef_, self.sgd.intercept_, CLASSES, self.mean, self.scale)
+
+    def arrays(self):
+        return {
+            'probability': np.bool_(True),
+            'coef': self.sgd.coef_.ravel().copy(),
+            'intercept': self.sgd.intercept_.copy(),
+            'classes': CLASSES,
+            'mean': self.mean.copy(),
+            'scale': self.scale,
+            'count': np.float64(self.count),
+            'm2': self.m2.copy(),
+        }
+
+
+def _scale(count, m2):
+    # Like StandardScaler: population standard deviation, 1 for constant features
+    scale = np.sqrt(np.asarray(m2) / count)
+    return np.where(scale > 0, scale, 1.0)
+
+
+def read_appended(path, offset, block_bytes=READ_BLOCK):
+    """Yield (end offset, DataFrame) for the complete lines of `path` after byte `offset`.
+
+    A trailing line without a newline is still being written and is left for
+    the next call.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        names = list(pd.read_csv(io.BytesIO(header), encoding='utf-8-sig').columns.str.strip())
+        offset = max(offset, len(header))
+        f.seek(offset)
+        pending = b''
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                return
+            data = pending + block
+            cut = data.rfind(b'\n') + 1
+            pending = data[cut:]
+            if not cut:
+                continue
+            offset += cut
+            yield offset, pd.read_csv(io.BytesIO(data[:cut]), header=None, names=names)
+
+
+def accuracy(model, X, y):
+    return float((model.predict(X) == y).mean())
+
+
+def update(key, path, batch_size=DEFAULT_BATCH, alpha=1e-4, eta0=0.01, tolerance=0.02,
+           snapshot_dir=SNAPSHOT_DIR, keep=5, label=None):
+    """Consume the records appended to `path` since the last run; returns a summary dict."""
+    from train import dataset_split
+
+    X_train, X_test, _, y_test = dataset_split(key)
+    snapshot = current_snapshot(key, snapshot_dir)
+    if snapshot is None:
+        base = ModelRegistry(snapshot_dir=None)[key]
+        learner = OnlineLogistic.from_model(base, X_train, alpha=alpha, eta0=eta0)
+        baseline, offsets, rows_total = accuracy(base, X_test, y_test), {}, 0
+    else:
+        arrays = read_arrays(snapshot)
+        learner = OnlineLogistic.from_arrays(arrays, alpha=alpha, eta0=eta0)
+        baseline = float(arrays['baseline_accuracy'])
+        offsets = json.loads(str(arrays['offsets']))
+        rows_total = int(arrays['rows'])
+
+    source = os.path.abspath(path)
+    features = MODEL_FEATURES[key]
+    label = label or MODEL_DATASETS[key][1]
+    skipped = [entry['end'] for entry in rejected(key, snapshot_dir) if entry['source'] == source]
+    offset = start_offset = max([offsets.get(source, 0)] + skipped)
+    rows = 0
+    seconds = 0.0
+    for end, frame in read_appended(source, offset):
+        missing = [name for name in features + [label] if name not in frame.columns]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        X = feature_block(frame, features, rows, path)
+        y = frame[label].to_numpy()
+        if not np.isin(y, CLASSES).all():
+            raise ValueError(f"{path}: labels in {label!r} must be 0 or 1")
+        y = y.astype(np.int64)
+
+        start = time.perf_counter()
+        for i in range(0, len(X), batch_size):
+            learner.update(X[i:i + batch_size], y[i:i + batch_size])
+        seconds += time.perf_counter() - start
+        rows += len(X)
+        offset = end
+
+    summary = {
+        'model': key,
+        'rows': rows,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+        'baseline_accuracy': baseline,
+        'published': None,
+    }
+    if not rows:
+        return summary
+
+    summary['holdout_accuracy'] = held_out = accuracy(learner.scorer(), X_test, y_test)
+    if held_out < baseline - tolerance:
+        record_rejected(key, {
+            'source': source,
+            'start': start_offset,
+            'end': offset,
+            'rows': rows,
+            'holdout_accuracy': held_out,
+            'baseline_accuracy': baseline,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }, snapshot_dir)
+        raise UpdateRejected(f"{key}: held-out accuracy fell to {held_out:.3f} from {baseline:.3f} "
+                             f"(tolerance {tolerance}); snapshot not published, bytes {start_offset}-{offset} "
+                             f"of {path} skipped", summary)
+
+    offsets[source] = offset
+    arrays = learner.arrays()
+    arrays.update(
+        baseline_accuracy=np.float64(baseline),
+        holdout_accuracy=np.float64(held_out),
+        offsets=np.str_(json.dumps(offsets)),
+        rows=np.int64(rows_total + rows),
+        created=np.str_(time.strftime('%Y-%m-%dT%H:%M:%S')),
+    )
+    summary['published'] = publish(key, arrays, snapshot_dir, keep)
+    return summary
+
+
+def status(snapshot_dir=SNAPSHOT_DIR):
+    for key in ONLINE_MODELS:
+        skipped = rejected(key, snapshot_dir)
+        if skipped:
+            print(f"{key}: {len(skipped)} record range(s) rejected, last {skipped[-1]['rows']} rows "
+                  f"of {skipped[-1]['source']} on {skipped[-1]['created']}")
+        snapshot = current_snapshot(key, snapshot_dir)
+        if snapshot is None:
+            print(f"{key}: serving the .sav (no snapshot)")
+            continue
+        arrays = read_arrays(snapshot)
+        print(f"{key}: serving {os.path.relpath(snapshot)} from {str(arrays['created'])}, "
+              f"{int(arrays['rows'])} rows learned, held-out accuracy {float(arrays['holdout_accuracy']):.3f} "
+              f"(original {float(arrays['baseline_accuracy']):.3f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Update the logistic models from appended labelled records.')
+    parser.add_argument('command', choices=['update', 'status', 'reset'])
+    parser.add_argument('model', nargs='?', choices=ONLINE_MODELS)
+    parser.add_argument('records', nargs='?', help='CSV of labelled records (update)')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH, help='mini-batch rows per SGD step')
+    parser.add_argument('--alpha', type=float, default=1e-4, help='L2 penalty')
+    parser.add_argument('--eta0', type=float, default=0.01, help='constant learning rate')
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help='largest allowed drop in held-out accuracy (default 0.02)')
+    parser.add_argument('--label', help='label column (default: the dataset label of the model)')
+    parser.add_argument('--keep', type=int, default=5, help='snapshots to keep per model')
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR)
+    parser.add_argument('--follow', action='store_true', help='keep polling the records file')
+    parser.add_argument('--interval', type=float, default=30.0, help='seconds between polls with --follow')
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        status(args.snapshot_dir)
+        return
+    if args.model is None:
+        parser.error(f"{args.command} needs a model")
+    if args.command == 'reset':
+        reset(args.model, args.snapshot_dir)
+        print(f"{args.model}: serving the .sav again")
+        return
+    if args.records is None:
+        parser.error('update needs a records file')
+
+    warnings.simplefilter('ignore', UserWarning)
+    while True:
+        try:
+            summary = update(args.model, args.records, args.batch, args.alpha, args.eta0, args.tolerance,
+                             args.snapshot_dir, args.keep, args.label)
+        except UpdateRejected as e:
+            print(e, file=sys.stderr, flush=True)
+            if not args.follow:
+                return 1
+            time.sleep(args.interval)
+            continue
+        if summary['published']:
+            print(f"{args.model}: learned {summary['rows']} rows at {summary['rows_per_second']:,.0f} rows/s, "
+                  f"held-out accuracy {summary['holdout_accuracy']:.3f} "
+                  f"(original {summary['baseline_accuracy']:.3f}); published {summary['published']}", flush=True)
+        elif not args.follow:
+            print(f"{args.model}: no new records in {args.records}")
+        if not args.follow:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
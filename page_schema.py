@@ -0,0 +1,175 @@
+# Declarative layout of the prediction pages in app.py
+#
+# Every page is one st.form generated from PAGES[key]: tabs hold columns and
+# columns hold (feature, label, tooltip) fields. Feature names are those in
+# features.MODEL_FEATURES, which fixes the order values are passed to the
+# model in, and the widget bounds come from features.MODEL_BOUNDS, so neither
+# is repeated here.
+from features import MODEL_BOUNDS, MODEL_FEATURES
+
+PAGES = {
+    'diabetes': {
+        'menu': "Diabetes Prediction",
+        'title': "Diabetes Prediction",
+        'heading': "Enter patient health indicators:",
+        'button': "Predict Diabetes Status",
+        'condition': "diabetes",
+        'summary': True,
+        'tabs': [(None, [
+            [
+                ('Pregnancies', 'Number of Pregnancies', 'Enter number of times pregnant'),
+                ('Glucose', 'Glucose Level (mg/dL)', 'Enter glucose level'),
+                ('BloodPressure', 'Blood Pressure (mmHg)', 'Enter blood pressure value'),
+                ('SkinThickness', 'Skin Thickness (mm)', 'Enter skin thickness value'),
+            ],
+            [
+                ('Insulin', 'Insulin Level (μU/mL)', 'Enter insulin level'),
+                ('BMI', 'BMI (kg/m²)', 'Enter Body Mass Index value'),
+                ('DiabetesPedigreeFunction', 'Diabetes Pedigree Function', 'Enter diabetes pedigree function value'),
+                ('Age', 'Age (years)', 'Enter age of the person'),
+            ],
+        ])],
+    },
+    'heart_disease': {
+        'menu': "Heart Disease Prediction",
+        'title': "Heart Disease Prediction",
+        'heading': "Enter cardiac assessment data:",
+        'button': "Predict Heart Disease Status",
+        'condition': "heart disease",
+        'tabs': [(None, [
+            [
+                ('age', 'Age (years)', 'Enter age of the person'),
+                ('sex', 'Gender (1=male; 0=female)', 'Enter Gender of the person'),
+                ('cp', 'Chest Pain Type (0-3)', 'Enter chest pain type'),
+                ('trestbps', 'Resting Blood Pressure (mmHg)', 'Enter resting blood pressure'),
+                ('chol', 'Serum Cholesterol (mg/dL)', 'Enter serum cholesterol'),
+            ],
+            [
+                ('fbs', 'Fasting Blood Sugar > 120 mg/dL (1=true; 0=false)', 'Enter fasting blood sugar status'),
+                ('restecg', 'Resting ECG Results (0-2)', 'Enter resting ECG results'),
+                ('thalach', 'Maximum Heart Rate (bpm)', 'Enter maximum heart rate achieved'),
+                ('exang', 'Exercise Induced Angina (1=yes; 0=no)', 'Enter exercise induced angina status'),
+            ],
+            [
+                ('oldpeak', 'ST Depression by Exercise', 'Enter ST depression value'),
+                ('slope', 'Slope of Peak Exercise ST Segment (0-2)', 'Enter slope value'),
+                ('ca', 'Number of Major Vessels (0-3)', 'Enter number of major vessels'),
+                ('thal', 'Thalassemia (0-2)', 'Enter thal value'),
+            ],
+        ])],
+    },
+    'parkinsons': {
+        'menu': "Parkinson's Prediction",
+        'title': "Parkinson's Disease Prediction",
+        'heading': "Enter voice recording metrics:",
+        'button': "Predict Parkinson's Status",
+        'condition': "Parkinson's disease",
+        'tabs': [
+            ("Basic Metrics", [
+                [
+                    ('MDVP:Fo(Hz)', 'MDVP:Fo(Hz)', 'Average vocal fundamental frequency'),
+                    ('MDVP:Fhi(Hz)', 'MDVP:Fhi(Hz)', 'Maximum vocal fundamental frequency'),
+                    ('MDVP:Flo(Hz)', 'MDVP:Flo(Hz)', 'Minimum vocal fundamental frequency'),
+                    ('MDVP:Jitter(%)', 'MDVP:Jitter(%)', 'Percentage variation in fundamental frequency'),
+                    ('MDVP:Jitter(Abs)', 'MDVP:Jitter(Abs)', 'Absolute jitter in microseconds'),
+                ],
+                [
+                    ('MDVP:RAP', 'MDVP:RAP', 'Relative amplitude perturbation'),
+                    ('MDVP:PPQ', 'MDVP:PPQ', 'Five-point period perturbation quotient'),
+                    ('Jitter:DDP', 'Jitter:DDP', 'Average absolute difference of differences'),
+                    ('MDVP:Shimmer', 'MDVP:Shimmer', 'Local shimmer'),
+                    ('MDVP:Shimmer(dB)', 'MDVP:Shimmer(dB)', 'Local shimmer in decibels'),
+                ],
+            ]),
+            ("Advanced Metrics", [
+                [
+                    ('Shimmer:APQ3', 'Shimmer:APQ3', 'Three-point amplitude perturbation quotient'),
+                    ('Shimmer:APQ5', 'Shimmer:APQ5', 'Five-point amplitude perturbation quotient'),
+                    ('MDVP:APQ', 'MDVP:APQ', 'Amplitude perturbation quotient'),
+                    ('Shimmer:DDA', 'Shimmer:DDA', 'Average absolute differences between consecutive differences'),
+                    ('NHR', 'NHR', 'Noise to harmonic ratio'),
+                ],
+                [
+                    ('HNR', 'HNR', 'Harmonic to noise ratio'),
+                    ('RPDE', 'RPDE', 'Recurrence period density entropy'),
+                    ('DFA', 'DFA', 'Detrended fluctuation analysis'),
+                    ('spread1', 'Spread1', 'Nonlinear measure of fundamental frequency variation'),
+                    ('spread2', 'Spread2', 'Nonlinear measure of fundamental frequency variation'),
+                    ('D2', 'D2', 'Correlation dimension'),
+                    ('PPE', 'PPE', 'Pitch period entropy'),
+                ],
+            ]),
+        ],
+    },
+    'lung_cancer': {
+        'menu': "Lung Cancer Prediction",
+        'title': "Lung Cancer Prediction",
+        'heading': "Enter patient symptoms and risk factors:",
+        'button': "Predict Lung Cancer Status",
+        'condition': "lung cancer",
+        'tabs': [(None, [
+            [
+                ('GENDER', 'Gender (1=Male; 0=Female)', 'Enter gender of the person'),
+                ('AGE', 'Age (years)', 'Enter age of the person'),
+                ('SMOKING', 'Smoking (1=Yes; 0=No)', 'Enter if the person smokes'),
+                ('YELLOW_FINGERS', 'Yellow Fingers (1=Yes; 0=No)', 'Enter if the person has yellow fingers'),
+                ('ANXIETY', 'Anxiety (1=Yes; 0=No)', 'Enter if the person has anxiety'),
+            ],
+            [
+                ('PEER_PRESSURE', 'Peer Pressure (1=Yes; 0=No)', 'Enter if the person is under peer pressure'),
+                ('CHRONIC DISEASE', 'Chronic Disease (1=Yes; 0=No)', 'Enter if the person has a chronic disease'),
+                ('FATIGUE', 'Fatigue (1=Yes; 0=No)', 'Enter if the person experiences fatigue'),
+                ('ALLERGY', 'Allergy (1=Yes; 0=No)', 'Enter if the person has allergies'),
+                ('WHEEZING', 'Wheezing (1=Yes; 0=No)', 'Enter if the person experiences wheezing'),
+            ],
+            [
+                ('ALCOHOL CONSUMING', 'Alcohol Consuming (1=Yes; 0=No)', 'Enter if the person consumes alcohol'),
+                ('COUGHING', 'Coughing (1=Yes; 0=No)', 'Enter if the person experiences coughing'),
+                ('SHORTNESS OF BREATH', 'Shortness Of Breath (1=Yes; 0=No)', 'Enter if the person experiences shortness of breath'),
+                ('SWALLOWING DIFFICULTY', 'Swallowing Difficulty (1=Yes; 0=No)', 'Enter if the person has difficulty swallowing'),
+                ('CHEST PAIN', 'Chest Pain (1=Yes; 0=No)', 'Enter if the person experiences chest pain'),
+            ],
+        ])],
+    },
+    'thyroid': {
+        'menu': "Hypo-Thyroid Prediction",
+        'title': "Hypo-Thyroid Prediction",
+        'heading': "Enter thyroid function test results:",
+        'button': "Predict Thyroid Status",
+        'condition': "Hypo-Thyroid disease",
+        'tabs': [(None, [
+            [
+                ('age', 'Age (years)', 'Enter age of the person'),
+                ('sex', 'Sex (1=Male; 0=Female)', 'Enter sex of the person'),
+                ('on thyroxine', 'On Thyroxine (1=Yes; 0=No)', 'Enter if the person is on thyroxine'),
+            ],
+            [
+                ('TSH', 'TSH Level (mU/L)', 'Enter TSH level'),
+                ('T3 measured', 'T3 Measured (1=Yes; 0=No)', 'Enter if T3 was measured'),
+                ('T3', 'T3 Level (nmol/L)', 'Enter T3 level'),
+                ('TT4', 'TT4 Level (nmol/L)', 'Enter TT4 level'),
+            ],
+        ])],
+    },
+}
+
+# Menu entry -> model key
+PAGE_KEYS = {page['menu']: key for key, page in PAGES.items()}
+
+
+def fields(key):
+    """(feature, label, tooltip, min, max) of every field of page `key`, in layout order."""
+    bounds = dict(zip(MODEL_FEATURES[key], MODEL_BOUNDS[key]))
+    return [(feature, label, tooltip, *bounds[feature])
+            for _, columns in PAGES[key]['tabs'] for column in columns
+            for feature, label, tooltip in column]
+
+
+def _check():
+    for key in PAGES:
+        laid_out = [field[0] for field in fields(key)]
+        if sorted(laid_out) != sorted(MODEL_FEATURES[key]):
+            raise ValueError(f"page {key!r} does not lay out exactly the features of MODEL_FEATURES[{key!r}]")
+
+
+_check()
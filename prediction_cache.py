@@ -0,0 +1,206 @@
+# Bounded LRU cache of prediction results
+#
+# Clinicians re-submit the same form and Streamlit reruns repeat the same
+# predict call, so results are memoized per row. Entries are keyed by model
+# key and a canonical hash of the float64 feature vector, and remember the
+# registry version (path, mtime) of the model that produced them: when a .sav
+# file changes, every entry of that model is dropped on the next lookup.
+#
+# Only blocks of up to MAX_CACHED_ROWS rows (forms, single API requests) use
+# the cache. Hashing and splitting results row by row costs far more than
+# scoring a large block in one call, and batch files would push every form
+# entry out of the LRU, so larger blocks go straight to the scorer.
+#
+# predict() is begin() and complete() back to back; serve.py awaits its
+# micro-batcher between the two, so drift observation, caching and the audit
+# log are done here for both the app and the server.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import audit_log
+import drift
+from batch_score import score_block
+from model_registry import registry
+
+MAX_CACHED_ROWS = 16
+
+
+def row_digest(row):
+    """Canonical hash of one feature vector: float64 bytes, with -0.0 folded into 0.0."""
+    row = np.ascontiguousarray(row, dtype=np.float64) + 0.0
+    return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries=4096, ttl=None, max_rows=MAX_CACHED_ROWS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.uncached_blocks = 0
+
+    def _check_version(self, key, version):
+        # Called with the lock held
+        if self._versions.get(key, version) != version:
+            stale = [entry for entry in self._entries if entry[0] == key]
+            for entry in stale:
+                del self._entries[entry]
+            self.invalidations += len(stale)
+        self._versions[key] = version
+
+    def lookup(self, key, version, block):
+        """Return ({row index: result}, digests) for the cached rows of `block`."""
+        digests = [row_digest(row) for row in block]
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(key, version)
+            for i, digest in enumerate(digests):
+                entry = self._entries.get((key, digest))
+                if entry is not None and entry[0] is not None and entry[0] <= now:
+                    del self._entries[(key, digest)]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end((key, digest))
+                self.hits += 1
+                found[i] = entry[1]
+        return found, digests
+
+    def store(self, key, version, digests, results):
+        """Remember one result dict per digest, evicting least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if self._versions.get(key) != version:
+                # The model changed while these rows were being scored
+                return
+            for digest, result in zip(digests, results):
+                self._entries[(key, digest)] = (expires, result)
+                self._entries.move_to_end((key, digest))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin(self, key, rows):
+        """First half of predict(): observe the rows and look up the cached ones.
+
+        Returns a Pending; the rows in its `todo` block (None if every row was
+        cached) are scored by the caller and handed to complete().
+        """
+        block = np.ascontiguousarray(rows, dtype=np.float64)
+        drift.observe(key, block)
+        version = registry.version(key)
+        if len(block) > self.max_rows:
+            with self._lock:
+                self.uncached_blocks += 1
+            return Pending(key, version, block)
+        found, digests = self.lookup(key, version, block)
+        return Pending(key, version, block, found, digests)
+
+    def complete(self, pending, columns=None, audit=None):
+        """Second half of predict(): cache `columns`, the scores of pending.todo,
+        and return the result for every row. With `audit` set to a source name
+        the prediction is written to the audit log."""
+        found = pending.found
+        if found is None:
+            result = columns
+        else:
+            if pending.missing:
+                fresh = split_rows(columns)
+                self.store(pending.key, pending.version, [pending.digests[i] for i in pending.missing], fresh)
+                found.update(zip(pending.missing, fresh))
+            result = join_rows([found[i] for i in range(len(pending.block))])
+        if audit:
+            audit_log.record(pending.key, pending.version, pending.block, result, audit)
+        return result
+
+    def predict(self, key, rows, score=None, audit=None):
+        """Score `rows` with model `key`, computing only the uncached rows (all of
+        them for a block of more than `max_rows` rows).
+
+        Returns the same columns as batch_score.score_block. `score` defaults
+        to scoring the registry's current model in one vectorized call.
+        """
+        pending = self.begin(key, rows)
+        columns = None
+        if pending.todo is not None:
+            if score is None:
+                score = lambda b: score_block(registry[key], b)  # noqa: E731
+            columns = score(pending.todo)
+        return self.complete(pending, columns, audit)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+            self.uncached_blocks = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'max_cached_rows': self.max_rows,
+                'uncached_blocks': self.uncached_blocks,
+            }
+
+
+class Pending:
+    """A prediction between PredictionCache.begin() and complete()."""
+
+    def __init__(self, key, version, block, found=None, digests=None):
+        # found is None for a block too large to cache: every row is scored
+        self.key = key
+        self.version = version
+        self.block = block
+        self.found = found
+        self.digests = digests
+        self.missing = None if found is None else [i for i in range(len(block)) if i not in found]
+
+    @property
+    def todo(self):
+        """The rows still to be scored, or None."""
+        if self.found is None:
+            return self.block
+        return self.block[self.missing] if self.missing else None
+
+
+def split_rows(columns):
+    """{name: array} -> one {name: scalar} dict per row."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def join_rows(rows):
+    """Inverse of split_rows."""
+    return {name: np.array([row[name] for row in rows]) for name in rows[0]} if rows else {}
+
+
+cache = PredictionCache()
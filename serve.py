@@ -0,0 +1,283 @@
+# JSON/HTTP inference service
+#
+# A small asyncio HTTP/1.1 server (standard library only) exposing the same
+# five models as app.py, so other systems can get predictions without going
+# through Streamlit.
+#
+#   GET  /health            liveness and loaded models
+#   GET  /models            feature order and bounds of every model
+#   GET  /metrics           micro-batcher, prediction cache, input drift and audit log metrics
+#   POST /predict/<model>   {"features": {...} | [...]} or {"instances": [...]}
+#
+# Features may be given as an object keyed by the names in features.py or as
+# a list in that order. Values are checked against the same min/max bounds as
+# the Streamlit inputs. Each worker process loads the models once at startup.
+# Rows already in the prediction cache are answered directly; the rest are
+# coalesced by the model's MicroBatcher (batching.py), which scores them on
+# its own thread, so predict never blocks the event loop. Requests with more
+# rows than the cache takes are scored whole on an executor thread. Every prediction is
+# recorded in the audit log (audit_log.py).
+#
+# Usage: python serve.py [--host 127.0.0.1] [--port 8000] [--workers 1]
+#                        [--max-batch 64] [--batch-wait-ms 2]
+#                        [--cache-size 4096] [--cache-ttl SECONDS]
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import warnings
+
+import audit_log
+import drift
+from batching import batcher_metrics, get_batcher
+from features import MODEL_BOUNDS, MODEL_FEATURES, validate
+from model_registry import registry
+from prediction_cache import PredictionCache
+
+MAX_BODY = 1 << 20
+# Larger request bodies are decoded, and their responses encoded, on an
+# executor thread: JSON work on a 1 MB body takes tens of milliseconds
+INLINE_BODY = 64 << 10
+
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_rows(key, payload):
+    """Turn a request payload into a validated float64 block.
+
+    Returns (block, single) where `single` tells whether the caller sent one
+    `features` row rather than a list of `instances`.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('request body must be a JSON object')
+    if 'instances' in payload:
+        items, single = payload['instances'], False
+        if not isinstance(items, list) or not items:
+            raise ValueError('instances must be a non-empty list')
+    elif 'features' in payload:
+        items, single = [payload['features']], True
+    else:
+        raise ValueError("request body needs 'features' or 'instances'")
+
+    features = MODEL_FEATURES[key]
+    rows = []
+    for item in items:
+        if isinstance(item, dict):
+            missing = [name for name in features if name not in item]
+            if missing:
+                raise ValueError(f"missing features: {', '.join(missing)}")
+            rows.append([item[name] for name in features])
+        else:
+            rows.append(item)
+    return validate(key, rows), single
+
+
+def decode_rows(key, body):
+    return parse_rows(key, json.loads(body or b'null'))
+
+
+def encode(payload):
+    return json.dumps(payload).encode()
+
+
+def result_rows(result):
+    # tolist() converts to Python ints and floats in one C loop
+    predictions = result['prediction'].tolist()
+    if 'probability' not in result:
+        return [{'prediction': prediction} for prediction in predictions]
+    return [{'prediction': prediction, 'probability': probability}
+            for prediction, probability in zip(predictions, result['probability'].tolist())]
+
+
+class InferenceServer:
+    def __init__(self, max_batch=64, max_wait_ms=2.0, cache_size=4096, cache_ttl=None):
+        self.batchers = {key: get_batcher(key, max_batch, max_wait_ms) for key in MODEL_FEATURES}
+        self.cache = PredictionCache(cache_size, cache_ttl)
+
+    async def predict(self, key, block):
+        if len(block) > self.cache.max_rows:
+            # Nothing to coalesce, and the drift, audit and JSON work grows with
+            # the rows: keep all of it off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.predict_large, key, block)
+        pending = self.cache.begin(key, block)
+        columns = None
+        if pending.todo is not None:
+            columns = await asyncio.wrap_future(self.batchers[key].submit(pending.todo))
+        return result_rows(self.cache.complete(pending, columns, 'serve'))
+
+    def predict_large(self, key, block):
+        return result_rows(self.cache.predict(key, block, audit='serve'))
+
+    async def route(self, method, target, body):
+        path = target.split('?', 1)[0].rstrip('/')
+
+        if path == '/health':
+            return 200, {'status': 'ok', 'models': registry.loaded()}
+
+        if path == '/models':
+            return 200, {key: {'features': MODEL_FEATURES[key], 'bounds': MODEL_BOUNDS[key]}
+                         for key in MODEL_FEATURES}
+
+        if path == '/metrics':
+            return 200, {'batchers': batcher_metrics(), 'cache': self.cache.stats(),
+                         'drift': drift.monitor.report(), 'audit': audit_log.audit.stats()}
+
+        if path.startswith('/predict/'):
+            key = path[len('/predict/'):]
+            if key not in MODEL_FEATURES:
+                raise HTTPError(404, f"unknown model '{key}'")
+            if method != 'POST':
+                raise HTTPError(405, 'use POST')
+            large = len(body) > INLINE_BODY
+            loop = asyncio.get_running_loop()
+            try:
+                if large:
+                    block, single = await loop.run_in_executor(None, decode_rows, key, body)
+                else:
+                    block, single = decode_rows(key, body)
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                raise HTTPError(400, str(e))
+
+            rows = await self.predict(key, block)
+            payload = {'model': key, **rows[0]} if single else {'model': key, 'predictions': rows}
+            if large:
+                payload = await loop.run_in_executor(None, encode, payload)
+            return 200, payload
+
+        raise HTTPError(404, 'not found')
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 431, {'error': 'headers too large'}, False)
+                    break
+
+                request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                try:
+                    method, target, version = request_line.split(' ', 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                # Only plain digits: int() would also take signs, spaces and underscores
+                raw_length = headers.get('content-length') or '0'
+                if not (raw_length.isascii() and raw_length.isdigit()):
+                    await self.respond(writer, 400, {'error': 'invalid Content-Length'}, False)
+                    break
+                length = int(raw_length)
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {'error': 'body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.route(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        # `payload` is a JSON-able object, or already encoded bytes
+        data = payload if isinstance(payload, bytes) else encode(payload)
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + data)
+        await writer.drain()
+
+
+def preload():
+    for key in registry.keys():
+        registry[key]
+    drift.preload()
+
+
+async def serve(host, port, max_batch, max_wait_ms, cache_size, cache_ttl, reuse_port=False):
+    server = InferenceServer(max_batch, max_wait_ms, cache_size, cache_ttl)
+    tcp = await asyncio.start_server(server.handle, host, port, reuse_port=reuse_port, backlog=1024)
+    async with tcp:
+        await tcp.serve_forever()
+
+
+def run_worker(host, port, max_batch, max_wait_ms, cache_size, cache_ttl, reuse_port):
+    # The models were fitted on DataFrames; requests arrive as plain arrays
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    preload()
+    try:
+        asyncio.run(serve(host, port, max_batch, max_wait_ms, cache_size, cache_ttl, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the disease models over JSON/HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes sharing the port (SO_REUSEPORT)')
+    parser.add_argument('--max-batch', type=int, default=64, help='most rows scored in one batched call')
+    parser.add_argument('--batch-wait-ms', type=float, default=2.0,
+                        help='longest a request waits for others to share its batch')
+    parser.add_argument('--cache-size', type=int, default=4096, help='cached prediction rows (0 disables)')
+    parser.add_argument('--cache-ttl', type=float, default=None, help='seconds a cached prediction stays valid')
+    args = parser.parse_args()
+
+    print(f"Serving {', '.join(MODEL_FEATURES)} on http://{args.host}:{args.port} "
+          f"({args.workers} worker(s), pid {os.getpid()})", flush=True)
+    if args.workers <= 1:
+        run_worker(args.host, args.port, args.max_batch, args.batch_wait_ms, args.cache_size, args.cache_ttl, False)
+        return
+
+    worker_args = (args.host, args.port, args.max_batch, args.batch_wait_ms, args.cache_size, args.cache_ttl, True)
+    workers = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            os.kill(worker.pid, signal.SIGINT)
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+# Environment switches
+#
+# Every DISEASE_APP_* on/off variable is read the same way: unset means the
+# default, and '', '0', 'false' and 'no' (any case) mean off.
+import os
+
+OFF = ('', '0', 'false', 'no')
+
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in OFF
@@ -0,0 +1,147 @@
+# Versioned snapshots of the online-updated linear models
+#
+# online_update.py writes each checkpoint of a model as
+# Models/online/<key>/v000001.npz, v000002.npz, ... and then atomically
+# replaces Models/online/<key>/CURRENT, a one-line file naming the snapshot to
+# serve. The registry resolves CURRENT on every lookup, so a new snapshot is
+# picked up by running servers on their next prediction without a restart;
+# deleting CURRENT goes back to the .sav in Models/.
+#
+# A snapshot holds the serving weights in the same arrays as a compiled
+# linear model (see linear_kernel.py) plus the updater's state, so training
+# can resume from whatever is being served.
+#
+# Record ranges whose update failed the accuracy check are appended to
+# Models/online/<key>/rejected.jsonl; later updates start after them, so one
+# bad stretch of records does not stop the model from learning what follows.
+import json
+import os
+
+import numpy as np
+
+from linear_kernel import COMPILED_FORMAT, LinearScorer
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Models', 'online')
+POINTER = 'CURRENT'
+REJECTED = 'rejected.jsonl'
+
+# pointer path -> ((inode, mtime_ns) of the pointer, snapshot path), so a
+# lookup costs a stat. publish() replaces CURRENT with a new file, so its
+# inode changes even when two publishes share one mtime tick
+_resolved = {}
+
+
+def model_dir(key, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, key)
+
+
+def snapshot_name(version):
+    return f"v{version:06d}.npz"
+
+
+def current_snapshot(key, snapshot_dir=SNAPSHOT_DIR):
+    """Path of the snapshot CURRENT points at, or None when there is none."""
+    pointer = os.path.join(snapshot_dir, key, POINTER)
+    # os.access is the cheap test for the common no-snapshot case: no exception
+    if not os.access(pointer, os.F_OK):
+        return None
+    try:
+        st = os.stat(pointer)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns)
+    cached = _resolved.get(pointer)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(pointer) as f:
+        path = os.path.join(os.path.dirname(pointer), f.read().strip())
+    _resolved[pointer] = (stamp, path)
+    return path
+
+
+def versions(key, snapshot_dir=SNAPSHOT_DIR):
+    """Snapshot version numbers on disk, oldest first."""
+    try:
+        names = os.listdir(model_dir(key, snapshot_dir))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[1:-4]) for name in names
+                  if name.startswith('v') and name.endswith('.npz') and name[1:-4].isdigit())
+
+
+def _write_durably(path, write):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def publish(key, arrays, snapshot_dir=SNAPSHOT_DIR, keep=5):
+    """Write `arrays` as the next snapshot of `key`, point CURRENT at it and
+    prune all but the newest `keep` snapshots. Returns the snapshot path."""
+    directory = model_dir(key, snapshot_dir)
+    os.makedirs(directory, exist_ok=True)
+    version = (versions(key, snapshot_dir) or [0])[-1] + 1
+    name = snapshot_name(version)
+    arrays = dict(arrays, format=np.int64(COMPILED_FORMAT), kind=np.str_('linear'), version=np.int64(version))
+
+    _write_durably(os.path.join(directory, name), lambda f: np.savez(f, **arrays))
+    _write_durably(os.path.join(directory, POINTER), lambda f: f.write(name.encode() + b'\n'))
+
+    for old in versions(key, snapshot_dir)[:-keep] if keep else ():
+        try:
+            os.remove(os.path.join(directory, snapshot_name(old)))
+        except FileNotFoundError:
+            pass
+    return os.path.join(directory, name)
+
+
+def reset(key, snapshot_dir=SNAPSHOT_DIR):
+    """Stop serving snapshots of `key`; the registry falls back to its .sav."""
+    try:
+        os.remove(os.path.join(model_dir(key, snapshot_dir), POINTER))
+    except FileNotFoundError:
+        pass
+
+
+def record_rejected(key, entry, snapshot_dir=SNAPSHOT_DIR):
+    """Append `entry`, a dict with at least 'source' and 'end' (byte offset), to
+    the rejected record ranges of `key`."""
+    directory = model_dir(key, snapshot_dir)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, REJECTED), 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def rejected(key, snapshot_dir=SNAPSHOT_DIR):
+    """Rejected record ranges of `key`, oldest first."""
+    try:
+        with open(os.path.join(model_dir(key, snapshot_dir), REJECTED)) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            # A line torn by a crash mid-append
+            continue
+    return entries
+
+
+def read_arrays(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_snapshot(path):
+    """LinearScorer serving the snapshot at `path`."""
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['format']) != COMPILED_FORMAT:
+            raise ValueError(f"{path}: unsupported snapshot format {int(data['format'])}")
+        return LinearScorer(data['coef'], data['intercept'], data['classes'], data['mean'], data['scale'])
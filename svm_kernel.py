@@ -0,0 +1,299 @@
+# Accelerated scoring for the SVC models
+#
+# An SVC decision is a sum over its support vectors, so libsvm's per-row cost
+# grows with their number. This module compiles a fitted SVC into plain
+# arrays, written to the same .npz layout linear_kernel.py uses:
+#
+#   linear kernel  the expansion collapses exactly to one weight vector and is
+#                  served by LinearScorer (this is the case for the bundled
+#                  diabetes and parkinsons models)
+#   rbf/poly/      KernelScorer keeps the support vectors and dual
+#   sigmoid        coefficients contiguous and computes the kernel for whole
+#                  row blocks with one BLAS matrix multiply
+#   rbf, --approximate
+#                  RandomFeatureScorer replaces the RBF kernel by random
+#                  Fourier features, growing their number until agreement
+#                  with the exact model on the training dataset is within
+#                  --tolerance (kept exact if that needs as many features as
+#                  there are support vectors)
+#
+# Compiled SVCs are margin-only: like an SVC fitted without probability=True
+# they have predict and decision_function but no predict_proba.
+#
+# Usage:
+#   python svm_kernel.py export [model ...] [--approximate --tolerance 0.01] [--float32]
+#   python svm_kernel.py verify [model ...]
+import argparse
+import sys
+
+import numpy as np
+
+from linear_kernel import COMPILED_FORMAT, LinearScorer, file_sha256, load_compiled, save_compiled
+
+SVC_MODELS = ('diabetes', 'parkinsons')
+
+# Rows per kernel block; bounds the (rows x support vectors) scratch matrix
+BLOCK_ROWS = 4096
+
+
+def _check(X, n_features, dtype):
+    X = np.asarray(X, dtype=dtype)
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise ValueError(f"X has shape {X.shape}, expected (n, {n_features})")
+    return X
+
+
+class KernelScorer:
+    """Exact decision function of a binary rbf/poly/sigmoid SVC."""
+
+    def __init__(self, support_vectors, dual_coef, intercept, classes, kernel, gamma,
+                 coef0=0.0, degree=3, dtype=np.float64):
+        if kernel not in ('rbf', 'poly', 'sigmoid'):
+            raise ValueError(f"unsupported kernel {kernel!r}")
+        self.dtype = np.dtype(dtype)
+        self.support_vectors_ = np.ascontiguousarray(support_vectors, dtype=self.dtype)
+        self.dual_coef_ = np.ascontiguousarray(np.ravel(dual_coef), dtype=self.dtype)
+        self.intercept_ = float(np.ravel(intercept)[0])
+        self.classes_ = np.asarray(classes)
+        self.kernel = kernel
+        self.gamma = float(gamma)
+        self.coef0 = float(coef0)
+        self.degree = int(degree)
+        self.n_features_in_ = self.support_vectors_.shape[1]
+        self._sv_sq = np.einsum('ij,ij->i', self.support_vectors_, self.support_vectors_)
+
+    def _kernel(self, X):
+        dot = X @ self.support_vectors_.T
+        if self.kernel == 'rbf':
+            sq = np.einsum('ij,ij->i', X, X)[:, None] + self._sv_sq[None, :] - 2 * dot
+            np.maximum(sq, 0, out=sq)
+            return np.exp(-self.gamma * sq, out=sq)
+        if self.kernel == 'poly':
+            return (self.gamma * dot + self.coef0) ** self.degree
+        return np.tanh(self.gamma * dot + self.coef0)
+
+    def decision_function(self, X):
+        X = _check(X, self.n_features_in_, self.dtype)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            out[start:start + len(block)] = self._kernel(block) @ self.dual_coef_
+        return out + self.intercept_
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+
+class RandomFeatureScorer:
+    """RBF SVC approximated with random Fourier features.
+
+    exp(-gamma |x - y|^2) ~= z(x) . z(y) with z(x) = sqrt(2/D) cos(x W + b),
+    so the whole support-vector sum folds into one D-dimensional weight
+    vector and a row costs O(features x D) however many support vectors the
+    model has.
+    """
+
+    def __init__(self, weights, offsets, coef, intercept, classes, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.weights_ = np.ascontiguousarray(weights, dtype=self.dtype)
+        self.offsets_ = np.ascontiguousarray(offsets, dtype=self.dtype)
+        self.coef_ = np.ascontiguousarray(coef, dtype=self.dtype)
+        self.intercept_ = float(np.ravel(intercept)[0])
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = self.weights_.shape[0]
+        self.n_components = self.weights_.shape[1]
+
+    @classmethod
+    def from_kernel(cls, scorer, n_components, seed=0):
+        rng = np.random.default_rng(seed)
+        d = scorer.n_features_in_
+        weights = rng.normal(scale=np.sqrt(2 * scorer.gamma), size=(d, n_components))
+        offsets = rng.uniform(0, 2 * np.pi, size=n_components)
+        features = np.cos(scorer.support_vectors_.astype(np.float64) @ weights + offsets)
+        coef = 2 / n_components * (scorer.dual_coef_.astype(np.float64) @ features)
+        return cls(weights, offsets, coef, scorer.intercept_, scorer.classes_, scorer.dtype)
+
+    def decision_function(self, X):
+        X = _check(X, self.n_features_in_, self.dtype)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            out[start:start + len(block)] = np.cos(block @ self.weights_ + self.offsets_) @ self.coef_
+        return out + self.intercept_
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+
+def approximate_rbf(scorer, X_check, tolerance=0.01, max_components=None, seed=0):
+    """Smallest power-of-two RandomFeatureScorer whose predictions disagree
+    with `scorer` on at most `tolerance` of `X_check`.
+
+    Returns (approximation, disagreement). An approximation with as many
+    components as the model has support vectors is no faster than the exact
+    kernel, so that is the default cap; ValueError is raised if nothing below
+    it meets the tolerance.
+    """
+    if max_components is None:
+        max_components = len(scorer.support_vectors_)
+    exact = scorer.predict(X_check)
+    n_components = 64
+    best = 1.0
+    while n_components < max_components:
+        approx = RandomFeatureScorer.from_kernel(scorer, n_components, seed)
+        disagreement = float((approx.predict(X_check) != exact).mean())
+        if disagreement <= tolerance:
+            return approx, disagreement
+        best = min(best, disagreement)
+        n_components *= 2
+    raise ValueError(f"no approximation with fewer than {max_components} components is within "
+                     f"{tolerance:.2%} (best {best:.2%}); use the exact kernel")
+
+
+def compile_svc(model, dtype=np.float64):
+    """LinearScorer (linear kernel) or KernelScorer for a fitted binary SVC."""
+    if type(model).__name__ != 'SVC':
+        raise ValueError(f"cannot compile {type(model).__name__} as an SVC")
+    if len(model.classes_) != 2:
+        raise ValueError('only binary SVCs can be compiled')
+    if hasattr(model, 'predict_proba'):
+        raise ValueError('SVCs fitted with probability=True are not supported')
+    if model.kernel == 'linear':
+        coef = (model.dual_coef_ @ model.support_vectors_).ravel()
+        return LinearScorer(coef, model.intercept_, model.classes_, probability=False)
+    return KernelScorer(
+        model.support_vectors_, model.dual_coef_, model.intercept_, model.classes_,
+        model.kernel, model._gamma, model.coef0, model.degree, dtype,
+    )
+
+
+def scorer_arrays(scorer):
+    """The .npz arrays describing a compiled SVC scorer."""
+    arrays = {'probability': np.bool_(False), 'classes': scorer.classes_,
+              'intercept': np.array([scorer.intercept_])}
+    if isinstance(scorer, LinearScorer):
+        arrays.update(kind=np.str_('linear'), coef=scorer.coef_)
+    elif isinstance(scorer, KernelScorer):
+        arrays.update(
+            kind=np.str_('kernel'), kernel=np.str_(scorer.kernel), dtype=np.str_(scorer.dtype.name),
+            support_vectors=scorer.support_vectors_, dual_coef=scorer.dual_coef_,
+            gamma=np.float64(scorer.gamma), coef0=np.float64(scorer.coef0), degree=np.int64(scorer.degree),
+        )
+    else:
+        arrays.update(
+            kind=np.str_('rff'), dtype=np.str_(scorer.dtype.name),
+            weights=scorer.weights_, offsets=scorer.offsets_, coef=scorer.coef_,
+        )
+    return arrays
+
+
+def scorer_from_arrays(kind, data):
+    """Rebuild a scorer from a loaded .npz (called by linear_kernel.load_compiled)."""
+    if kind == 'kernel':
+        return KernelScorer(
+            data['support_vectors'], data['dual_coef'], data['intercept'], data['classes'],
+            str(data['kernel']), float(data['gamma']), float(data['coef0']), int(data['degree']),
+            str(data['dtype']),
+        )
+    if kind == 'rff':
+        return RandomFeatureScorer(
+            data['weights'], data['offsets'], data['coef'], data['intercept'], data['classes'],
+            str(data['dtype']),
+        )
+    raise ValueError(f"unknown compiled model kind {kind!r}")
+
+
+def _load_pickle(path):
+    import pickle
+
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _dataset(key):
+    from column_store import dataset_features
+
+    return dataset_features(key)[0]
+
+
+def export(key, approximate=False, tolerance=0.01, dtype=np.float64):
+    """Compile model `key` and write its .npz; returns (path, scorer, note)."""
+    from model_registry import registry
+
+    path = registry.path(key)
+    scorer = compile_svc(_load_pickle(path), dtype)
+    note = scorer_kind(scorer)
+    if approximate and isinstance(scorer, KernelScorer) and scorer.kernel == 'rbf':
+        try:
+            scorer, disagreement = approximate_rbf(scorer, _dataset(key), tolerance)
+            note = f"rff, {scorer.n_components} components, {disagreement:.2%} disagreement"
+        except ValueError as e:
+            note += f"; kept exact kernel: {e}"
+    arrays = scorer_arrays(scorer)
+    arrays.update(format=np.int64(COMPILED_FORMAT), source_sha256=np.str_(file_sha256(path)))
+    return save_compiled(path, arrays), scorer, note
+
+
+def scorer_kind(scorer):
+    if isinstance(scorer, LinearScorer):
+        return 'linear, collapsed to one weight vector'
+    if isinstance(scorer, KernelScorer):
+        return f"{scorer.kernel} kernel, {len(scorer.support_vectors_)} support vectors, {scorer.dtype.name}"
+    return f"rff, {scorer.n_components} components, {scorer.dtype.name}"
+
+
+def verify(key, repeat=20):
+    """Agreement and speedup of the compiled model against libsvm on its dataset."""
+    import time
+    import warnings
+
+    from model_registry import registry
+
+    path = registry.path(key)
+    scorer = load_compiled(path)
+    if scorer is None:
+        raise SystemExit(f"{key}: no up-to-date compiled model, run `python svm_kernel.py export {key}`")
+    model = _load_pickle(path)
+    X = _dataset(key)
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(X)
+        return (time.perf_counter() - start) / repeat
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        agreement = float((scorer.predict(X) == model.predict(X)).mean())
+        margin = float(np.abs(scorer.decision_function(X) - model.decision_function(X)).max())
+        speedup = timed(model.predict) / timed(scorer.predict)
+    return len(X), scorer_kind(scorer), agreement, margin, speedup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile SVC models to NumPy and check them.')
+    parser.add_argument('command', choices=['export', 'verify'])
+    parser.add_argument('models', nargs='*', help=f"default: {', '.join(SVC_MODELS)}")
+    parser.add_argument('--approximate', action='store_true', help='random Fourier features for RBF kernels')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='largest fraction of dataset predictions the approximation may flip')
+    parser.add_argument('--float32', action='store_true', help='store and compute kernels in float32')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for key in args.models or SVC_MODELS:
+        if args.command == 'export':
+            path, _, note = export(key, args.approximate, args.tolerance,
+                                   np.float32 if args.float32 else np.float64)
+            print(f"{key}: wrote {path} ({note})")
+        else:
+            rows, kind, agreement, margin, speedup = verify(key)
+            failed |= agreement < 1 - args.tolerance
+            print(f"{key}: {kind}; {rows} rows, {agreement:.2%} agreement, "
+                  f"max |margin diff| {margin:.2e}, {speedup:.1f}x faster than libsvm")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
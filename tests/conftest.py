@@ -0,0 +1,16 @@
+import os
+import sys
+import warnings
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    # The bundled pickles were saved by older scikit-learn releases
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
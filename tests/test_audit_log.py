@@ -0,0 +1,123 @@
+import os
+import struct
+import subprocess
+import sys
+
+import numpy as np
+
+from audit_log import FRAME, SEGMENT_MAGIC, AuditLog, load, scan, segments
+from model_registry import BASE_DIR, registry
+
+
+def audit_log(tmp_path, **kwargs):
+    return AuditLog(str(tmp_path), flush_interval=0.01, **kwargs)
+
+
+def test_round_trip(tmp_path):
+    log = audit_log(tmp_path)
+    version = registry.version('thyroid')
+    first = np.array([[40, 0, 0, 1.5, 1, 2.0, 110.0], [60, 1, 1, 30.0, 1, 1.0, 60.0]])
+    second = np.array([[25, 1, 0, 0.5, 1, 2.5, 120.0]])
+    log.record('thyroid', version, first, {'prediction': np.array([0, 1]), 'probability': np.array([0.1, 0.9])},
+               'app')
+    log.record('thyroid', version, second, {'prediction': np.array([0]), 'probability': np.array([0.2])}, 'serve')
+    log.record('diabetes', registry.version('diabetes'), np.zeros((1, 8)), {'prediction': np.array([1])}, 'app')
+    log.close()
+    assert log.stats()['records'] == 4
+    assert log.stats()['errors'] == 0
+
+    frame = load('thyroid', str(tmp_path))
+    assert len(frame) == 3
+    assert np.array_equal(frame.iloc[:, 4:11].to_numpy(), np.concatenate([first, second]))
+    assert frame['prediction'].tolist() == [0, 1, 0]
+    assert frame['probability'].tolist() == [0.1, 0.9, 0.2]
+    assert sorted(frame['source']) == ['app', 'app', 'serve']
+
+    [(meta, columns)] = list(scan(str(tmp_path), model='diabetes'))
+    assert meta['source'] == 'app'
+    assert columns['features'].shape == (1, 8)
+    assert np.isnan(columns['probability']).all()
+
+
+def test_torn_frame_ends_the_segment(tmp_path):
+    log = audit_log(tmp_path)
+    version = registry.version('thyroid')
+    for source in ('app', 'serve'):
+        log.record('thyroid', version, np.ones((1, 7)), {'prediction': np.array([1]), 'probability': np.array([1.0])},
+                   source)
+        log.flush()
+    log.close()
+    [path] = segments(str(tmp_path))
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data.startswith(SEGMENT_MAGIC)
+    first_size = struct.unpack_from('<I', data, len(SEGMENT_MAGIC) + 4)[0]
+    with open(path, 'wb') as f:
+        f.write(data[:len(SEGMENT_MAGIC) + FRAME.size + first_size + 10])
+    assert [meta['source'] for meta, _ in scan(str(tmp_path))] == ['app']
+
+
+def test_empty_block_is_not_recorded(tmp_path):
+    log = audit_log(tmp_path)
+    log.record('thyroid', registry.version('thyroid'), np.zeros((0, 7)), {}, 'app')
+    log.record('thyroid', registry.version('thyroid'), np.ones((1, 7)),
+               {'prediction': np.array([1]), 'probability': np.array([1.0])}, 'app')
+    assert log.flush()
+    stats = log.stats()
+    assert (stats['records'], stats['errors'], stats['pending']) == (1, 0, 0)
+    assert log._thread.is_alive()
+    log.close()
+
+
+def test_bad_record_does_not_stop_the_writer(tmp_path):
+    log = audit_log(tmp_path)
+    version = registry.version('thyroid')
+    # A result without predictions cannot be encoded
+    log.record('thyroid', version, np.ones((1, 7)), {}, 'app')
+    assert log.flush()
+    assert log.stats()['errors'] == 1
+    assert 'KeyError' in log.stats()['last_error']
+    assert log._thread.is_alive()
+
+    log.record('thyroid', version, np.ones((2, 7)), {'prediction': np.array([1, 1]), 'probability': np.ones(2)},
+               'app')
+    log.close()
+    assert log.stats()['records'] == 2
+    assert len(load('thyroid', str(tmp_path))) == 2
+
+
+def _record(log, rows=1):
+    log.record('thyroid', registry.version('thyroid'), np.ones((rows, 7)),
+               {'prediction': np.ones(rows, dtype=np.int64), 'probability': np.ones(rows)}, 'app')
+
+
+def test_failed_write_is_retried_and_capped(tmp_path):
+    # A file where the segment directory should be makes every write fail
+    directory = tmp_path / 'audit'
+    directory.write_text('')
+    log = AuditLog(str(directory), flush_interval=0.01, max_pending_rows=3)
+    for _ in range(5):
+        _record(log)
+    assert not log.flush(timeout=0.3)
+    stats = log.stats()
+    assert stats['errors'] > 0 and stats['records'] == 0
+    assert stats['dropped'] == 2
+
+    directory.unlink()
+    assert log.flush()
+    assert log.stats()['records'] == 3
+    log.close()
+    assert len(load('thyroid', str(directory))) == 3
+
+
+def test_settings_from_environment(tmp_path):
+    env = dict(os.environ, DISEASE_APP_AUDIT_DIR=str(tmp_path), DISEASE_APP_AUDIT_FSYNC='always',
+               DISEASE_APP_AUDIT_SEGMENT_MB='0.5', DISEASE_APP_AUDIT_SEGMENT_SECONDS='60')
+    code = 'import audit_log as a; print(a.audit.fsync, a.audit.segment_bytes, a.audit.segment_seconds)'
+    result = subprocess.run([sys.executable, '-c', code], env=env, cwd=BASE_DIR, capture_output=True, text=True)
+    assert result.stdout.split() == ['always', str(2**19), '60.0']
+
+    env['DISEASE_APP_AUDIT_FSYNC'] = 'sometimes'
+    result = subprocess.run([sys.executable, '-c', 'import audit_log'], env=env, cwd=BASE_DIR, capture_output=True,
+                            text=True)
+    assert result.returncode != 0 and "not 'sometimes'" in result.stderr
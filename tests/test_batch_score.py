@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_score import feature_block, main
+from features import MODEL_FEATURES
+
+
+def test_non_numeric_value_is_reported_by_row():
+    chunk = pd.DataFrame({'a': [1.0, 2.0, 3.0], 'b': ['4', 'abc', '6']})
+    with pytest.raises(ValueError, match='row 11 has missing or non-numeric features'):
+        feature_block(chunk, ['a', 'b'], offset=10, path='in.csv')
+
+
+def test_feature_block_order_and_layout():
+    chunk = pd.DataFrame({'a': [1, 2], 'b': ['3', '4.5']})
+    block = feature_block(chunk, ['b', 'a'])
+    assert block.flags.c_contiguous and block.dtype == np.float64
+    assert block.tolist() == [[3.0, 1.0], [4.5, 2.0]]
+
+
+@pytest.mark.parametrize('change', ['drop', 'text'])
+def test_bad_input_exits_without_output(tmp_path, change):
+    features = MODEL_FEATURES['diabetes']
+    frame = pd.DataFrame(np.ones((3, len(features))), columns=features)
+    if change == 'drop':
+        frame = frame.drop(columns=features[0])
+    else:
+        frame[features[0]] = frame[features[0]].astype(object)
+        frame.loc[1, features[0]] = 'abc'
+    source = tmp_path / 'in.csv'
+    output = tmp_path / 'out.csv'
+    frame.to_csv(source, index=False)
+    with pytest.raises(SystemExit, match='batch_score: '):
+        main(['diabetes', str(source), '-o', str(output), '--chunksize', '1'])
+    assert not output.exists()
+
+
+def test_shared_features_come_from_per_model_columns(tmp_path):
+    from batch_score import input_columns, read_model_blocks, score_file
+    from model_registry import registry
+
+    keys = ['heart_disease', 'thyroid']
+    columns = input_columns(keys)
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({name: rng.integers(0, 2, 20).astype(float) for key in keys for name in columns[key]})
+    frame['heart_disease.age'] = 60.0
+    frame['thyroid.age'] = 30.0
+    frame['heart_disease.sex'] = 1.0  # male, as heart_disease encodes it
+    frame['thyroid.sex'] = 0.0        # male, as thyroid encodes it
+    source = tmp_path / 'combined.csv'
+    frame.to_csv(source, index=False)
+
+    [(_, blocks)] = list(read_model_blocks(source, keys))
+    for key in keys:
+        age, sex = MODEL_FEATURES[key].index('age'), MODEL_FEATURES[key].index('sex')
+        assert (blocks[key][:, age] == frame[f"{key}.age"]).all()
+        assert (blocks[key][:, sex] == frame[f"{key}.sex"]).all()
+        assert np.array_equal(blocks[key], frame[columns[key]].to_numpy())
+
+    output = tmp_path / 'out.csv'
+    score_file(keys, source, str(output))
+    scores = pd.read_csv(output)
+    for key in keys:
+        expected = registry[key].predict(frame[columns[key]].to_numpy())
+        assert scores[f"{key}_prediction"].tolist() == expected.tolist()
+
+    # One unprefixed column may not feed both models
+    frame.rename(columns={'heart_disease.sex': 'sex'}).drop(columns='thyroid.sex').to_csv(source, index=False)
+    with pytest.raises(ValueError, match='missing columns'):
+        list(read_model_blocks(source, keys))
@@ -0,0 +1,50 @@
+import threading
+
+import numpy as np
+import pytest
+
+from batch_score import score_block
+from batching import MicroBatcher
+from model_registry import registry
+
+THYROID_ROW = [40, 0, 0, 1.5, 1, 2.0, 110.0]
+
+
+def test_concurrent_requests_share_a_batch():
+    batcher = MicroBatcher('thyroid', max_batch=64, max_wait_ms=50)
+    rows = np.array([THYROID_ROW] * 8, dtype=np.float64)
+    rows[:, 0] = np.arange(20, 100, 10)
+    results = [None] * len(rows)
+
+    def call(i):
+        results[i] = batcher.predict(rows[i:i + 1])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    expected = score_block(registry['thyroid'], rows)
+    for i, result in enumerate(results):
+        assert result['prediction'].tolist() == expected['prediction'][i:i + 1].tolist()
+        assert np.allclose(result['probability'], expected['probability'][i:i + 1])
+    stats = batcher.metrics()
+    assert stats['requests'] == len(rows)
+    assert stats['batches'] < len(rows)
+
+
+def test_cancelled_request_does_not_stop_the_batcher():
+    batcher = MicroBatcher('thyroid', max_wait_ms=50)
+    cancelled = batcher.submit([THYROID_ROW])
+    assert cancelled.cancel()
+    result = batcher.submit([THYROID_ROW]).result(timeout=5)
+    assert result['prediction'].shape == (1,)
+    assert batcher._thread.is_alive()
+
+
+def test_scoring_error_reaches_the_caller():
+    batcher = MicroBatcher('thyroid', max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.submit([[1.0, 2.0]]).result(timeout=5)
+    assert batcher.predict([THYROID_ROW])['prediction'].shape == (1,)
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_store
+from column_store import convert, open_store, store_dir
+from model_registry import BASE_DIR
+
+CSV = os.path.join(BASE_DIR, 'Datasets', 'hypothyroid.csv')
+
+
+def _open(cache_dir, lock):
+    if not lock:
+        column_store.fcntl = None
+    try:
+        return open_store(CSV, cache_dir).rows
+    except Exception as e:
+        return repr(e)
+
+
+def test_store_matches_pandas(tmp_path):
+    store = open_store(CSV, str(tmp_path))
+    frame = pd.read_csv(CSV, na_values=['?'])
+    assert store.rows == len(frame)
+    for name in ('age', 'TSH', 'TT4'):
+        assert np.allclose(store.values(name), frame[name], equal_nan=True)
+
+
+@pytest.mark.parametrize('lock', [True, False])
+def test_concurrent_conversion(tmp_path, lock):
+    context = multiprocessing.get_context('fork')
+    for run in range(3):
+        cache_dir = str(tmp_path / f"cache-{run}")
+        with context.Pool(8) as pool:
+            results = pool.starmap(_open, [(cache_dir, lock)] * 8)
+        assert results == [3772] * 8
+        directory = os.path.basename(store_dir(CSV, cache_dir))
+        assert sorted(os.listdir(cache_dir)) == [directory, directory + '.lock']
+
+
+def test_losing_the_final_swap_keeps_the_winner(tmp_path, monkeypatch):
+    directory = store_dir(CSV, str(tmp_path))
+    winner = convert(CSV, directory)
+    # Make this conversion miss the winner until its final replace
+    is_current = column_store.is_current
+    calls = []
+
+    def late(directory, path):
+        calls.append(directory)
+        return len(calls) > 1 and is_current(directory, path)
+
+    monkeypatch.setattr(column_store, 'is_current', late)
+    real_exists = os.path.exists
+    monkeypatch.setattr(column_store.os.path, 'exists', lambda p: False if p == directory else real_exists(p))
+    assert convert(CSV, directory) == winner
+    assert os.listdir(tmp_path) == [os.path.basename(directory)]
+
+
+def test_failed_conversion_leaves_no_temporary_directory(tmp_path):
+    source = tmp_path / 'bad.csv'
+    source.write_text('flag,x\nt,1\nmaybe,2\n')
+    directory = store_dir(str(source), str(tmp_path / 'cache'))
+    with pytest.raises(ValueError, match='not a t/f flag'):
+        convert(str(source), directory, chunksize=1)
+    assert os.listdir(tmp_path / 'cache') == []
@@ -0,0 +1,21 @@
+# The compiled NumPy scorers must predict exactly like the pickled models
+import pytest
+
+import linear_kernel
+import svm_kernel
+
+
+@pytest.mark.parametrize('key', linear_kernel.LINEAR_MODELS)
+def test_linear_kernel_matches_pickle(key):
+    rows, mismatches, proba_diff = linear_kernel.verify(key)
+    assert rows > 0
+    assert mismatches == 0
+    assert proba_diff < 1e-9
+
+
+@pytest.mark.parametrize('key', svm_kernel.SVC_MODELS)
+def test_svm_kernel_matches_pickle(key):
+    rows, _, agreement, margin, _ = svm_kernel.verify(key, repeat=1)
+    assert rows > 0
+    assert agreement == 1.0
+    assert margin < 1e-6
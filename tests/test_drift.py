@@ -0,0 +1,65 @@
+import math
+import os
+import shutil
+
+import numpy as np
+
+import drift
+from features import MODEL_DATASETS, MODEL_FEATURES
+from model_registry import BASE_DIR
+
+KEY = 'diabetes'
+
+
+def _install_dataset(base_dir):
+    path = MODEL_DATASETS[KEY][0]
+    os.makedirs(os.path.join(base_dir, os.path.dirname(path)), exist_ok=True)
+    shutil.copy(os.path.join(BASE_DIR, path), os.path.join(base_dir, path))
+
+
+def _block(rows=300):
+    return np.random.default_rng(0).uniform(0, 100, (rows, len(MODEL_FEATURES[KEY])))
+
+
+def test_observe_reports_statistics():
+    monitor = drift.DriftMonitor(flush_rows=100)
+    monitor.observe(KEY, _block())
+    rows = [row for row in monitor.report() if row['model'] == KEY]
+    assert [row['feature'] for row in rows] == MODEL_FEATURES[KEY]
+    assert all(row['rows'] == 300 and row['error'] is None for row in rows)
+
+
+def test_missing_reference_is_reported_and_retried(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(drift.time, 'monotonic', lambda: now[0])
+    monitor = drift.DriftMonitor(flush_rows=100, base_dir=str(tmp_path), retry_seconds=60)
+
+    monitor.observe(KEY, _block())
+    assert KEY in monitor.errors()
+    rows = [row for row in monitor.report() if row['model'] == KEY]
+    assert rows and all(row['status'] == 'no reference' and row['rows'] == 300 for row in rows)
+    assert all(math.isnan(row['psi']) for row in rows)
+    text = drift.prometheus_text(rows)
+    assert f'disease_app_drift_reference_error{{model="{KEY}"}} 1' in text
+    assert 'disease_app_input_psi{' not in text
+
+    # Within the backoff the dataset is not looked at again
+    _install_dataset(str(tmp_path))
+    monitor.observe(KEY, _block())
+    assert KEY in monitor.errors()
+
+    now[0] += 61
+    monitor.observe(KEY, _block())
+    assert KEY not in monitor.errors()
+    rows = [row for row in monitor.report() if row['model'] == KEY]
+    assert all(row['status'] != 'no reference' and row['rows'] == 300 for row in rows)
+
+
+def test_preload_builds_references(tmp_path):
+    monitor = drift.DriftMonitor(base_dir=str(tmp_path))
+    errors = monitor.preload()
+    assert set(errors) == set(MODEL_FEATURES)
+    _install_dataset(str(tmp_path))
+    monitor.reset()
+    assert KEY not in monitor.preload([KEY])
+    assert monitor.reference(KEY) is not None
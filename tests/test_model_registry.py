@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+from model_registry import BASE_DIR, ModelRegistry
+
+
+def test_uncompiled_registry_serves_the_pickles():
+    registry = ModelRegistry(use_compiled=False, snapshot_dir=None)
+    assert type(registry['diabetes']).__name__ == 'SVC'
+    assert type(registry['thyroid']).__name__ == 'LogisticRegression'
+
+
+def test_compiled_env_switch():
+    code = ('import model_registry, model_store; r = model_registry.registry; '
+            'print(r.use_compiled, model_store.ENABLED, r.store_dir, type(r["parkinsons"]).__name__)')
+    env = dict(os.environ, DISEASE_APP_COMPILED='0')
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=BASE_DIR, env=env, capture_output=True,
+                         text=True, check=True).stdout.split()
+    assert out == ['False', 'False', 'None', 'SVC']
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from linear_kernel import compiled_path
+from model_registry import registry
+from model_store import attach, store_path
+
+
+def copy_model(key, directory):
+    path = os.path.join(directory, os.path.basename(registry.path(key)))
+    shutil.copy(registry.path(key), path)
+    shutil.copy(compiled_path(registry.path(key)), compiled_path(path))
+    return path
+
+
+@pytest.mark.parametrize('key', registry.keys())
+def test_store_scores_like_the_registry(key, tmp_path):
+    scorer = attach(registry.path(key), store_dir=str(tmp_path))
+    X = np.random.default_rng(0).normal(size=(50, scorer.n_features_in_)) * 10
+    assert np.array_equal(scorer.predict(X), registry[key].predict(X))
+
+
+def test_reexported_npz_gets_a_new_store_file(tmp_path):
+    model = copy_model('thyroid', tmp_path)
+    store = str(tmp_path / 'store')
+    before = attach(model, store_dir=store)
+    old = store_path(model, store_dir=store)
+
+    npz = compiled_path(model)
+    with np.load(npz) as data:
+        arrays = {name: data[name] for name in data.files}
+    arrays['intercept'] = arrays['intercept'] + 1.0
+    np.savez(npz, **arrays)
+
+    assert store_path(model, store_dir=store) != old
+    after = attach(model, store_dir=store)
+    assert after.intercept_ == pytest.approx(before.intercept_ + 1.0)
+    assert os.listdir(store) == [os.path.basename(store_path(model, store_dir=store))]
+
+
+def test_store_is_private(tmp_path):
+    store = tmp_path / 'store'
+    attach(registry.path('thyroid'), store_dir=str(store))
+    assert store.stat().st_mode & 0o777 == 0o700
+    [name] = os.listdir(store)
+    assert (store / name).stat().st_mode & 0o777 == 0o600
+
+
+def test_store_writable_by_others_is_refused(tmp_path):
+    store = tmp_path / 'store'
+    store.mkdir()
+    store.chmod(0o777)
+    with pytest.raises(OSError):
+        attach(registry.path('thyroid'), store_dir=str(store))
+    assert os.listdir(store) == []
+
+    from model_registry import ModelRegistry
+    model = ModelRegistry(snapshot_dir=None, store_dir=str(store))['thyroid']
+    assert np.array_equal(model.predict(np.ones((1, 7))), registry['thyroid'].predict(np.ones((1, 7))))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import MODEL_DATASETS, MODEL_FEATURES
+from online_update import UpdateRejected, main, update
+from snapshots import current_snapshot, read_arrays, rejected
+from train import dataset_split
+
+KEY = 'heart_disease'
+
+
+def write_records(path, X, y, mode='w'):
+    frame = pd.DataFrame(X, columns=MODEL_FEATURES[KEY])
+    frame[MODEL_DATASETS[KEY][1]] = y
+    frame.to_csv(path, mode=mode, header=mode == 'w', index=False)
+
+
+def test_rejected_records_are_skipped_by_the_next_run(tmp_path):
+    X_train, _, y_train, _ = dataset_split(KEY)
+    records = tmp_path / 'outcomes.csv'
+    # Inverted labels, repeated, pull the model far enough to fail the check
+    write_records(records, np.tile(X_train, (20, 1)), np.tile(1 - y_train, 20))
+    with pytest.raises(UpdateRejected) as e:
+        update(KEY, records, eta0=0.1, tolerance=0.0, snapshot_dir=tmp_path)
+    assert e.value.summary['published'] is None
+    assert current_snapshot(KEY, tmp_path) is None
+    [entry] = rejected(KEY, tmp_path)
+    assert entry['end'] == records.stat().st_size
+    assert entry['rows'] == 20 * len(X_train)
+
+    # Nothing new: the rejected rows are not read again
+    assert update(KEY, records, tolerance=0.0, snapshot_dir=tmp_path)['rows'] == 0
+
+    write_records(records, X_train[:10], y_train[:10], mode='a')
+    summary = update(KEY, records, eta0=1e-6, tolerance=0.05, snapshot_dir=tmp_path)
+    assert summary['rows'] == 10
+    assert summary['published'] == current_snapshot(KEY, tmp_path)
+    assert int(read_arrays(summary['published'])['rows']) == 10
+
+
+def test_cli_exits_1_on_rejection(tmp_path):
+    X_train, _, y_train, _ = dataset_split(KEY)
+    records = tmp_path / 'outcomes.csv'
+    write_records(records, np.tile(X_train, (20, 1)), np.tile(1 - y_train, 20))
+    assert main(['update', KEY, str(records), '--eta0', '0.1', '--tolerance', '0',
+                 '--snapshot-dir', str(tmp_path)]) == 1
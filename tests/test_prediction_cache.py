@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import drift
+from prediction_cache import PredictionCache, join_rows, row_digest, split_rows
+
+
+@pytest.fixture(autouse=True)
+def no_drift(monkeypatch):
+    monkeypatch.setattr(drift, '_enabled', False)
+
+
+def counting_scorer(calls):
+    def score(block):
+        calls.append(len(block))
+        return {'prediction': (block[:, 0] > 0).astype(np.int64), 'probability': block[:, 0] / 10}
+    return score
+
+
+def test_only_uncached_rows_are_scored():
+    cache = PredictionCache()
+    calls = []
+    first = cache.predict('heart_disease', [[1.0, 2.0], [3.0, 4.0]], score=counting_scorer(calls))
+    second = cache.predict('heart_disease', [[3.0, 4.0], [-1.0, 0.0]], score=counting_scorer(calls))
+    assert calls == [2, 1]
+    assert first['prediction'].tolist() == [1, 1]
+    assert second['prediction'].tolist() == [1, 0]
+    assert second['probability'].tolist() == [0.3, -0.1]
+    assert cache.stats()['hits'] == 1
+
+
+def test_new_model_version_drops_entries():
+    cache = PredictionCache()
+    block = np.array([[1.0, 2.0]])
+    found, digests = cache.lookup('thyroid', ('a.sav', 1), block)
+    cache.store('thyroid', ('a.sav', 1), digests, [{'prediction': 1}])
+    assert cache.lookup('thyroid', ('a.sav', 1), block)[0] == {0: {'prediction': 1}}
+
+    assert cache.lookup('thyroid', ('a.sav', 2), block)[0] == {}
+    assert cache.stats()['invalidations'] == 1
+    # A result scored by the old version is not stored under the new one
+    cache.store('thyroid', ('a.sav', 1), digests, [{'prediction': 1}])
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    cache = PredictionCache(max_entries=2, ttl=10)
+    version = ('m.sav', 1)
+    blocks = [np.array([[float(i)]]) for i in range(3)]
+    for block in blocks:
+        _, digests = cache.lookup('diabetes', version, block)
+        cache.store('diabetes', version, digests, [{'prediction': 0}])
+    assert cache.stats()['evictions'] == 1
+    assert cache.lookup('diabetes', version, blocks[0])[0] == {}
+
+    now = __import__('time').monotonic()
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now + 60)
+    assert cache.lookup('diabetes', version, blocks[2])[0] == {}
+    assert cache.stats()['expirations'] == 1
+
+
+def test_row_digest_folds_negative_zero():
+    assert row_digest([0.0, 1.0]) == row_digest([-0.0, 1.0])
+    assert row_digest([0.0, 1.0]) != row_digest([1.0, 0.0])
+
+
+def test_split_join_round_trip():
+    columns = {'prediction': np.array([0, 1]), 'probability': np.array([0.2, 0.9])}
+    joined = join_rows(split_rows(columns))
+    assert joined.keys() == columns.keys()
+    for name in columns:
+        assert np.array_equal(joined[name], columns[name])
+    assert join_rows([]) == {}
+
+
+def test_large_blocks_bypass_the_cache():
+    cache = PredictionCache(max_rows=4)
+    calls = []
+    block = np.arange(20, dtype=np.float64).reshape(10, 2)
+    result = cache.predict('heart_disease', block, score=counting_scorer(calls))
+    again = cache.predict('heart_disease', block, score=counting_scorer(calls))
+    assert calls == [10, 10]
+    assert result['prediction'].tolist() == again['prediction'].tolist() == [0] + [1] * 9
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses'], stats['uncached_blocks']) == (0, 0, 0, 2)
+
+    # Small blocks still use it
+    cache.predict('heart_disease', block[:4], score=counting_scorer(calls))
+    cache.predict('heart_disease', block[:4], score=counting_scorer(calls))
+    assert calls == [10, 10, 4]
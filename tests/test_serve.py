@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from serve import InferenceServer
+
+
+def exchange(request, server=None):
+    """Send raw request bytes to InferenceServer.handle; returns (status, payload)."""
+    server = server or InferenceServer(cache_size=0)
+
+    async def run():
+        tcp = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        port = tcp.sockets[0].getsockname()[1]
+        async with tcp:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 10)
+            writer.close()
+            return response
+
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize('length', ['-1', 'abc', '1_0', ' 5x', '+3'])
+def test_invalid_content_length_gets_400(length):
+    request = f"POST /predict/thyroid HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+    assert exchange(request) == (400, {'error': 'invalid Content-Length'})
+
+
+def test_valid_request_is_served():
+    status, payload = exchange(b"GET /health HTTP/1.1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+    assert status == 200 and payload['status'] == 'ok'
+
+
+def post_rows(server, rows):
+    body = json.dumps({'instances': rows}).encode()
+    request = (f"POST /predict/thyroid HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+               f"Connection: close\r\n\r\n").encode() + body
+    return exchange(request, server)
+
+
+def test_small_and_large_requests(monkeypatch):
+    import audit_log
+    import numpy as np
+
+    from batch_score import score_block
+    from model_registry import registry
+
+    monkeypatch.setattr(audit_log, '_enabled', False)
+    server = InferenceServer()
+    rows = np.tile([40, 0, 0, 1.5, 1, 2.0, 110.0], (100, 1))
+    rows[:, 3] = np.linspace(0.1, 90, len(rows))
+    expected = score_block(registry['thyroid'], rows)['prediction'].tolist()
+
+    # Small: through the cache and the micro-batcher
+    status, payload = post_rows(server, rows[:2].tolist())
+    assert status == 200
+    assert [row['prediction'] for row in payload['predictions']] == expected[:2]
+    assert server.cache.stats()['entries'] == 2
+    requests = server.batchers['thyroid'].metrics()['requests']
+
+    # Large: scored whole off the event loop, not cached or batched
+    status, payload = post_rows(server, rows.tolist())
+    assert status == 200
+    assert [row['prediction'] for row in payload['predictions']] == expected
+    assert server.cache.stats()['entries'] == 2
+    assert server.cache.stats()['uncached_blocks'] == 1
+    assert server.batchers['thyroid'].metrics()['requests'] == requests
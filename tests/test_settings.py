@@ -0,0 +1,17 @@
+import pytest
+
+from settings import env_flag
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 'default'), ('1', True), ('yes', True), ('TRUE', True), ('', False), ('0', False), ('No', False),
+    ('false', False), (' 0 ', False),
+])
+def test_env_flag(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv('DISEASE_APP_TEST_FLAG', raising=False)
+    else:
+        monkeypatch.setenv('DISEASE_APP_TEST_FLAG', value)
+    for default in (False, True):
+        want = default if expected == 'default' else expected
+        assert env_flag('DISEASE_APP_TEST_FLAG', default) is want
@@ -0,0 +1,21 @@
+import os
+
+import numpy as np
+
+from snapshots import POINTER, current_snapshot, model_dir, publish
+
+
+def test_publish_within_one_mtime_tick_is_picked_up(tmp_path):
+    first = publish('thyroid', {'coef': np.zeros(7)}, str(tmp_path))
+    assert current_snapshot('thyroid', str(tmp_path)) == first
+    pointer = os.path.join(model_dir('thyroid', str(tmp_path)), POINTER)
+    stamp = os.stat(pointer).st_mtime_ns
+
+    second = publish('thyroid', {'coef': np.ones(7)}, str(tmp_path))
+    # As if both publishes fell in one filesystem timestamp tick
+    os.utime(pointer, ns=(stamp, stamp))
+    assert current_snapshot('thyroid', str(tmp_path)) == second
+
+
+def test_no_pointer_means_no_snapshot(tmp_path):
+    assert current_snapshot('thyroid', str(tmp_path)) is None
@@ -0,0 +1,322 @@
+# Rebuild every model in Models/ from the CSVs in Datasets/
+#
+# Replaces hand-running the Colab notebooks (Heart_Disease_Prediction.ipynb,
+# Lung_Cancer.ipynb, Thyroid.ipynb, Parkinson's_Disease_Detection.ipynb). Each
+# model keeps its notebook's preprocessing, estimator and train/test split;
+# the regularisation strength C is now picked by a cross-validated grid
+# search on the training split.
+#
+# Models train in parallel worker processes (--jobs) and each grid search
+# runs its folds in parallel (--cv-jobs). Preprocessed feature matrices are
+# cached in .cache/train/, keyed by the SHA-256 of the source CSV, so reruns
+# only redo the cleaning when a dataset changes. Every run writes a manifest
+# with the per-stage wall time of every model, by default to
+# .cache/train/train_manifest.json rather than next to the committed models.
+#
+# Usage:
+#   python train.py                          # all models, into Models/
+#   python train.py thyroid lung_cancer      # just these
+#   python train.py -o /tmp/models --no-cache
+import argparse
+import json
+import os
+import pickle
+import platform
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.svm import SVC
+
+from column_store import open_store
+from features import MODEL_FEATURES
+from linear_kernel import COMPILED_FORMAT, LINEAR_MODELS, export, file_sha256, save_compiled
+from model_registry import BASE_DIR, MODEL_FILES, MODELS_DIR
+from svm_kernel import compile_svc, scorer_arrays
+
+CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'train')
+
+# Bump when a read_* function below changes, so cached matrices are rebuilt
+PREPROCESS_VERSION = 1
+
+
+def read_labelled(path, label):
+    data = open_store(path).frame()
+    return data, data[label]
+
+
+def read_lung(path, label):
+    # Lung_Cancer.ipynb: LabelEncoder on GENDER (F=0, M=1) and LUNG_CANCER (NO=0, YES=1)
+    data, _ = read_labelled(path, label)
+    data['GENDER'] = data['GENDER'].map({'F': 0, 'M': 1}).astype(np.float64)
+    data[label] = data[label].map({'NO': 0, 'YES': 1}).astype(np.int64)
+    return data, data[label]
+
+
+def read_hypothyroid(path, label):
+    # Thyroid.ipynb: '?' is missing, t/f flags are 1/0, sex F=1 M=0, TBG and
+    # referral source dropped, remaining gaps filled with the column mean.
+    # The column store already parses '?' as missing and t/f as 1/0.
+    data = open_store(path).frame()
+    data['sex'] = data['sex'].map({'F': 1, 'M': 0}).astype(np.float64)
+    data[label] = data[label].map({'P': 0, 'N': 1}).astype(np.float64)
+    data = data.drop(columns=['TBG', 'referral source']).astype(np.float64)
+    data = data.fillna(data.mean())
+    return data, data[label]
+
+
+LOGISTIC_GRID = {'C': [0.01, 0.1, 1.0, 10.0]}
+SVC_GRID = {'C': [0.01, 0.1, 1.0]}
+
+# source, reader, label, estimator, grid, split: as in each model's notebook
+TRAINING = {
+    'diabetes': {
+        'source': 'Datasets/diabetes_data.csv',
+        'read': read_labelled,
+        'label': 'Outcome',
+        'estimator': lambda: SVC(kernel='linear'),
+        'grid': SVC_GRID,
+        'split': {'test_size': 0.2, 'stratify': True, 'random_state': 2},
+    },
+    'heart_disease': {
+        'source': 'Datasets/heart_disease_data.csv',
+        'read': read_labelled,
+        'label': 'target',
+        'estimator': lambda: LogisticRegression(max_iter=5000),
+        'grid': LOGISTIC_GRID,
+        'split': {'test_size': 0.2, 'stratify': True, 'random_state': 2},
+    },
+    'parkinsons': {
+        'source': 'Datasets/parkinson_data.csv',
+        'read': read_labelled,
+        'label': 'status',
+        'estimator': lambda: SVC(kernel='linear'),
+        'grid': SVC_GRID,
+        'split': {'test_size': 0.2, 'stratify': False, 'random_state': 2},
+    },
+    'lung_cancer': {
+        'source': 'Datasets/survey lung cancer.csv',
+        'read': read_lung,
+        'label': 'LUNG_CANCER',
+        'estimator': lambda: LogisticRegression(max_iter=5000),
+        'grid': LOGISTIC_GRID,
+        'split': {'test_size': 0.2, 'stratify': True, 'random_state': 2},
+    },
+    'thyroid': {
+        'source': 'Datasets/hypothyroid.csv',
+        'read': read_hypothyroid,
+        'label': 'binaryClass',
+        'estimator': lambda: LogisticRegression(max_iter=5000),
+        'grid': LOGISTIC_GRID,
+        'split': {'test_size': 0.2, 'stratify': False, 'random_state': 42},
+    },
+}
+
+
+class Stopwatch:
+    """Collects the wall time of named stages, in order."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, name):
+        return _Lap(self.stages, name)
+
+
+class _Lap:
+    def __init__(self, stages, name):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stages[self.name] = time.perf_counter() - self.start
+        return False
+
+
+def cache_path(key, digest):
+    return os.path.join(CACHE_DIR, f"{key}-{digest[:16]}-v{PREPROCESS_VERSION}.npz")
+
+
+def preprocess(key, source, digest, use_cache=True):
+    """(X, y, cache hit) for model `key`; X is in MODEL_FEATURES[key] order."""
+    path = cache_path(key, digest)
+    if use_cache and os.path.exists(path):
+        with np.load(path) as cached:
+            return cached['X'], cached['y'], True
+
+    spec = TRAINING[key]
+    data, y = spec['read'](source, spec['label'])
+    X = np.ascontiguousarray(data[MODEL_FEATURES[key]].to_numpy(dtype=np.float64))
+    y = y.to_numpy(dtype=np.int64)
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, X=X, y=y)
+        os.replace(tmp, path)
+    return X, y, False
+
+
+def split_rows(key, X, y):
+    """The notebook's train/test split of model `key`: (X_train, X_test, y_train, y_test)."""
+    split = TRAINING[key]['split']
+    return train_test_split(X, y, test_size=split['test_size'], random_state=split['random_state'],
+                            stratify=y if split['stratify'] else None)
+
+
+def dataset_split(key, use_cache=True):
+    """split_rows() of model `key`'s preprocessed dataset, as float64/int64 arrays."""
+    source = os.path.join(BASE_DIR, TRAINING[key]['source'])
+    X, y, _ = preprocess(key, source, file_sha256(source), use_cache)
+    return split_rows(key, X, y)
+
+
+def save_model(model, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp, path)
+
+
+def compile_model(key, model, path):
+    """Write the .npz the registry serves in place of the new pickle."""
+    if key in LINEAR_MODELS:
+        return export(path)
+    arrays = scorer_arrays(compile_svc(model))
+    arrays.update(format=np.int64(COMPILED_FORMAT), source_sha256=np.str_(file_sha256(path)))
+    return save_compiled(path, arrays)
+
+
+def train_model(key, output_dir, cv_jobs=1, folds=5, use_cache=True):
+    """Preprocess, search, evaluate and save one model; returns its manifest entry."""
+    warnings.simplefilter('ignore', UserWarning)
+    spec = TRAINING[key]
+    lap = Stopwatch()
+    source = os.path.join(BASE_DIR, spec['source'])
+
+    with lap('hash'):
+        digest = file_sha256(source)
+    with lap('preprocess'):
+        X, y, hit = preprocess(key, source, digest, use_cache)
+    X = pd.DataFrame(X, columns=MODEL_FEATURES[key])
+
+    split = spec['split']
+    with lap('split'):
+        X_train, X_test, y_train, y_test = split_rows(key, X, y)
+
+    with lap('search'):
+        search = GridSearchCV(
+            spec['estimator'](), spec['grid'], scoring='accuracy', n_jobs=cv_jobs,
+            cv=StratifiedKFold(folds, shuffle=True, random_state=split['random_state']))
+        search.fit(X_train, y_train)
+        model = search.best_estimator_
+
+    with lap('evaluate'):
+        train_accuracy = model.score(X_train, y_train)
+        test_accuracy = model.score(X_test, y_test)
+
+    output = os.path.join(output_dir, MODEL_FILES[key])
+    with lap('save'):
+        save_model(model, output)
+    with lap('compile'):
+        compiled = compile_model(key, model, output)
+
+    return {
+        'source': spec['source'],
+        'source_sha256': digest,
+        'preprocess_cache': 'hit' if hit else 'miss',
+        'rows': int(len(X)),
+        'train_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'estimator': repr(model),
+        'best_params': search.best_params_,
+        'cv_accuracy': float(search.best_score_),
+        'train_accuracy': float(train_accuracy),
+        'test_accuracy': float(test_accuracy),
+        'output': output,
+        'compiled': compiled,
+        'stages': lap.stages,
+        'wall_seconds': sum(lap.stages.values()),
+    }
+
+
+def environment():
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'cpus': os.cpu_count(),
+    }
+
+
+def train_all(keys, output_dir, jobs=None, cv_jobs=None, folds=5, use_cache=True):
+    """Train `keys` in `jobs` processes; returns the run manifest."""
+    cpus = os.cpu_count() or 1
+    jobs = jobs or min(len(keys), cpus)
+    cv_jobs = cv_jobs or max(1, cpus // jobs)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'settings': {'jobs': jobs, 'cv_jobs': cv_jobs, 'folds': folds, 'cache': use_cache,
+                     'preprocess_version': PREPROCESS_VERSION, 'output_dir': output_dir},
+        'models': {},
+    }
+    start = time.perf_counter()
+    if jobs == 1:
+        for key in keys:
+            manifest['models'][key] = train_model(key, output_dir, cv_jobs, folds, use_cache)
+    else:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = {key: pool.submit(train_model, key, output_dir, cv_jobs, folds, use_cache)
+                       for key in keys}
+            for key, future in futures.items():
+                manifest['models'][key] = future.result()
+    manifest['wall_seconds'] = time.perf_counter() - start
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retrain the models from Datasets/')
+    parser.add_argument('models', nargs='*', help=f"default: all ({', '.join(TRAINING)})")
+    parser.add_argument('-o', '--output', default=MODELS_DIR, help='directory for the .sav/.npz files (default Models/)')
+    parser.add_argument('--manifest', help='run manifest path (default .cache/train/train_manifest.json)')
+    parser.add_argument('--jobs', type=int, help='models trained in parallel (default: one per core)')
+    parser.add_argument('--cv-jobs', type=int, help='grid search workers per model (default: the remaining cores)')
+    parser.add_argument('--folds', type=int, default=5, help='cross-validation folds')
+    parser.add_argument('--no-cache', action='store_true', help='redo preprocessing even if the dataset is unchanged')
+    args = parser.parse_args()
+
+    keys = args.models or list(TRAINING)
+    unknown = [key for key in keys if key not in TRAINING]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+    manifest = train_all(keys, args.output, args.jobs, args.cv_jobs, args.folds, not args.no_cache)
+
+    for key, entry in manifest['models'].items():
+        stages = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in entry['stages'].items())
+        print(f"{key}: {entry['best_params']} cv {entry['cv_accuracy']:.3f} test {entry['test_accuracy']:.3f} "
+              f"(preprocess cache {entry['preprocess_cache']}; {stages})")
+    print(f"Trained {len(keys)} model(s) in {manifest['wall_seconds']:.1f}s")
+
+    path = args.manifest or os.path.join(CACHE_DIR, 'train_manifest.json')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+    print(f"Wrote {path}")
+
+
+if __name__ == '__main__':
+    main()